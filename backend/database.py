@@ -1,7 +1,17 @@
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, event, exc
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker
 from sqlalchemy.ext.declarative import declarative_base
-from sqlalchemy.orm import sessionmaker
+from sqlalchemy.orm import sessionmaker, Session
+from sqlalchemy.pool import QueuePool, AsyncAdaptedQueuePool
+from sqlalchemy.sql.dml import UpdateBase
+from collections import deque
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Optional
+import itertools
 import os
+import threading
+import time
 from dotenv import load_dotenv
 from pathlib import Path
 
@@ -12,21 +22,356 @@ SQLALCHEMY_DATABASE_URL = os.getenv("DATABASE_URL")
 if not SQLALCHEMY_DATABASE_URL:
     raise RuntimeError("DATABASE_URL is missing. Set it in backend/.env")
 
-engine = create_engine(SQLALCHEMY_DATABASE_URL)
+# Async driver URL (asyncpg for Postgres, aiosqlite for local SQLite)
+def async_database_url(url: str) -> str:
+    scheme, _, rest = url.partition("://")
+    if scheme.startswith("sqlite"):
+        return "sqlite+aiosqlite://" + rest
+    if scheme.startswith("postgres"):
+        return "postgresql+asyncpg://" + rest
+    return url
 
-if "sqlite" in SQLALCHEMY_DATABASE_URL:
-    engine = create_engine(
-        SQLALCHEMY_DATABASE_URL, connect_args={"check_same_thread": False}
-    )
+ASYNC_DATABASE_URL = os.getenv("ASYNC_DATABASE_URL") or async_database_url(SQLALCHEMY_DATABASE_URL)
+
+# Pool sizing. DB_MAX_CONNECTIONS is the connection budget on the database
+# server shared by all uvicorn workers (WEB_CONCURRENCY); each worker gets an
+# equal slice, split between the sync and async engines, unless
+# DB_POOL_SIZE / DB_MAX_OVERFLOW are set explicitly (they then apply to each engine).
+WEB_CONCURRENCY = max(1, int(os.getenv("WEB_CONCURRENCY", "1")))
+DB_MAX_CONNECTIONS = int(os.getenv("DB_MAX_CONNECTIONS", "100"))
+_per_engine = max(2, DB_MAX_CONNECTIONS // WEB_CONCURRENCY // 2)
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", str(min(20, _per_engine // 2))))
+DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", str(max(0, _per_engine - DB_POOL_SIZE))))
+DB_POOL_TIMEOUT = float(os.getenv("DB_POOL_TIMEOUT", "30"))
+DB_POOL_RECYCLE = int(os.getenv("DB_POOL_RECYCLE", "1800"))
+DB_POOL_PRE_PING = os.getenv("DB_POOL_PRE_PING", "true").lower() == "true"
+
+# Read replicas: comma-separated URLs that serve GET traffic. After a user
+# writes, their reads stay on the primary for READ_YOUR_WRITES_SECONDS so
+# replication lag never hides their own changes.
+DATABASE_REPLICA_URLS = [url.strip() for url in os.getenv("DATABASE_REPLICA_URLS", "").split(",") if url.strip()]
+READ_YOUR_WRITES_SECONDS = float(os.getenv("READ_YOUR_WRITES_SECONDS", "5"))
+REPLICA_RETRY_SECONDS = float(os.getenv("REPLICA_RETRY_SECONDS", "30"))
+
+
+class PoolMetrics:
+    """Checkout wait and hold times, to tell pool exhaustion apart from slow queries"""
+
+    def __init__(self, window: int = 1000):
+        self._lock = threading.Lock()
+        self._waits = deque(maxlen=window)
+        self._holds = deque(maxlen=window)
+        self.checkouts = 0
+        self.timeouts = 0
+        self.max_wait = 0.0
+
+    def record_wait(self, seconds: float):
+        with self._lock:
+            self._waits.append(seconds)
+            self.checkouts += 1
+            self.max_wait = max(self.max_wait, seconds)
+
+    def record_timeout(self):
+        with self._lock:
+            self.timeouts += 1
+
+    def record_hold(self, seconds: float):
+        with self._lock:
+            self._holds.append(seconds)
+
+    @staticmethod
+    def _summary(values) -> dict:
+        if not values:
+            return {"avgMs": 0.0, "p95Ms": 0.0, "maxMs": 0.0}
+        ordered = sorted(values)
+        return {
+            "avgMs": round(sum(ordered) / len(ordered) * 1000, 3),
+            "p95Ms": round(ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))] * 1000, 3),
+            "maxMs": round(ordered[-1] * 1000, 3),
+        }
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            waits, holds = list(self._waits), list(self._holds)
+        return {
+            "checkouts": self.checkouts,
+            "timeouts": self.timeouts,
+            "maxWaitMs": round(self.max_wait * 1000, 3),
+            "wait": self._summary(waits),
+            "hold": self._summary(holds),
+        }
+
+
+pool_metrics = PoolMetrics()
+async_pool_metrics = PoolMetrics()
+
+
+class _WaitTiming:
+    """Pool mixin that records how long callers wait for a connection"""
+
+    metrics = pool_metrics
+
+    def _do_get(self):
+        start = time.perf_counter()
+        try:
+            connection = super()._do_get()
+        except Exception:
+            self.metrics.record_timeout()
+            raise
+        self.metrics.record_wait(time.perf_counter() - start)
+        return connection
+
+
+class InstrumentedQueuePool(_WaitTiming, QueuePool):
+    metrics = pool_metrics
+
+
+class InstrumentedAsyncQueuePool(_WaitTiming, AsyncAdaptedQueuePool):
+    metrics = async_pool_metrics
+
+
+def engine_options(url: str, poolclass=InstrumentedQueuePool) -> dict:
+    if "sqlite" in url:
+        options = {"connect_args": {"check_same_thread": False}}
+        if ":memory:" not in url:
+            options["poolclass"] = poolclass
+        return options
+    return {
+        "poolclass": poolclass,
+        "pool_size": DB_POOL_SIZE,
+        "max_overflow": DB_MAX_OVERFLOW,
+        "pool_timeout": DB_POOL_TIMEOUT,
+        "pool_recycle": DB_POOL_RECYCLE,
+        "pool_pre_ping": DB_POOL_PRE_PING,
+    }
+
+
+def instrument_engine(engine, metrics=pool_metrics):
+    @event.listens_for(engine, "checkout")
+    def _on_checkout(dbapi_connection, connection_record, connection_proxy):
+        connection_record.info["checked_out_at"] = time.perf_counter()
+
+    @event.listens_for(engine, "checkin")
+    def _on_checkin(dbapi_connection, connection_record):
+        started = connection_record.info.pop("checked_out_at", None)
+        if started is not None:
+            metrics.record_hold(time.perf_counter() - started)
+
+
+engine = create_engine(SQLALCHEMY_DATABASE_URL, **engine_options(SQLALCHEMY_DATABASE_URL))
+instrument_engine(engine)
+
+async_engine = create_async_engine(
+    ASYNC_DATABASE_URL, **engine_options(ASYNC_DATABASE_URL, InstrumentedAsyncQueuePool)
+)
+instrument_engine(async_engine.sync_engine, async_pool_metrics)
 
 print("✅ Connected DB:", engine.url)
 
-SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+
+class ReplicaSet:
+    """Round-robin over replica engines, skipping replicas that recently failed"""
+
+    def __init__(self, engines):
+        self.engines = list(engines)
+        self._cycle = itertools.cycle(range(len(self.engines))) if self.engines else None
+        self._lock = threading.Lock()
+        self._down_until = {}
+        self.reads = [0] * len(self.engines)
+        self.primary_reads = 0
+        self.fallbacks = 0
+
+    def choose(self):
+        """Return (index, engine) of a healthy replica, or None to use the primary"""
+        now = time.monotonic()
+        with self._lock:
+            for _ in range(len(self.engines)):
+                index = next(self._cycle)
+                if self._down_until.get(index, 0) <= now:
+                    self.reads[index] += 1
+                    return index, self.engines[index]
+            self.primary_reads += 1
+            return None
+
+    def mark_down(self, index: int):
+        with self._lock:
+            self._down_until[index] = time.monotonic() + REPLICA_RETRY_SECONDS
+            self.fallbacks += 1
+
+    def stats(self) -> dict:
+        now = time.monotonic()
+        return {
+            "replicas": [
+                {"url": engine.url.render_as_string(hide_password=True), "reads": self.reads[i],
+                 "down": self._down_until.get(i, 0) > now}
+                for i, engine in enumerate(self.engines)
+            ],
+            "primaryReads": self.primary_reads,
+            "fallbacks": self.fallbacks,
+            "readYourWritesSeconds": READ_YOUR_WRITES_SECONDS,
+        }
+
+
+def _replica_engines(is_async: bool):
+    for url in DATABASE_REPLICA_URLS:
+        if is_async:
+            async_url = async_database_url(url)
+            yield create_async_engine(async_url, **engine_options(async_url, AsyncAdaptedQueuePool)).sync_engine
+        else:
+            yield create_engine(url, **engine_options(url, QueuePool))
+
+replicas = ReplicaSet(_replica_engines(is_async=False))
+async_replicas = ReplicaSet(_replica_engines(is_async=True))
+
+# Per-request routing state, set by the HTTP middleware in main.py. Anything
+# outside a request (startup, background threads, WebSockets) uses the primary.
+_read_only = ContextVar("db_read_only", default=False)
+_principal = ContextVar("db_principal", default=None)
+
+# Principals that wrote recently, mapped to the time of the write
+_recent_writers = {}
+_recent_writers_lock = threading.Lock()
+
+
+def wrote_recently(principal: Optional[str]) -> bool:
+    if not principal:
+        return False
+    with _recent_writers_lock:
+        written_at = _recent_writers.get(principal)
+        if written_at is None:
+            return False
+        if time.monotonic() - written_at > READ_YOUR_WRITES_SECONDS:
+            del _recent_writers[principal]
+            return False
+        return True
+
+
+def _record_write(principal: Optional[str]):
+    if not principal:
+        return
+    now = time.monotonic()
+    with _recent_writers_lock:
+        _recent_writers[principal] = now
+        if len(_recent_writers) > 10000:
+            # Drop expired entries so the map stays bounded by active writers
+            for key in [k for k, t in _recent_writers.items() if now - t > READ_YOUR_WRITES_SECONDS]:
+                del _recent_writers[key]
+
+
+@contextmanager
+def route_reads(method: str, principal: Optional[str] = None):
+    """Allow replica reads for safe HTTP methods unless the principal just wrote"""
+    read_only = bool(replicas.engines) and method in ("GET", "HEAD") and not wrote_recently(principal)
+    read_token = _read_only.set(read_only)
+    principal_token = _principal.set(principal)
+    try:
+        yield
+    finally:
+        _read_only.reset(read_token)
+        _principal.reset(principal_token)
+
+
+class RoutingSession(Session):
+    """
+    Sends reads to a replica during read-only requests. Flushes, DML and
+    anything after the first write in a session go to the primary. A replica
+    that fails to answer is retried on another replica, or the primary.
+    """
+
+    replica_set = replicas
+
+    def get_bind(self, mapper=None, clause=None, **kw):
+        self.info.pop("replica", None)
+        if (
+            self.replica_set.engines
+            and _read_only.get()
+            and not self._flushing
+            and not self.info.get("wrote")
+            and not isinstance(clause, UpdateBase)
+        ):
+            choice = self.replica_set.choose()
+            if choice is not None:
+                self.info["replica"] = choice[0]
+                return choice[1]
+        return super().get_bind(mapper=mapper, clause=clause, **kw)
+
+    def _with_fallback(self, run, statement, *args, **kw):
+        try:
+            return run(statement, *args, **kw)
+        except (exc.OperationalError, exc.InterfaceError):
+            replica = self.info.pop("replica", None)
+            if replica is None:
+                raise
+            print(f"Read replica {replica} unavailable, retrying the read elsewhere")
+            self.replica_set.mark_down(replica)
+            return run(statement, *args, **kw)
+
+    def execute(self, statement, *args, **kw):
+        return self._with_fallback(super().execute, statement, *args, **kw)
+
+    def scalar(self, statement, *args, **kw):
+        return self._with_fallback(super().scalar, statement, *args, **kw)
+
+    def scalars(self, statement, *args, **kw):
+        return self._with_fallback(super().scalars, statement, *args, **kw)
+
+
+class AsyncRoutingSession(RoutingSession):
+    replica_set = async_replicas
+
+
+@event.listens_for(RoutingSession, "after_flush")
+def _mark_written(session, flush_context):
+    session.info["wrote"] = True
+
+@event.listens_for(RoutingSession, "do_orm_execute")
+def _mark_dml(orm_execute_state):
+    if orm_execute_state.is_update or orm_execute_state.is_delete or orm_execute_state.is_insert:
+        orm_execute_state.session.info["wrote"] = True
+
+@event.listens_for(RoutingSession, "after_commit")
+def _remember_writer(session):
+    # "wrote" stays set so reads after the commit in this session hit the primary too
+    if session.info.get("wrote"):
+        _record_write(_principal.get())
+
+
+SessionLocal = sessionmaker(class_=RoutingSession, autocommit=False, autoflush=False, bind=engine)
 Base = declarative_base()
 
+# expire_on_commit=False: async code cannot lazy-load expired attributes
+AsyncSessionLocal = async_sessionmaker(
+    async_engine, sync_session_class=AsyncRoutingSession, autoflush=False, expire_on_commit=False
+)
+
 def get_db():
     db = SessionLocal()
     try:
         yield db
     finally:
         db.close()
+
+async def get_async_db():
+    async with AsyncSessionLocal() as db:
+        yield db
+
+def pool_stats(target=None, metrics=pool_metrics) -> dict:
+    """Live pool occupancy plus checkout wait/hold metrics"""
+    pool = (target or engine).pool
+    stats = {"pool": pool.__class__.__name__, "status": pool.status()}
+    if isinstance(pool, QueuePool):
+        stats.update({
+            "size": pool.size(),
+            "checkedIn": pool.checkedin(),
+            "checkedOut": pool.checkedout(),
+            "overflow": pool.overflow(),
+            "timeoutSeconds": pool.timeout(),
+        })
+    stats.update(metrics.snapshot())
+    return stats
+
+def async_pool_stats() -> dict:
+    return pool_stats(async_engine.sync_engine, async_pool_metrics)
+
+def replica_stats() -> dict:
+    return {"sync": replicas.stats(), "async": async_replicas.stats()}
@@ -1,15 +1,15 @@
-from fastapi import FastAPI, Depends, WebSocket, WebSocketDisconnect
+from fastapi import FastAPI, Request, WebSocket, WebSocketDisconnect
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.staticfiles import StaticFiles
-from sqlalchemy.orm import Session
 import os
 
-from routers.admin import lawyers, clients, cases, dashboard, books, articles, payments, analytics, categories
+from routers.admin import lawyers, clients, cases, dashboard, books, articles, payments, analytics, categories, metrics, exports
 from routers.common import auth, appointments, upload, chat, ai, reviews
 
 from websocket_manager import manager
 import models
 import database
+import utils.rollups  # registers the rollup maintenance listener
 
 # Database
 models.Base.metadata.create_all(bind=database.engine)
@@ -20,7 +20,9 @@ if not os.path.exists("uploads"):
 # Default Admin
 def create_default_admin():
     db = database.SessionLocal()
-    from routers.common.auth import get_password_hash
+    from routers.common.auth import register_identity
+    from utils.hashing import pwd_context
+    from utils.rollups import ensure_rollups
     import uuid
     from datetime import datetime
     
@@ -31,13 +33,16 @@ def create_default_admin():
         default_admin = models.Admin(
             id=str(uuid.uuid4()),
             email=admin_email,
-            hashed_password=get_password_hash("admin123"),
+            # Hashed inline: this runs at import, before the hashing pool may be started
+            hashed_password=pwd_context.hash("admin123"),
             name="Super Admin",
             role="admin",
             createdAt=datetime.now().strftime("%Y-%m-%d")
         )
         db.add(default_admin)
+        register_identity(db, "admin", default_admin.id, default_admin.email)
         db.commit()
+    ensure_rollups(db)
     db.close()
 
 create_default_admin()
@@ -52,6 +57,59 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+def request_principal(request: Request):
+    """Who is asking, for read-your-writes routing; the token is verified later by the route"""
+    from jose import jwt, JWTError
+    authorization = request.headers.get("authorization", "")
+    if authorization.lower().startswith("bearer "):
+        try:
+            claims = jwt.get_unverified_claims(authorization[7:])
+            return f"{claims.get('role')}:{claims.get('sub')}"
+        except JWTError:
+            pass
+    return f"ip:{request.client.host}" if request.client else None
+
+if database.DATABASE_REPLICA_URLS:
+    @app.middleware("http")
+    async def route_database_reads(request: Request, call_next):
+        with database.route_reads(request.method, request_principal(request)):
+            return await call_next(request)
+
+@app.on_event("startup")
+def start_background_workers():
+    from routers.common.auth import revocation_list
+    from utils.email import outbox_sender
+    from utils.activity import activity_writer
+    revocation_list.start()
+    outbox_sender.start()
+    activity_writer.start()
+
+@app.on_event("shutdown")
+def stop_background_workers():
+    from routers.common.auth import revocation_list
+    from utils.email import outbox_sender
+    from utils.response_cache import response_cache
+    from utils.activity import activity_writer
+    from utils.hashing import hashing_service
+    revocation_list.stop()
+    outbox_sender.stop()
+    response_cache.stop()
+    activity_writer.stop()
+    # Otherwise the pool's worker processes outlive the server
+    hashing_service.shutdown()
+
+@app.on_event("startup")
+async def start_chat_workers():
+    from utils.chat_writer import message_writer
+    await manager.start()
+    message_writer.start()
+
+@app.on_event("shutdown")
+async def stop_chat_workers():
+    from utils.chat_writer import message_writer
+    await manager.stop()
+    await message_writer.stop()
+
 app.mount("/uploads", StaticFiles(directory="uploads"), name="uploads")
 
 # Common Routers
@@ -71,6 +129,8 @@ app.include_router(articles.router)
 app.include_router(payments.router)
 app.include_router(analytics.router)
 app.include_router(categories.router)
+app.include_router(metrics.router)
+app.include_router(exports.router)
 
 # Public Routers
 from routers import public_articles, public_lawyers
@@ -92,9 +152,22 @@ from routers.lawyer import dashboard as lawyer_dashboard
 app.include_router(lawyer_dashboard.router, prefix="/lawyer")
 
 @app.websocket("/ws/chat")
-async def chat_websocket(websocket: WebSocket, token: str = "", db: Session = Depends(database.get_db)):
-    """WebSocket endpoint for real-time chat"""
-    from routers.common.auth import SECRET_KEY, ALGORITHM
+async def chat_websocket(websocket: WebSocket, token: str = ""):
+    """
+    WebSocket endpoint for real-time chat. No database session is held while
+    the socket is open: a message opens a short-lived async session only when
+    its conversation's participants are not cached yet. Messages are stored
+    through the write-behind buffer; the sender gets an "ack" (or "error")
+    carrying its clientMessageId once the message is committed, and only
+    then is it relayed to the conversation.
+
+    Every message carries its conversation's sequence number. A reconnecting
+    socket sends {"type": "resume", "conversations": {id: last seen seq}} and
+    gets back one "replay" frame with just the messages it missed.
+    """
+    from routers.common.auth import SECRET_KEY, ALGORITHM, revocation_list, load_principal
+    from routers.common.chat import get_conversation_members, persist_message, message_event, messages_after
+    from websocket_manager import WS_REPLAY_LIMIT, WS_REPLAY_CONVERSATIONS
     from jose import jwt, JWTError
     import json
     
@@ -112,34 +185,98 @@ async def chat_websocket(websocket: WebSocket, token: str = "", db: Session = De
         if not user_id:
             await websocket.close(code=1008, reason="Invalid token")
             return
+        if payload.get("sid") and revocation_list.is_revoked(payload["sid"]):
+            await websocket.close(code=1008, reason="Session revoked")
+            return
     except Exception as e:
         print(f"WS Auth Error: {e}")
         await websocket.close(code=1008, reason="Authentication failed")
         return
 
-    await manager.connect(user_id, websocket, user_role, user_name)
+    # Display name stored with messages; the session connects only on a principal cache miss
+    async with database.AsyncSessionLocal() as db:
+        principal = await load_principal(db, user_role, user_name)
+    sender_name = getattr(principal, "name", None) or user_name
+
+    connection = await manager.connect(user_id, websocket, user_role, user_name)
     
     try:
         while True:
             data = await websocket.receive_text()
-            message_data = json.loads(data)
+            # A malformed frame is answered, not allowed to drop the socket
+            try:
+                message_data = json.loads(data)
+            except json.JSONDecodeError:
+                message_data = None
+            if not isinstance(message_data, dict):
+                manager.received(connection, None)
+                manager.send_to_socket(connection, {"type": "error", "detail": "Invalid frame"})
+                continue
+            manager.received(connection, message_data.get("type"))
             
             if message_data.get("type") == "message":
                 conversation_id = message_data.get("conversationId")
                 content = message_data.get("content")
+                client_message_id = message_data.get("clientMessageId")
+                if not isinstance(conversation_id, str) or not isinstance(content, str):
+                    manager.send_to_socket(connection, {
+                        "type": "error", "clientMessageId": client_message_id, "detail": "Message rejected"
+                    })
+                    continue
                 
-                conversation = db.query(models.Conversation).filter(models.Conversation.id == conversation_id).first()
-                if conversation:
-                    other_id = conversation.lawyerId if user_role == "client" else conversation.clientId
-                    await manager.send_to_conversation({
-                        "type": "message",
-                        "conversationId": conversation_id,
-                        "senderId": user_id,
-                        "content": content,
-                        "timestamp": message_data.get("timestamp")
-                    }, [user_id, other_id])
+                # Cached after the first lookup, so routing usually needs no query
+                members = await get_conversation_members(conversation_id)
+                if not members or user_id not in members or not content:
+                    manager.send_to_socket(connection, {
+                        "type": "error", "clientMessageId": client_message_id, "detail": "Message rejected"
+                    })
+                    continue
+                try:
+                    message = await persist_message(conversation_id, members, user_id, user_role, sender_name, content)
+                except Exception:
+                    manager.send_to_socket(connection, {
+                        "type": "error", "clientMessageId": client_message_id, "detail": "Message could not be saved"
+                    })
+                    continue
+                event = message_event(message)
+                manager.send_to_socket(connection, {
+                    "type": "ack", "clientMessageId": client_message_id, "messageId": event["messageId"],
+                    "seq": event["seq"], "timestamp": event["timestamp"]
+                })
+
+                client_id, lawyer_id = members
+                other_id = lawyer_id if user_role == "client" else client_id
+                await manager.send_to_conversation(event, [user_id, other_id])
+
+            elif message_data.get("type") == "resume":
+                last_seen = message_data.get("conversations") or {}
+                if not isinstance(last_seen, dict):
+                    manager.send_to_socket(connection, {
+                        "type": "error", "detail": "conversations must map conversation ids to sequence numbers"
+                    })
+                    continue
+                replay = []
+                # One short-lived session for the whole resume; each gap is an indexed range scan
+                async with database.AsyncSessionLocal() as db:
+                    for index, (conversation_id, after_seq) in enumerate(last_seen.items()):
+                        if index >= WS_REPLAY_CONVERSATIONS:
+                            replay.append({"conversationId": conversation_id, "messages": [], "complete": False})
+                            continue
+                        members = await get_conversation_members(conversation_id, db)
+                        if not members or user_id not in members or not isinstance(after_seq, int):
+                            continue
+                        missed = await messages_after(db, conversation_id, after_seq, WS_REPLAY_LIMIT + 1)
+                        replay.append({
+                            "conversationId": conversation_id,
+                            "messages": [message_event(message) for message in missed[:WS_REPLAY_LIMIT]],
+                            "complete": len(missed) <= WS_REPLAY_LIMIT,
+                        })
+                manager.send_to_socket(connection, {"type": "replay", "conversations": replay})
     except WebSocketDisconnect:
-        manager.disconnect(user_id) 
+        pass
+    finally:
+        # Only this socket; the user's other tabs stay connected
+        await manager.disconnect(user_id, websocket)
     
 @app.get("/")
 def read_root():
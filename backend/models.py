@@ -1,4 +1,4 @@
-from sqlalchemy import Boolean, Column, ForeignKey, Integer, String, Float, JSON
+from sqlalchemy import Boolean, Column, Date, DateTime, ForeignKey, Index, Integer, String, Float, JSON
 from sqlalchemy.orm import relationship
 from database import Base
 
@@ -34,6 +34,28 @@ class Admin(Base):
     name = Column(String)
     createdAt = Column(String)
 
+# (email, role) -> owning account index, so login resolves a user with one
+# lookup; the same email may hold an account under several roles
+class Identity(Base):
+    __tablename__ = "identities"
+
+    email = Column(String, primary_key=True, index=True)
+    role = Column(String, primary_key=True)  # 'admin', 'lawyer' or 'client'
+    userId = Column(String, index=True)
+
+# Refresh-token sessions; access tokens carry the session id as "sid"
+class AuthSession(Base):
+    __tablename__ = "sessions"
+
+    id = Column(String, primary_key=True, index=True)
+    userId = Column(String, index=True)
+    role = Column(String)
+    refreshTokenHash = Column(String)  # sha256 of the refresh secret
+    createdAt = Column(DateTime)  # UTC
+    expiresAt = Column(DateTime)
+    revoked = Column(Boolean, default=False)
+    revokedAt = Column(DateTime, nullable=True, index=True)
+
 class Lawyer(Base):
     __tablename__ = "lawyers"
 
@@ -60,6 +82,13 @@ class Lawyer(Base):
 
 class Case(Base):
     __tablename__ = "cases"
+    __table_args__ = (
+        # Dashboards and case lists filter by owner and status
+        Index("ix_cases_lawyer_status", "lawyerId", "status"),
+        Index("ix_cases_client_status", "clientId", "status"),
+        # Date-range aggregation in admin analytics
+        Index("ix_cases_created_at", "createdAt"),
+    )
 
     id = Column(String, primary_key=True, index=True)
     title = Column(String, index=True)
@@ -68,13 +97,18 @@ class Case(Base):
     status = Column(String)
     stage = Column(String)
     priority = Column(String)
-    createdAt = Column(String)
+    createdAt = Column(Date)
     nextHearing = Column(String, nullable=True)
     description = Column(String, nullable=True)
     documents = Column(JSON)
 
 class Appointment(Base):
     __tablename__ = "appointments"
+    __table_args__ = (
+        # Pending / upcoming appointment counts on the dashboards
+        Index("ix_appointments_lawyer_status_date", "lawyerid", "status", "date"),
+        Index("ix_appointments_client_date", "clientid", "date"),
+    )
 
     id = Column(String, primary_key=True, index=True)
     clientName = Column(String)
@@ -82,7 +116,7 @@ class Appointment(Base):
     # Map python 'lawyerId' to db 'lawyerid' to handle postgres case folding
     lawyerId = Column("lawyerid", String, index=True)
     clientId = Column("clientid", String, index=True)
-    date = Column(String)
+    date = Column(Date)
     time = Column(String)
     type = Column(String)
     status = Column(String)
@@ -90,6 +124,12 @@ class Appointment(Base):
 
 class Payment(Base):
     __tablename__ = "payments"
+    __table_args__ = (
+        # Purchase / access checks in client/books.py
+        Index("ix_payments_client_type_status_item", "clientName", "type", "status", "itemId"),
+        # Revenue by period; on Postgres the amounts ride along for index-only scans
+        Index("ix_payments_status_date", "status", "date", postgresql_include=["amount", "platformFee"]),
+    )
 
     id = Column(String, primary_key=True, index=True)
     clientName = Column(String)
@@ -97,7 +137,7 @@ class Payment(Base):
     amount = Column(Float)
     type = Column(String)
     status = Column(String)
-    date = Column(String)
+    date = Column(Date)
     platformFee = Column(Float)
     itemId = Column(String, nullable=True)  # Track which book/item was purchased
 
@@ -151,7 +191,21 @@ class PasswordReset(Base):
     id = Column(Integer, primary_key=True, index=True)
     email = Column(String, index=True)
     otp = Column(String)
-    expires_at = Column(String) # ISO format datetime
+    expires_at = Column(DateTime)
+
+class EmailOutbox(Base):
+    __tablename__ = "email_outbox"
+
+    id = Column(Integer, primary_key=True, index=True)
+    toEmail = Column(String)
+    subject = Column(String)
+    body = Column(String)
+    status = Column(String, index=True)  # 'pending', 'sending', 'sent', 'failed'
+    attempts = Column(Integer, default=0)
+    nextAttemptAt = Column(DateTime, index=True)  # UTC; lease expiry while 'sending'
+    lastError = Column(String, nullable=True)
+    createdAt = Column(DateTime)  # UTC
+    sentAt = Column(DateTime, nullable=True)
 
 class Conversation(Base):
     __tablename__ = "conversations"
@@ -165,10 +219,19 @@ class Conversation(Base):
     lastMessageAt = Column(String, nullable=True)
     unreadByClient = Column(Integer, default=0)
     unreadByLawyer = Column(Integer, default=0)
+    # Sequence number of the newest message, handed out by the chat writer
+    lastSeq = Column(Integer, default=0)
     createdAt = Column(String)
 
 class Message(Base):
     __tablename__ = "messages"
+    __table_args__ = (
+        # Chat history in timestamp order, and the unread scan in mark_as_read
+        Index("ix_messages_conversation_timestamp", "conversationId", "timestamp"),
+        Index("ix_messages_conversation_read_sender", "conversationId", "read", "senderId"),
+        # Replay of the messages a reconnecting socket missed: a range scan past its last seq
+        Index("ix_messages_conversation_seq", "conversationId", "seq", unique=True),
+    )
 
     id = Column(String, primary_key=True, index=True)
     conversationId = Column(String, index=True)
@@ -176,8 +239,10 @@ class Message(Base):
     senderRole = Column(String)  # 'client' or 'lawyer'
     senderName = Column(String)
     content = Column(String)
-    timestamp = Column(String)
+    timestamp = Column(DateTime)
     read = Column(Boolean, default=False)
+    # 1, 2, 3... within the conversation, in commit order
+    seq = Column(Integer, nullable=True)
 
 class Order(Base):
     __tablename__ = "orders"
@@ -191,7 +256,7 @@ class Order(Base):
     paymentMethod = Column(String, name="paymentmethod", nullable=True)
     fullName = Column(String, name="fullname", nullable=True)
     phoneNumber = Column(String, name="phonenumber", nullable=True)
-    createdAt = Column(String)
+    createdAt = Column(DateTime)
 
 
 
@@ -205,3 +270,43 @@ class Review(Base):
     rating = Column(Integer)
     image = Column(String, nullable=True)
     createdAt = Column(String, nullable=True)
+
+# Rollups maintained by utils/rollups.py in the same transaction as the
+# source writes; scripts/rebuild_rollups.py recomputes them from scratch.
+class DailyTotals(Base):
+    __tablename__ = "daily_totals"
+
+    day = Column(Date, primary_key=True)
+    revenue = Column(Float, default=0, nullable=False)  # completed payments
+    platformFees = Column(Float, default=0, nullable=False)
+    payments = Column(Integer, default=0, nullable=False)
+    orderRevenue = Column(Float, default=0, nullable=False)  # completed orders
+    orders = Column(Integer, default=0, nullable=False)
+    newCases = Column(Integer, default=0, nullable=False)
+
+class CaseStatusCount(Base):
+    __tablename__ = "case_status_counts"
+
+    status = Column(String, primary_key=True)
+    priority = Column(String, primary_key=True)
+    count = Column(Integer, default=0, nullable=False)
+
+class AppointmentStatusCount(Base):
+    __tablename__ = "appointment_status_counts"
+
+    status = Column(String, primary_key=True)
+    count = Column(Integer, default=0, nullable=False)
+
+class ActivityEvent(Base):
+    # Append-only; written in batches by utils/activity.py
+    __tablename__ = "activity_events"
+    __table_args__ = (
+        # Keyset pagination for the admin feed: newest first, id breaks ties
+        Index("ix_activity_events_created_at_id", "createdAt", "id"),
+    )
+
+    id = Column(Integer, primary_key=True)
+    createdAt = Column(DateTime, nullable=False)
+    type = Column(String)  # 'case', 'payment', 'appointment', 'verification'
+    text = Column(String)
+    subjectId = Column(String, nullable=True)
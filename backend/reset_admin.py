@@ -6,7 +6,7 @@ sys.path.append(os.path.dirname(os.path.abspath(__file__)))
 
 import database
 import models
-from routers.common.auth import get_password_hash
+from routers.common.auth import get_password_hash, register_identity
 import uuid
 from datetime import datetime
 
@@ -34,6 +34,7 @@ def reset_admin():
             createdAt=datetime.now().strftime("%Y-%m-%d")
         )
         db.add(new_admin)
+        register_identity(db, "admin", new_admin.id, new_admin.email)
         db.commit()
         print("Default admin created successfully.")
     
@@ -1,9 +1,14 @@
-from fastapi import APIRouter, Depends
+from fastapi import APIRouter, Depends, Query
 from sqlalchemy.orm import Session
-from sqlalchemy import func
+from sqlalchemy import func, case
+from datetime import date
+from typing import Optional
 import models, database
 from routers.common.auth import get_current_admin
-from datetime import datetime
+from utils.response_cache import response_cache
+from utils.periods import (
+    GRANULARITY_PATTERN, as_date, bucket_expression, bucket_label, iter_buckets, resolve_range
+)
 
 router = APIRouter(
     prefix="/analytics",
@@ -11,35 +16,44 @@ router = APIRouter(
     dependencies=[Depends(get_current_admin)]
 )
 
+def _period_series(from_date, to_date, granularity, **fields):
+    """Zero-filled buckets keyed by start date; "month" keeps the chart label"""
+    return {
+        start: {"month": bucket_label(start, granularity, from_date, to_date), "period": start.isoformat(), **fields}
+        for start in iter_buckets(from_date, to_date, granularity)
+    }
+
+def _grouped(db: Session, column, granularity: str, *aggregates, filters=()):
+    """Rows of (bucket start, *aggregates) grouped in the database"""
+    bucket = bucket_expression(column, granularity, db.get_bind().dialect.name)
+    rows = db.query(bucket, *aggregates).filter(*filters).group_by(bucket).all()
+    return [(as_date(row[0]), *row[1:]) for row in rows]
+
 @router.get("/performance")
-def get_performance_data(db: Session = Depends(database.get_db)):
-    # Initialize months map
-    months = ["Jan", "Feb", "Mar", "Apr", "May", "Jun"]
-    data = {m: {"month": m, "cases": 0, "revenue": 0, "lawyers": 0, "clients": 0} for m in months}
+@response_cache.cached("analytics:performance", ttl=60, tables=("payments", "cases", "lawyers", "clients"))
+def get_performance_data(
+    from_date: Optional[date] = Query(None, alias="from"),
+    to_date: Optional[date] = Query(None, alias="to"),
+    granularity: str = Query("month", pattern=GRANULARITY_PATTERN),
+    db: Session = Depends(database.get_db)
+):
+    from_date, to_date = resolve_range(from_date, to_date, granularity)
+    data = _period_series(from_date, to_date, granularity, cases=0, revenue=0, lawyers=0, clients=0)
     
     # 1. Revenue from payments
-    payments = db.query(models.Payment).filter(models.Payment.status == "completed").all()
-    for p in payments:
-        # Simplistic date parsing, assuming YYYY-MM-DD
-        try:
-            date_obj = datetime.strptime(p.date, "%Y-%m-%d")
-            month_name = date_obj.strftime("%b")
-            if month_name in data:
-                data[month_name]["revenue"] += p.amount
-        except:
-            pass
+    for start, revenue in _grouped(
+        db, models.Payment.date, granularity, func.sum(models.Payment.amount),
+        filters=(models.Payment.status == "completed",
+                 models.Payment.date >= from_date, models.Payment.date <= to_date)
+    ):
+        data[start]["revenue"] = revenue or 0
             
     # 2. Cases count
-    cases = db.query(models.Case).all()
-    for c in cases:
-        try:
-             # Assuming YYYY-MM-DD or similar
-             date_obj = datetime.strptime(c.createdAt, "%Y-%m-%d")
-             month_name = date_obj.strftime("%b")
-             if month_name in data:
-                 data[month_name]["cases"] += 1
-        except:
-            pass
+    for start, cases in _grouped(
+        db, models.Case.createdAt, granularity, func.count(),
+        filters=(models.Case.createdAt >= from_date, models.Case.createdAt <= to_date)
+    ):
+        data[start]["cases"] = cases
             
     # Fill in lawyer/client counts (cumulative merely for trend)
     # Using total counts for now as distinct monthly active is harder without logs
@@ -54,33 +68,50 @@ def get_performance_data(db: Session = Depends(database.get_db)):
         
     return result
 
+LAWYER_SORT_PATTERN = "^(cases|rating|name)$"
+
 @router.get("/lawyer-performance")
-def get_lawyer_performance(db: Session = Depends(database.get_db)):
-    lawyers = db.query(models.Lawyer).all()
-    result = []
-    
-    for lawyer in lawyers:
-        # Calculate success rate from rating (5.0 = 100%)
-        success_rate = int((lawyer.rating / 5.0) * 100) if lawyer.rating else 85
-        
-        # Real cases count
-        case_count = db.query(models.Case).filter(models.Case.lawyerId == lawyer.id).count()
-        # Fallback to model field if query is 0 (migration issue)
-        final_cases = case_count if case_count > 0 else (lawyer.casesHandled or 0)
+@response_cache.cached("analytics:lawyer-performance", ttl=60, tables=("lawyers", "cases"))
+def get_lawyer_performance(
+    skip: int = Query(0, ge=0),
+    limit: int = Query(10, ge=1, le=100),
+    sort_by: str = Query("cases", pattern=LAWYER_SORT_PATTERN),
+    order: str = Query("desc", pattern="^(asc|desc)$"),
+    db: Session = Depends(database.get_db)
+):
+    # Case counts for every lawyer in one grouped query instead of one COUNT per lawyer
+    case_counts = db.query(
+        models.Case.lawyerId.label("lawyerId"),
+        func.count().label("caseCount")
+    ).group_by(models.Case.lawyerId).subquery()
+
+    # Fallback to model field if query is 0 (migration issue)
+    cases = case(
+        (func.coalesce(case_counts.c.caseCount, 0) > 0, case_counts.c.caseCount),
+        else_=func.coalesce(models.Lawyer.casesHandled, 0)
+    ).label("cases")
+
+    sort_column = {"cases": cases, "rating": models.Lawyer.rating, "name": models.Lawyer.name}[sort_by]
+    sort_column = (sort_column.desc() if order == "desc" else sort_column.asc()).nulls_last()
+
+    rows = db.query(models.Lawyer.name, models.Lawyer.rating, cases).outerjoin(
+        case_counts, case_counts.c.lawyerId == models.Lawyer.id
+    ).order_by(sort_column, models.Lawyer.id).offset(skip).limit(limit).all()
 
-        result.append({
-            "name": lawyer.name,
-            "cases": final_cases,
-            "successRate": success_rate,
+    return [
+        {
+            "name": row.name,
+            "cases": row.cases,
+            # Calculate success rate from rating (5.0 = 100%)
+            "successRate": int((row.rating / 5.0) * 100) if row.rating else 85,
             "avgResponse": 2.4, # Placeholder
-            "performance": lawyer.rating or 4.0
-        })
-        
-    # Sort by cases handled
-    result.sort(key=lambda x: x["cases"], reverse=True)
-    return result[:10] # Top 10
+            "performance": row.rating or 4.0
+        }
+        for row in rows
+    ]
 
 @router.get("/metrics")
+@response_cache.cached("analytics:metrics", ttl=60, tables=("clients", "lawyers"))
 def get_metrics(db: Session = Depends(database.get_db)):
     active_clients = db.query(models.Client).filter(models.Client.status == 'active').count()
     total_clients = db.query(models.Client).count() 
@@ -98,23 +129,26 @@ def get_metrics(db: Session = Depends(database.get_db)):
     }
 
 @router.get("/revenue-breakdown")
-def get_revenue_breakdown(db: Session = Depends(database.get_db)):
-    # Group by month
-    months = ["Jan", "Feb", "Mar", "Apr", "May", "Jun"]
-    data = {m: {"month": m, "platform": 0, "lawyers": 0, "total": 0} for m in months}
+@response_cache.cached("analytics:revenue-breakdown", ttl=60, tables=("payments",))
+def get_revenue_breakdown(
+    from_date: Optional[date] = Query(None, alias="from"),
+    to_date: Optional[date] = Query(None, alias="to"),
+    granularity: str = Query("month", pattern=GRANULARITY_PATTERN),
+    db: Session = Depends(database.get_db)
+):
+    from_date, to_date = resolve_range(from_date, to_date, granularity)
+    data = _period_series(from_date, to_date, granularity, platform=0, lawyers=0, total=0)
     
-    payments = db.query(models.Payment).filter(models.Payment.status == "completed").all()
-    for p in payments:
-        try:
-            date_obj = datetime.strptime(p.date, "%Y-%m-%d")
-            month_name = date_obj.strftime("%b")
-            if month_name in data:
-                data[month_name]["total"] += p.amount
-                data[month_name]["platform"] += (p.platformFee or 0)
-                # Lawyer gets remainder
-                data[month_name]["lawyers"] += (p.amount - (p.platformFee or 0))
-        except:
-            pass
+    for start, total, platform in _grouped(
+        db, models.Payment.date, granularity,
+        func.sum(models.Payment.amount), func.sum(func.coalesce(models.Payment.platformFee, 0)),
+        filters=(models.Payment.status == "completed",
+                 models.Payment.date >= from_date, models.Payment.date <= to_date)
+    ):
+        data[start]["total"] = total or 0
+        data[start]["platform"] = platform or 0
+        # Lawyer gets remainder
+        data[start]["lawyers"] = (total or 0) - (platform or 0)
             
     return list(data.values())
 
@@ -12,6 +12,7 @@ import uuid
 from datetime import datetime
 
 from routers.common.auth import get_current_user # Import here or top level if no circular dep
+from utils.activity import record_activity
 
 @router.get("/", response_model=List[schemas.Case])
 def read_cases(skip: int = 0, limit: int = 100, db: Session = Depends(database.get_db), current_user = Depends(get_current_user)):
@@ -43,6 +44,7 @@ def create_case(case: schemas.CaseBase, db: Session = Depends(database.get_db),
             
         db_case = models.Case(**data, id=str(uuid.uuid4()))
         db.add(db_case)
+        record_activity(db, "case", f"New case created: {db_case.title}", db_case.id)
         db.commit()
         db.refresh(db_case)
         
@@ -59,8 +61,11 @@ def update_case(case_id: str, case: schemas.CaseUpdate, db: Session = Depends(da
     if db_case is None:
         raise HTTPException(status_code=404, detail="Case not found")
     
+    previous_status = db_case.status
     for key, value in case.dict(exclude_unset=True).items():
         setattr(db_case, key, value)
+    if db_case.status != previous_status:
+        record_activity(db, "case", f"Case {db_case.title} moved to {db_case.status}", db_case.id)
     
     db.commit()
     db.refresh(db_case)
@@ -2,7 +2,10 @@ from fastapi import APIRouter, Depends, HTTPException
 from sqlalchemy.orm import Session
 from typing import List
 import models, schemas, database
-from routers.common.auth import get_password_hash, get_current_admin, get_current_user
+from routers.common.auth import (
+    get_password_hash, get_current_admin, get_current_user, invalidate_principal,
+    identity_exists, register_identity, rename_identity, remove_identity, revoke_user_sessions, token_response
+)
 from datetime import datetime
 import uuid
 
@@ -33,8 +36,12 @@ def read_client(client_id: str, db: Session = Depends(database.get_db), current_
 
 @router.post("/", response_model=schemas.Client)
 def create_client(client: schemas.ClientBase, db: Session = Depends(database.get_db), current_user = Depends(get_current_admin)):
+    if identity_exists(db, client.email, "client"):
+        raise HTTPException(status_code=400, detail="Email already registered")
+
     db_client = models.Client(**client.dict(), id=str(uuid.uuid4()))
     db.add(db_client)
+    register_identity(db, "client", db_client.id, db_client.email)
     db.commit()
     db.refresh(db_client)
     return db_client
@@ -57,11 +64,15 @@ def update_client(client_id: str, client: schemas.ClientUpdate, db: Session = De
         for field in sensitive_fields:
             update_data.pop(field, None)
 
+    previous_email = db_client.email
+    rename_identity(db, "client", previous_email, update_data.get("email"))
     for key, value in update_data.items():
         setattr(db_client, key, value)
     
     db.commit()
     db.refresh(db_client)
+    invalidate_principal("client", previous_email)
+    invalidate_principal("client", db_client.email)
     return db_client
 
 @router.delete("/{client_id}")
@@ -70,15 +81,18 @@ def delete_client(client_id: str, db: Session = Depends(database.get_db), curren
     if db_client is None:
         raise HTTPException(status_code=404, detail="Client not found")
     
+    email = db_client.email
     db.delete(db_client)
+    remove_identity(db, "client", email)
+    revoke_user_sessions(db, client_id)
     db.commit()
+    invalidate_principal("client", email)
     return {"ok": True}
 
 @router.post("/register", response_model=schemas.Token)
 def register_client(client: schemas.ClientRegistration, db: Session = Depends(database.get_db)):
     print(f"DEBUG: register_client called with {client.email}")
-    db_client = db.query(models.Client).filter(models.Client.email == client.email).first()
-    if db_client:
+    if identity_exists(db, client.email, "client"):
         raise HTTPException(status_code=400, detail="Email already registered")
     
     hashed_password = get_password_hash(client.password)
@@ -98,17 +112,9 @@ def register_client(client: schemas.ClientRegistration, db: Session = Depends(da
     )
     
     db.add(new_client)
+    register_identity(db, "client", new_client.id, new_client.email)
     db.commit()
     db.refresh(new_client)
     
     # Auto login
-    from routers.common.auth import create_access_token, ACCESS_TOKEN_EXPIRE_MINUTES
-    from datetime import timedelta
-    
-    access_token_expires = timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES)
-    access_token = create_access_token(
-        data={"sub": new_client.email, "role": "client", "id": new_client.id}, 
-        expires_delta=access_token_expires
-    )
-    
-    return {"access_token": access_token, "token_type": "bearer"}
+    return token_response(db, new_client, "client")
@@ -1,7 +1,13 @@
-from fastapi import APIRouter, Depends
+from fastapi import APIRouter, Depends, HTTPException, Query, Response
 from sqlalchemy.orm import Session
+from sqlalchemy import func, select, tuple_
+from datetime import date, datetime
+from typing import Optional
+import base64
 import models, database
 from routers.common.auth import get_current_admin
+from utils.response_cache import response_cache
+from utils.periods import as_date, bucket_expression, bucket_label, iter_buckets, resolve_range
 
 router = APIRouter(
     prefix="/dashboard",
@@ -9,57 +15,121 @@ router = APIRouter(
     dependencies=[Depends(get_current_admin)]
 )
 
+# Case, appointment and revenue figures come from the rollup tables kept by
+# utils/rollups.py, so each endpoint reads a handful of small rows instead of
+# counting the source tables on every page load.
+
+def _status_counts(db: Session, model):
+    return dict(db.query(model.status, func.sum(model.count)).group_by(model.status).all())
+
 @router.get("/stats")
+@response_cache.cached("dashboard:stats", ttl=10, tables=("lawyers", "clients", "cases", "appointments", "payments", "orders"))
 def get_stats(db: Session = Depends(database.get_db)):
-    lawyers_count = db.query(models.Lawyer).count()
-    users_count = db.query(models.Client).count() + lawyers_count
-    pending_requests = db.query(models.Lawyer).filter(models.Lawyer.status == 'pending').count()
-    revenue_month = 45320 # Using mock value as dynamic calculation needs more transaction data
-    upcoming_appointments = db.query(models.Appointment).filter(models.Appointment.status == 'approved').count()
-    pending_client_requests = db.query(models.Appointment).filter(models.Appointment.status == 'pending').count()
+    people = db.query(
+        select(func.count()).select_from(models.Lawyer).scalar_subquery(),
+        select(func.count()).select_from(models.Client).scalar_subquery(),
+        select(func.count()).select_from(models.Lawyer).where(models.Lawyer.status == 'pending').scalar_subquery()
+    ).one()
+    lawyers_count, clients_count, pending_requests = people
+    case_counts = _status_counts(db, models.CaseStatusCount)
+    appointment_counts = _status_counts(db, models.AppointmentStatusCount)
+    revenue_month = db.query(
+        func.sum(models.DailyTotals.revenue + models.DailyTotals.orderRevenue)
+    ).filter(models.DailyTotals.day >= date.today().replace(day=1)).scalar() or 0
 
     return {
-        "active_cases": db.query(models.Case).filter(models.Case.status != 'closed').count(),
-        "total_users": users_count,
+        "active_cases": sum(count for status, count in case_counts.items() if status not in ('closed', '')),  # NULL status is stored as ''
+        "total_users": clients_count + lawyers_count,
         "pending_requests": pending_requests,
         "revenue_month": revenue_month,
-        "upcoming_appointments": upcoming_appointments,
-        "pending_client_requests": pending_client_requests
+        "upcoming_appointments": appointment_counts.get('approved', 0),
+        "pending_client_requests": appointment_counts.get('pending', 0)
     }
 
 @router.get("/revenue")
-def get_revenue():
-    # Mock data for charts
-    return [
-        { "month": 'Jan', "revenue": 32000, "cases": 45 },
-        { "month": 'Feb', "revenue": 38000, "cases": 52 },
-        { "month": 'Mar', "revenue": 35000, "cases": 48 },
-        { "month": 'Apr', "revenue": 42000, "cases": 61 },
-        { "month": 'May', "revenue": 39000, "cases": 55 },
-        { "month": 'Jun', "revenue": 45000, "cases": 67 }
-    ]
+@response_cache.cached("dashboard:revenue", ttl=60, tables=("cases", "payments", "orders"))
+def get_revenue(db: Session = Depends(database.get_db)):
+    # Last six months of payment and shop revenue, with new cases per month
+    from_date, to_date = resolve_range(None, None, "month")
+    data = {
+        start: {"month": bucket_label(start, "month", from_date, to_date), "revenue": 0, "cases": 0}
+        for start in iter_buckets(from_date, to_date, "month")
+    }
+    bucket = bucket_expression(models.DailyTotals.day, "month", db.get_bind().dialect.name)
+    rows = db.query(
+        bucket,
+        func.sum(models.DailyTotals.revenue + models.DailyTotals.orderRevenue),
+        func.sum(models.DailyTotals.newCases)
+    ).filter(
+        models.DailyTotals.day >= from_date, models.DailyTotals.day <= to_date
+    ).group_by(bucket).all()
+    for start, revenue, cases in rows:
+        data[as_date(start)].update(revenue=revenue or 0, cases=cases or 0)
+    return list(data.values())
 
 @router.get("/case-status")
+@response_cache.cached("dashboard:case-status", ttl=10, tables=("cases",))
 def get_case_status(db: Session = Depends(database.get_db)):
-    # Simple aggregation
-    in_progress = db.query(models.Case).filter(models.Case.status == 'in-progress').count()
-    pending = db.query(models.Case).filter(models.Case.status == 'open').count() # mapping open -> pending for chart
-    closed = db.query(models.Case).filter(models.Case.status == 'closed').count()
-    urgent = db.query(models.Case).filter(models.Case.priority == 'high').count()
+    rows = db.query(models.CaseStatusCount).all()
+    by_status = {}
+    for row in rows:
+        by_status[row.status] = by_status.get(row.status, 0) + row.count
+    urgent = sum(row.count for row in rows if row.priority == 'high')
 
     return [
-        { "name": 'In Progress', "value": in_progress, "color": '#3B82F6' },
-        { "name": 'Pending', "value": pending, "color": '#F59E0B' },
-        { "name": 'Closed', "value": closed, "color": '#10B981' },
+        { "name": 'In Progress', "value": by_status.get('in-progress', 0), "color": '#3B82F6' },
+        { "name": 'Pending', "value": by_status.get('open', 0), "color": '#F59E0B' }, # mapping open -> pending for chart
+        { "name": 'Closed', "value": by_status.get('closed', 0), "color": '#10B981' },
         { "name": 'Urgent', "value": urgent, "color": '#EF4444' }
     ]
 
+def _time_ago(moment: datetime) -> str:
+    seconds = max(int((datetime.now() - moment).total_seconds()), 0)
+    for unit, size in (("day", 86400), ("hour", 3600), ("minute", 60)):
+        if seconds >= size:
+            count = seconds // size
+            return f"{count} {unit}{'s' if count > 1 else ''} ago"
+    return "just now"
+
+def _encode_cursor(event: models.ActivityEvent) -> str:
+    raw = f"{event.createdAt.isoformat()}|{event.id}"
+    return base64.urlsafe_b64encode(raw.encode()).decode()
+
+def _decode_cursor(cursor: str):
+    try:
+        created_at, event_id = base64.urlsafe_b64decode(cursor.encode()).decode().split("|")
+        return datetime.fromisoformat(created_at), int(event_id)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
 @router.get("/recent-activity")
-def get_recent_activity():
-    # Hardcoded for now as we don't have an activity log table developed yet
+def get_recent_activity(
+    response: Response,
+    limit: int = Query(10, ge=1, le=100),
+    cursor: Optional[str] = None,
+    db: Session = Depends(database.get_db)
+):
+    # Keyset pagination on (createdAt, id): each page is one index range scan,
+    # however deep the feed goes. The next page's cursor is in X-Next-Cursor.
+    query = db.query(models.ActivityEvent)
+    if cursor:
+        query = query.filter(
+            tuple_(models.ActivityEvent.createdAt, models.ActivityEvent.id) < _decode_cursor(cursor)
+        )
+    events = query.order_by(
+        models.ActivityEvent.createdAt.desc(), models.ActivityEvent.id.desc()
+    ).limit(limit + 1).all()
+
+    if len(events) > limit:
+        events = events[:limit]
+        response.headers["X-Next-Cursor"] = _encode_cursor(events[-1])
     return [
-        { "text": "New case assigned to Sarah Johnson", "time": "2 hours ago", "type": "case" },
-        { "text": "Payment received from John Smith", "time": "4 hours ago", "type": "payment" },
-        { "text": "Appointment scheduled for tomorrow", "time": "6 hours ago", "type": "appointment" },
-        { "text": "New lawyer verification completed", "time": "8 hours ago", "type": "verification" }
+        {
+            "id": event.id,
+            "text": event.text,
+            "time": _time_ago(event.createdAt),
+            "type": event.type,
+            "createdAt": event.createdAt.isoformat()
+        }
+        for event in events
     ]
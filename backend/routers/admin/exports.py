@@ -0,0 +1,197 @@
+from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi.responses import StreamingResponse
+from sqlalchemy import select, Boolean, Date, DateTime, Float, Integer, JSON
+from datetime import date, timedelta
+from typing import Optional
+import csv
+import io
+import json
+import os
+import models, database
+from routers.common.auth import get_current_admin
+
+router = APIRouter(
+    prefix="/exports",
+    tags=["exports"],
+    dependencies=[Depends(get_current_admin)]
+)
+
+# Rows fetched per round trip from the server-side cursor; memory use is
+# bounded by one batch regardless of the export size
+EXPORT_BATCH_ROWS = int(os.getenv("EXPORT_BATCH_ROWS", "5000"))
+
+# dataset -> (model, column filtered by the date range)
+DATASETS = {
+    "payments": (models.Payment, models.Payment.date),
+    "orders": (models.Order, models.Order.createdAt),
+    "cases": (models.Case, models.Case.createdAt),
+    "appointments": (models.Appointment, models.Appointment.date),
+}
+
+MEDIA_TYPES = {
+    "parquet": "application/vnd.apache.parquet",
+    "arrow": "application/vnd.apache.arrow.stream",
+    "csv": "text/csv",
+}
+
+def _pyarrow():
+    try:
+        import pyarrow  # optional dependency, only needed for Parquet / Arrow exports
+        import pyarrow.parquet
+        return pyarrow
+    except ImportError:
+        return None
+
+def _columns(model):
+    """(output name, column) pairs, named by model attribute rather than database column"""
+    return [(attr.key, attr.columns[0]) for attr in model.__mapper__.column_attrs]
+
+def _arrow_type(pa, column):
+    if isinstance(column.type, Boolean):
+        return pa.bool_()
+    if isinstance(column.type, Integer):
+        return pa.int64()
+    if isinstance(column.type, Float):
+        return pa.float64()
+    if isinstance(column.type, DateTime):
+        return pa.timestamp("us")
+    if isinstance(column.type, Date):
+        return pa.date32()
+    return pa.string()  # strings, and JSON serialised as text
+
+def _rows(dataset: str, from_date: Optional[date], to_date: Optional[date]):
+    """Yield lists of row tuples, one server-side cursor batch at a time"""
+    model, date_column = DATASETS[dataset]
+    columns = _columns(model)
+    statement = select(*[column.label(name) for name, column in columns])
+    if from_date:
+        statement = statement.where(date_column >= from_date)
+    if to_date:
+        # DateTime columns include the whole of the last day
+        if isinstance(date_column.type, DateTime):
+            statement = statement.where(date_column < to_date + timedelta(days=1))
+        else:
+            statement = statement.where(date_column <= to_date)
+    statement = statement.order_by(date_column, model.id).execution_options(yield_per=EXPORT_BATCH_ROWS)
+
+    # The response outlives the request's dependencies, so the stream owns its session
+    db = database.SessionLocal()
+    try:
+        # Only the execute is routed: each chunk is produced in a fresh worker
+        # thread context, and later fetches reuse the cursor's connection anyway
+        with database.route_reads("GET"):
+            result = db.execute(statement)
+        for partition in result.partitions():
+            yield partition
+    finally:
+        db.close()
+
+def _json_columns(model):
+    return [i for i, (_, column) in enumerate(_columns(model)) if isinstance(column.type, JSON)]
+
+def _serialise_json(batch, json_indexes):
+    if not json_indexes:
+        return batch
+    rows = []
+    for row in batch:
+        row = list(row)
+        for i in json_indexes:
+            if row[i] is not None:
+                row[i] = json.dumps(row[i])
+        rows.append(row)
+    return rows
+
+
+class _ChunkSink(io.RawIOBase):
+    """Write-only file that hands written bytes back to the response as chunks"""
+
+    def __init__(self):
+        self._chunks = []
+        self._position = 0
+
+    def writable(self):
+        return True
+
+    def write(self, data):
+        self._chunks.append(bytes(data))
+        self._position += len(data)
+        return len(data)
+
+    def tell(self):
+        return self._position
+
+    def drain(self) -> bytes:
+        data = b"".join(self._chunks)
+        self._chunks = []
+        return data
+
+
+def _stream_arrow(pa, dataset, fmt, from_date, to_date):
+    model, _ = DATASETS[dataset]
+    columns = _columns(model)
+    json_indexes = _json_columns(model)
+    schema = pa.schema([(name, _arrow_type(pa, column)) for name, column in columns])
+    sink = _ChunkSink()
+    if fmt == "parquet":
+        writer = pa.parquet.ParquetWriter(pa.PythonFile(sink, mode="w"), schema, compression="snappy")
+    else:
+        writer = pa.ipc.new_stream(pa.PythonFile(sink, mode="w"), schema)
+    try:
+        for batch in _rows(dataset, from_date, to_date):
+            batch = _serialise_json(batch, json_indexes)
+            arrays = [pa.array([row[i] for row in batch], type=field.type) for i, field in enumerate(schema)]
+            record_batch = pa.RecordBatch.from_arrays(arrays, schema=schema)
+            if fmt == "parquet":
+                # One row group per cursor batch
+                writer.write_table(pa.Table.from_batches([record_batch]))
+            else:
+                writer.write_batch(record_batch)
+            yield sink.drain()
+    finally:
+        writer.close()
+    yield sink.drain()
+
+def _stream_csv(dataset, from_date, to_date):
+    model, _ = DATASETS[dataset]
+    json_indexes = _json_columns(model)
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow([name for name, _ in _columns(model)])
+    for batch in _rows(dataset, from_date, to_date):
+        writer.writerows(_serialise_json(batch, json_indexes))
+        yield buffer.getvalue().encode()
+        buffer.seek(0)
+        buffer.truncate()
+    yield buffer.getvalue().encode()
+
+@router.get("/{dataset}")
+def export_dataset(
+    dataset: str,
+    fmt: str = Query("auto", alias="format", pattern="^(auto|parquet|arrow|csv)$"),
+    from_date: Optional[date] = Query(None, alias="from"),
+    to_date: Optional[date] = Query(None, alias="to")
+):
+    """
+    Stream a whole table for offline analysis. format=auto picks Parquet when
+    pyarrow is installed and CSV otherwise. pyarrow is in requirements.txt;
+    on an install without it CSV is the only format, and parquet/arrow get a 501.
+    """
+    if dataset not in DATASETS:
+        raise HTTPException(status_code=404, detail=f"Unknown dataset; choose one of {', '.join(DATASETS)}")
+    if from_date and to_date and from_date > to_date:
+        raise HTTPException(status_code=400, detail="'from' must be on or before 'to'")
+
+    pa = _pyarrow()
+    if fmt == "auto":
+        fmt = "parquet" if pa else "csv"
+    if fmt in ("parquet", "arrow") and pa is None:
+        raise HTTPException(status_code=501, detail=f"{fmt} export needs pyarrow installed; use format=csv")
+
+    body = _stream_csv(dataset, from_date, to_date) if fmt == "csv" else _stream_arrow(pa, dataset, fmt, from_date, to_date)
+    suffix = "-".join(d.isoformat() for d in (from_date, to_date) if d)
+    filename = f"{dataset}{'-' + suffix if suffix else ''}.{fmt}"
+    return StreamingResponse(
+        body,
+        media_type=MEDIA_TYPES[fmt],
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'}
+    )
@@ -11,7 +11,11 @@ router = APIRouter(
 )
 
 import uuid
-from routers.common.auth import get_current_user
+from routers.common.auth import (
+    get_current_user, invalidate_principal, identity_exists, register_identity, rename_identity, remove_identity,
+    revoke_user_sessions
+)
+from utils.activity import record_activity
 
 @router.get("/", response_model=List[schemas.Lawyer])
 def read_lawyers(skip: int = 0, limit: int = 100, db: Session = Depends(database.get_db), current_user = Depends(get_current_admin)):
@@ -32,14 +36,13 @@ def read_lawyer(lawyer_id: str, db: Session = Depends(database.get_db), current_
 @router.post("/", response_model=schemas.Lawyer)
 def create_lawyer(lawyer: schemas.LawyerCreate, db: Session = Depends(database.get_db), current_user = Depends(get_current_admin)):
     # Check if lawyer with same email already exists
-    existing_lawyer = db.query(models.Lawyer).filter(models.Lawyer.email == lawyer.email).first()
-    if existing_lawyer:
+    if identity_exists(db, lawyer.email, "lawyer"):
         raise HTTPException(status_code=400, detail="Email already registered")
 
     from routers.common.auth import get_password_hash
+    # Hash outside the try so an overloaded hashing pool surfaces as 503
+    hashed_password = get_password_hash(lawyer.password)
     try:
-        hashed_password = get_password_hash(lawyer.password)
-        
         lawyer_data = lawyer.dict(exclude={"password"})
         db_lawyer = models.Lawyer(
             **lawyer_data,
@@ -53,6 +56,7 @@ def create_lawyer(lawyer: schemas.LawyerCreate, db: Session = Depends(database.g
         print("✅ current_database():", current_db)
 
         db.add(db_lawyer)
+        register_identity(db, "lawyer", db_lawyer.id, db_lawyer.email)
         db.commit()
         db.refresh(db_lawyer)
         return db_lawyer
@@ -71,11 +75,19 @@ def update_lawyer(lawyer_id: str, lawyer: schemas.LawyerUpdate, db: Session = De
     if db_lawyer is None:
         raise HTTPException(status_code=404, detail="Lawyer not found")
     
-    for key, value in lawyer.dict(exclude_unset=True).items():
+    previous_email = db_lawyer.email
+    was_verified = bool(db_lawyer.verified)
+    update_data = lawyer.dict(exclude_unset=True)
+    rename_identity(db, "lawyer", previous_email, update_data.get("email"))
+    for key, value in update_data.items():
         setattr(db_lawyer, key, value)
+    if db_lawyer.verified and not was_verified:
+        record_activity(db, "verification", f"Lawyer verification completed for {db_lawyer.name}", db_lawyer.id)
     
     db.commit()
     db.refresh(db_lawyer)
+    invalidate_principal("lawyer", previous_email)
+    invalidate_principal("lawyer", db_lawyer.email)
     return db_lawyer
 
 @router.delete("/{lawyer_id}")
@@ -84,6 +96,10 @@ def delete_lawyer(lawyer_id: str, db: Session = Depends(database.get_db)):
     if db_lawyer is None:
         raise HTTPException(status_code=404, detail="Lawyer not found")
     
+    email = db_lawyer.email
     db.delete(db_lawyer)
+    remove_identity(db, "lawyer", email)
+    revoke_user_sessions(db, lawyer_id)
     db.commit()
+    invalidate_principal("lawyer", email)
     return {"ok": True}
@@ -0,0 +1,65 @@
+from fastapi import APIRouter, Depends
+from typing import Optional
+import database
+from routers.common.auth import (
+    get_current_admin, principal_cache, revocation_list,
+    login_limiter, forgot_password_limiter, verify_otp_limiter
+)
+from utils.hashing import hashing_service
+from utils.email import outbox_sender
+from utils.response_cache import response_cache
+from utils.activity import activity_writer
+from utils.dashboard_cache import user_dashboard_cache
+from routers.common.chat import conversation_members
+from websocket_manager import manager
+from utils.chat_writer import message_writer
+
+router = APIRouter(
+    prefix="/metrics",
+    tags=["metrics"],
+    dependencies=[Depends(get_current_admin)]
+)
+
+@router.get("/")
+def get_metrics():
+    return {
+        "dbPool": database.pool_stats(),
+        "asyncDbPool": database.async_pool_stats(),
+        "readReplicas": database.replica_stats(),
+        "principalCache": principal_cache.stats(),
+        "userDashboardCache": user_dashboard_cache.stats(),
+        "conversationMembers": conversation_members.stats(),
+        "websockets": manager.stats(),
+        "chatWriter": message_writer.stats(),
+        "hashing": hashing_service.stats(),
+        "revocations": revocation_list.stats(),
+        "emailOutbox": outbox_sender.stats(),
+        "responseCache": response_cache.stats(),
+        "activityLog": activity_writer.stats(),
+        "rateLimits": {
+            "login": login_limiter.stats(),
+            "forgotPassword": forgot_password_limiter.stats(),
+            "verifyOtp": verify_otp_limiter.stats()
+        }
+    }
+
+@router.get("/principal-cache")
+def get_principal_cache_stats():
+    # Hit/miss counters used to size PRINCIPAL_CACHE_SIZE / PRINCIPAL_CACHE_TTL
+    return principal_cache.stats()
+
+@router.get("/db-pool")
+def get_db_pool_stats():
+    # checkedOut near size + overflow with growing wait times means pool exhaustion;
+    # long hold times with short waits point at slow queries instead
+    return {"sync": database.pool_stats(), "async": database.async_pool_stats()}
+
+@router.get("/response-cache")
+def get_response_cache_stats():
+    return response_cache.stats()
+
+@router.post("/response-cache/invalidate")
+def invalidate_response_cache(endpoint: Optional[str] = None):
+    # Marks entries stale: the next request gets the old value and triggers a refresh
+    response_cache.invalidate(endpoint)
+    return {"invalidated": endpoint or "all"}
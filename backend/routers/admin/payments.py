@@ -2,6 +2,7 @@ from fastapi import APIRouter, Depends
 from sqlalchemy.orm import Session
 from typing import List
 import models, schemas, database
+from utils.activity import record_activity
 
 router = APIRouter(
     prefix="/payments",
@@ -28,6 +29,8 @@ def create_payment(payment: schemas.PaymentBase, db: Session = Depends(database.
         platformFee=payment.platformFee
     )
     db.add(db_payment)
+    if db_payment.status == "completed":
+        record_activity(db, "payment", f"Payment received from {db_payment.clientName}", db_payment.id)
     db.commit()
     db.refresh(db_payment)
     return db_payment
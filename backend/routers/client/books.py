@@ -3,6 +3,7 @@ from sqlalchemy.orm import Session
 from typing import List
 import models, schemas, database
 from routers.common.auth import get_current_user
+from utils.activity import record_activity
 from datetime import datetime
 import uuid
 
@@ -141,11 +142,12 @@ def purchase_book(
         amount=book.price,
         type="book",
         status="completed",
-        date=datetime.now().strftime("%Y-%m-%d"),
+        date=datetime.now().date(),
         platformFee=platform_fee,
         itemId=book_id  # Track which book was purchased
     )
     db.add(payment)
+    record_activity(db, "payment", f"Payment received from {current_user.name} for {book.title}", payment.id)
     
     # Update book stats
     book.downloads += 1
@@ -1,8 +1,10 @@
 import models, schemas, database
 from fastapi import APIRouter, Depends, HTTPException
-from sqlalchemy.orm import Session
+from sqlalchemy import select, func, true
+from sqlalchemy.ext.asyncio import AsyncSession
 from routers.common.auth import get_current_user
-from datetime import datetime
+from utils.dashboard_cache import cache_stats, get_cached_stats
+from datetime import date
 
 router = APIRouter(
     prefix="/dashboard",
@@ -10,37 +12,40 @@ router = APIRouter(
 )
 
 @router.get("/stats")
-def get_client_stats(
-    db: Session = Depends(database.get_db),
+async def get_client_stats(
+    db: AsyncSession = Depends(database.get_async_db),
     current_user = Depends(get_current_user)
 ):
     if current_user.role != 'client':
         raise HTTPException(status_code=403, detail="Not authorized")
 
-    # 1. Active Cases
-    active_cases = db.query(models.Case).filter(
+    cached = get_cached_stats("client", current_user.id)
+    if cached is not None:
+        return cached
+
+    # One statement: each subquery aggregates to a single row, cross-joined together
+    cases = select(func.count().label("active")).where(
         models.Case.clientId == current_user.id,
         models.Case.status != 'Closed'
-    ).count()
-
-    # 2. Upcoming Appointments
-    today = datetime.now().strftime("%Y-%m-%d")
-    upcoming_appointments = db.query(models.Appointment).filter(
+    ).subquery()
+    appointments = select(func.count().label("upcoming")).where(
         models.Appointment.clientId == current_user.id,
-        models.Appointment.date >= today,
+        models.Appointment.date >= date.today(),
         models.Appointment.status != 'Cancelled'
-    ).count()
-
-    # 3. Unread Messages (assuming we can query by conversation/message)
-    # Simplified: Find conversations for this client, then count unread by client
-    unread_messages = db.query(models.Conversation).filter(
+    ).subquery()
+    conversations = select(func.coalesce(func.sum(models.Conversation.unreadByClient), 0).label("unread")).where(
         models.Conversation.clientId == current_user.id
-    ).with_entities(models.Conversation.unreadByClient).all()
-    
-    total_unread = sum([conv.unreadByClient for conv in unread_messages])
+    ).subquery()
+
+    row = (await db.execute(
+        select(cases.c.active, appointments.c.upcoming, conversations.c.unread)
+        .select_from(cases.join(appointments, true()).join(conversations, true()))
+    )).one()
 
-    return {
-        "activeCases": active_cases,
-        "upcomingAppointments": upcoming_appointments,
-        "unreadMessages": total_unread
+    stats = {
+        "activeCases": row.active,
+        "upcomingAppointments": row.upcoming,
+        "unreadMessages": row.unread
     }
+    cache_stats("client", current_user.id, stats)
+    return stats
@@ -28,7 +28,7 @@ def create_order(order: schemas.OrderCreate, db: Session = Depends(database.get_
         fullName=order.fullName,
         phoneNumber=order.phoneNumber,
         status="completed", # Auto-complete for now
-        createdAt=datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+        createdAt=datetime.now()
     )
     
     db.add(new_order)
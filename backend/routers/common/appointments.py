@@ -11,6 +11,7 @@ router = APIRouter(
 import uuid
 
 from routers.common.auth import get_current_user
+from utils.activity import record_activity
 
 @router.get("/", response_model=List[schemas.Appointment])
 def read_appointments(skip: int = 0, limit: int = 100, db: Session = Depends(database.get_db), current_user = Depends(get_current_user)):
@@ -52,6 +53,7 @@ def read_appointment(appointment_id: str, db: Session = Depends(database.get_db)
 def create_appointment(appointment: schemas.AppointmentBase, db: Session = Depends(database.get_db)):
     db_appointment = models.Appointment(**appointment.dict(), id=str(uuid.uuid4()))
     db.add(db_appointment)
+    record_activity(db, "appointment", f"Appointment scheduled for {db_appointment.date} at {db_appointment.time}", db_appointment.id)
     db.commit()
     db.refresh(db_appointment)
     return db_appointment
@@ -62,8 +64,11 @@ def update_appointment(appointment_id: str, appointment: schemas.AppointmentBase
     if db_appointment is None:
         raise HTTPException(status_code=404, detail="Appointment not found")
     
+    previous_status = db_appointment.status
     for key, value in appointment.dict().items():
         setattr(db_appointment, key, value)
+    if db_appointment.status != previous_status:
+        record_activity(db, "appointment", f"Appointment on {db_appointment.date} {db_appointment.status}", db_appointment.id)
     
     db.commit()
     db.refresh(db_appointment)
@@ -1,16 +1,25 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Request, status
+from sqlalchemy import select, delete
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 from datetime import datetime, timedelta
-from typing import Optional
+from typing import List, Optional
 from jose import JWTError, jwt
-from passlib.context import CryptContext
 from fastapi.security import OAuth2PasswordBearer
 import os
+import hashlib
+import hmac
+import secrets
 
 import database
 import models
 import schemas
 import uuid # Imported uuid
+from utils.cache import TTLCache
+from utils.hashing import pwd_context, hashing_service, HashingOverloaded
+from utils.revocation import RevocationList
+from utils.rate_limit import RateLimiter
+from websocket_manager import manager
 
 router = APIRouter(
     prefix="/auth",
@@ -20,17 +29,78 @@ router = APIRouter(
 # Configuration
 SECRET_KEY = os.getenv("SECRET_KEY", "your-secret-key-change-me")
 ALGORITHM = "HS256"
-ACCESS_TOKEN_EXPIRE_MINUTES = 300
+ACCESS_TOKEN_EXPIRE_MINUTES = int(os.getenv("ACCESS_TOKEN_EXPIRE_MINUTES", "15"))
+REFRESH_TOKEN_EXPIRE_DAYS = int(os.getenv("REFRESH_TOKEN_EXPIRE_DAYS", "14"))
+REVOCATION_SYNC_SECONDS = float(os.getenv("REVOCATION_SYNC_SECONDS", "5"))
 
-pwd_context = CryptContext(schemes=["pbkdf2_sha256", "bcrypt"], deprecated="auto")
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="auth/token")
 
+# Principal cache: authenticated users keyed by (role, email) so that
+# get_current_user does not hit the database on every request. Each worker
+# has its own cache; a profile change drops the entry locally and tells the
+# other workers over the chat pub/sub backend. With the default 'memory'
+# backend that only reaches this process, so when running several workers
+# without WS_PUBSUB_BACKEND=redis the others may serve the old profile for
+# up to PRINCIPAL_CACHE_TTL seconds (keep it short).
+PRINCIPAL_CACHE_SIZE = int(os.getenv("PRINCIPAL_CACHE_SIZE", "10000"))
+PRINCIPAL_CACHE_TTL = float(os.getenv("PRINCIPAL_CACHE_TTL", "60"))
+principal_cache = TTLCache(maxsize=PRINCIPAL_CACHE_SIZE, ttl=PRINCIPAL_CACHE_TTL)
+
+PRINCIPAL_INVALIDATION_CHANNEL = "auth:principal-invalidated"
+manager.add_channel_handler(
+    PRINCIPAL_INVALIDATION_CHANNEL,
+    lambda payload: principal_cache.invalidate((payload["role"], payload["email"]))
+)
+
+# Revoked session ids, checked in memory on every authenticated request
+revocation_list = RevocationList(
+    retention=timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES),
+    interval=REVOCATION_SYNC_SECONDS,
+)
+
+# Throttling for endpoints that hash passwords or write OTPs (per IP and per email)
+login_limiter = RateLimiter("login", capacity=10, period=60)
+forgot_password_limiter = RateLimiter("forgot-password", capacity=3, period=600)
+verify_otp_limiter = RateLimiter("verify-otp", capacity=5, period=600)
+
+# Ordered by precedence: /login and password reset try an email's accounts in this order
+PRINCIPAL_MODELS = {
+    "admin": models.Admin,
+    "lawyer": models.Lawyer,
+    "client": models.Client,
+}
+
 # Utils
+def _hashing_unavailable():
+    return HTTPException(
+        status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+        detail="Server is busy, please retry shortly",
+        headers={"Retry-After": "1"},
+    )
+
 def verify_password(plain_password, hashed_password):
-    return pwd_context.verify(plain_password, hashed_password)
+    try:
+        return hashing_service.verify(plain_password, hashed_password)
+    except HashingOverloaded:
+        raise _hashing_unavailable()
 
 def get_password_hash(password):
-    return pwd_context.hash(password)
+    try:
+        return hashing_service.hash(password)
+    except HashingOverloaded:
+        raise _hashing_unavailable()
+
+async def averify_password(plain_password, hashed_password):
+    try:
+        return await hashing_service.averify(plain_password, hashed_password)
+    except HashingOverloaded:
+        raise _hashing_unavailable()
+
+async def aget_password_hash(password):
+    try:
+        return await hashing_service.ahash(password)
+    except HashingOverloaded:
+        raise _hashing_unavailable()
 
 def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
     to_encode = data.copy()
@@ -42,6 +112,137 @@ def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
     encoded_jwt = jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
     return encoded_jwt
 
+def invalidate_principal(role: str, email: Optional[str]):
+    """Drop a cached principal after its profile or credentials change, on every worker"""
+    if email:
+        principal_cache.invalidate((role, email))
+        manager.publish_threadsafe(PRINCIPAL_INVALIDATION_CHANNEL, {"role": role, "email": email})
+
+# Identity index
+def resolve_identities(db: Session, email: str):
+    """Return [(role, user)] for every account holding an email, in PRINCIPAL_MODELS precedence"""
+    identities = {
+        identity.role: identity
+        for identity in db.query(models.Identity).filter(models.Identity.email == email)
+    }
+    accounts = []
+    for role, model in PRINCIPAL_MODELS.items():
+        if role in identities:
+            user = db.get(model, identities[role].userId)
+            if user is not None:
+                accounts.append((role, user))
+    return accounts
+
+def resolve_identity(db: Session, email: str, role: str):
+    """Return the account an email holds under one role, or None"""
+    identity = db.get(models.Identity, (email, role))
+    if identity is None or role not in PRINCIPAL_MODELS:
+        return None
+    return db.get(PRINCIPAL_MODELS[role], identity.userId)
+
+def identity_roles(db: Session, email: str) -> List[str]:
+    """Return the roles an email is registered under, in precedence order, without loading accounts"""
+    roles = {role for (role,) in db.query(models.Identity.role).filter(models.Identity.email == email)}
+    return [role for role in PRINCIPAL_MODELS if role in roles]
+
+def identity_exists(db: Session, email: str, role: str) -> bool:
+    return db.get(models.Identity, (email, role)) is not None
+
+def register_identity(db: Session, role: str, user_id: str, email: str):
+    """Add the identity row for a new account; committed with the caller's transaction"""
+    db.add(models.Identity(email=email, role=role, userId=user_id))
+
+def rename_identity(db: Session, role: str, old_email: str, new_email: str):
+    if not new_email or new_email == old_email:
+        return
+    if identity_exists(db, new_email, role):
+        raise HTTPException(status_code=400, detail="Email already registered")
+    db.query(models.Identity).filter(
+        models.Identity.email == old_email, models.Identity.role == role
+    ).update({"email": new_email})
+
+def remove_identity(db: Session, role: str, email: str):
+    db.query(models.Identity).filter(models.Identity.email == email, models.Identity.role == role).delete()
+
+def sync_identities(db: Session):
+    """
+    Backfill identities for accounts created outside the API. Scans every
+    account, so it runs from seeds.py and scripts/rebuild_identities.py,
+    never at startup.
+    """
+    known = {(email, role) for (email, role) in db.query(models.Identity.email, models.Identity.role)}
+    added = 0
+    for role, model in PRINCIPAL_MODELS.items():
+        for user_id, email in db.query(model.id, model.email):
+            if email and (email, role) not in known:
+                register_identity(db, role, user_id, email)
+                known.add((email, role))
+                added += 1
+    if added:
+        db.commit()
+        print(f"Backfilled {added} identities")
+
+# Sessions
+def _hash_refresh_secret(secret: str) -> str:
+    return hashlib.sha256(secret.encode()).hexdigest()
+
+def _session_access_token(user, role: str, session_id: str):
+    return create_access_token(
+        data={"sub": user.email, "role": role, "id": user.id, "sid": session_id}, 
+        expires_delta=timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES)
+    )
+
+def issue_tokens(db: Session, user, role: str):
+    """Open a refresh-token session and return (access_token, refresh_token)"""
+    session_id = str(uuid.uuid4())
+    secret = secrets.token_urlsafe(32)
+    now = datetime.utcnow()
+    access_token = _session_access_token(user, role, session_id)
+    db.add(models.AuthSession(
+        id=session_id,
+        userId=user.id,
+        role=role,
+        refreshTokenHash=_hash_refresh_secret(secret),
+        createdAt=now,
+        expiresAt=now + timedelta(days=REFRESH_TOKEN_EXPIRE_DAYS),
+        revoked=False
+    ))
+    db.commit()
+    return access_token, f"{session_id}.{secret}"
+
+def revoke_session(db: Session, auth_session):
+    auth_session.revoked = True
+    auth_session.revokedAt = datetime.utcnow()
+    db.commit()
+    revocation_list.add(auth_session.id, auth_session.revokedAt)
+
+def revoke_user_sessions(db: Session, user_id: str):
+    """Revoke every live session of a user; committed with the caller's transaction"""
+    revoked_at = datetime.utcnow()
+    sessions = db.query(models.AuthSession).filter(
+        models.AuthSession.userId == user_id,
+        models.AuthSession.revoked == False
+    ).all()
+    for auth_session in sessions:
+        auth_session.revoked = True
+        auth_session.revokedAt = revoked_at
+        revocation_list.add(auth_session.id, revoked_at)
+
+def token_response(db: Session, user, role: str):
+    user_info = {
+        "id": user.id,
+        "name": user.name,
+        "email": user.email,
+        "role": role
+    }
+    access_token, refresh_token = issue_tokens(db, user, role)
+    return {
+        "access_token": access_token, 
+        "token_type": "bearer",
+        "refresh_token": refresh_token,
+        "user": user_info
+    }
+
 def get_db():
     db = database.SessionLocal()
     try:
@@ -50,7 +251,7 @@ def get_db():
         db.close()
 
 # Dependencies
-def get_current_user(token: str = Depends(oauth2_scheme), db: Session = Depends(get_db)):
+async def get_current_user(token: str = Depends(oauth2_scheme), db: AsyncSession = Depends(database.get_async_db)):
     credentials_exception = HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
         detail="Could not validate credentials",
@@ -66,20 +267,37 @@ def get_current_user(token: str = Depends(oauth2_scheme), db: Session = Depends(
     except JWTError:
         raise credentials_exception
     
-    if role == "lawyer":
-        user = db.query(models.Lawyer).filter(models.Lawyer.email == token_data.email).first()
-    elif role == "client":
-        user = db.query(models.Client).filter(models.Client.email == token_data.email).first()
-    elif role == "admin":
-        user = db.query(models.Admin).filter(models.Admin.email == token_data.email).first()
-    else:
-        user = None
-        
+    # Tokens issued before sessions existed carry no sid and simply expire
+    session_id = payload.get("sid")
+    if session_id and revocation_list.is_revoked(session_id):
+        raise credentials_exception
+
+    user = await load_principal(db, role, token_data.email)
     if user is None:
         raise credentials_exception
     return user
 
-def get_current_lawyer(user = Depends(get_current_user)):
+async def load_principal(db: AsyncSession, role: str, email: str):
+    """The user a token belongs to, from the principal cache or the database"""
+    cache_key = (role, email)
+    user = principal_cache.get(cache_key)
+    if user is not None:
+        return user
+
+    model = PRINCIPAL_MODELS.get(role)
+    if model is None:
+        return None
+    result = await db.execute(select(model).where(model.email == email))
+    user = result.scalars().first()
+    if user is None:
+        return None
+
+    # Detach so the cached instance outlives this request's session
+    db.expunge(user)
+    principal_cache.set(cache_key, user)
+    return user
+
+async def get_current_lawyer(user = Depends(get_current_user)):
     if user.role != "lawyer":
         raise HTTPException(
             status_code=status.HTTP_403_FORBIDDEN, 
@@ -87,7 +305,7 @@ def get_current_lawyer(user = Depends(get_current_user)):
         )
     return user
 
-def get_current_client(user = Depends(get_current_user)):
+async def get_current_client(user = Depends(get_current_user)):
     if user.role != "client":
         raise HTTPException(
             status_code=status.HTTP_403_FORBIDDEN, 
@@ -95,7 +313,7 @@ def get_current_client(user = Depends(get_current_user)):
         )
     return user
 
-def get_current_admin(user = Depends(get_current_user)):
+async def get_current_admin(user = Depends(get_current_user)):
     if user.role != "admin":
         raise HTTPException(
             status_code=status.HTTP_403_FORBIDDEN, 
@@ -127,189 +345,118 @@ def get_current_admin(user = Depends(get_current_user)):
 #     db.refresh(new_lawyer)
 #     return new_lawyer
 
-@router.post("/lawyer/login", response_model=schemas.Token)
-def login_lawyer(form_data: schemas.LawyerLogin, db: Session = Depends(get_db)):
-    lawyer = db.query(models.Lawyer).filter(models.Lawyer.email == form_data.email).first()
-    if not lawyer or not verify_password(form_data.password, lawyer.hashed_password):
+async def _login_with_model(db: AsyncSession, model, role: str, form_data):
+    result = await db.execute(select(model).where(model.email == form_data.email))
+    user = result.scalars().first()
+    if not user or not await averify_password(form_data.password, user.hashed_password):
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Incorrect email or password",
             headers={"WWW-Authenticate": "Bearer"},
         )
     
-    access_token_expires = timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES)
-    access_token = create_access_token(
-        data={"sub": lawyer.email, "role": "lawyer", "id": lawyer.id}, 
-        expires_delta=access_token_expires
-    )
-    return {
-        "access_token": access_token, 
-        "token_type": "bearer",
-        "user": {
-            "id": lawyer.id,
-            "name": lawyer.name,
-            "email": lawyer.email,
-            "role": "lawyer"
-        }
-    }
+    return await db.run_sync(token_response, user, role)
+
+@router.post("/lawyer/login", response_model=schemas.Token)
+async def login_lawyer(form_data: schemas.LawyerLogin, request: Request, db: AsyncSession = Depends(database.get_async_db)):
+    await login_limiter.check(request, form_data.email)
+    return await _login_with_model(db, models.Lawyer, "lawyer", form_data)
 
 @router.post("/admin/login", response_model=schemas.Token)
-def login_admin(form_data: schemas.AdminLogin, db: Session = Depends(get_db)):
-    admin = db.query(models.Admin).filter(models.Admin.email == form_data.email).first()
-    if not admin or not verify_password(form_data.password, admin.hashed_password):
-        raise HTTPException(
-            status_code=status.HTTP_401_UNAUTHORIZED,
-            detail="Incorrect email or password",
-            headers={"WWW-Authenticate": "Bearer"},
-        )
-    
-    access_token_expires = timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES)
-    access_token = create_access_token(
-        data={"sub": admin.email, "role": "admin", "id": admin.id}, 
-        expires_delta=access_token_expires
-    )
-    return {
-        "access_token": access_token, 
-        "token_type": "bearer",
-        "user": {
-            "id": admin.id,
-            "name": admin.name,
-            "email": admin.email,
-            "role": "admin"
-        }
-    }
+async def login_admin(form_data: schemas.AdminLogin, request: Request, db: AsyncSession = Depends(database.get_async_db)):
+    await login_limiter.check(request, form_data.email)
+    return await _login_with_model(db, models.Admin, "admin", form_data)
 
 @router.post("/client/login", response_model=schemas.Token)
-def login_client(form_data: schemas.ClientLogin, db: Session = Depends(get_db)):
-    client = db.query(models.Client).filter(models.Client.email == form_data.email).first()
-    if not client or not verify_password(form_data.password, client.hashed_password):
-        raise HTTPException(
-            status_code=status.HTTP_401_UNAUTHORIZED,
-            detail="Incorrect email or password",
-            headers={"WWW-Authenticate": "Bearer"},
-        )
-    
-    access_token_expires = timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES)
-    access_token = create_access_token(
-        data={"sub": client.email, "role": "client", "id": client.id}, 
-        expires_delta=access_token_expires
-    )
-    return {
-        "access_token": access_token, 
-        "token_type": "bearer",
-        "user": {
-            "id": client.id,
-            "name": client.name,
-            "email": client.email,
-            "role": "client"
-        }
-    }
+async def login_client(form_data: schemas.ClientLogin, request: Request, db: AsyncSession = Depends(database.get_async_db)):
+    await login_limiter.check(request, form_data.email)
+    return await _login_with_model(db, models.Client, "client", form_data)
 
 @router.post("/login", response_model=schemas.Token)
-def login_universal(form_data: schemas.LoginRequest, db: Session = Depends(get_db)):
-    print(f"Login attempt for: {form_data.email}")
-    # Check Admin first
-    admin = db.query(models.Admin).filter(models.Admin.email == form_data.email).first()
-    print(f"Admin found: {admin}")
-    if admin:
-         print(f"Verifying password for admin... stored hash length: {len(admin.hashed_password)}")
-         print(f"DEBUG: Received password: '{form_data.password}' (Length: {len(form_data.password)})")
-         is_valid = verify_password(form_data.password, admin.hashed_password)
-         print(f"Password valid: {is_valid}")
-         if is_valid:
-            access_token_expires = timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES)
-            access_token = create_access_token(
-                data={"sub": admin.email, "role": "admin", "id": admin.id}, 
-                expires_delta=access_token_expires
-            )
-            return {
-                "access_token": access_token, 
-                "token_type": "bearer",
-                "user": {
-                    "id": admin.id,
-                    "name": admin.name,
-                    "email": admin.email,
-                    "role": "admin"
-                }
-            }
-    
-    # Check Lawyer
-    lawyer = db.query(models.Lawyer).filter(models.Lawyer.email == form_data.email).first()
-    if lawyer and verify_password(form_data.password, lawyer.hashed_password):
-        access_token_expires = timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES)
-        access_token = create_access_token(
-            data={"sub": lawyer.email, "role": "lawyer", "id": lawyer.id}, 
-            expires_delta=access_token_expires
-        )
-        return {
-            "access_token": access_token, 
-            "token_type": "bearer",
-            "user": {
-                "id": lawyer.id,
-                "name": lawyer.name,
-                "email": lawyer.email,
-                "role": "lawyer"
-            }
-        }
-        
-    
-    # Check Client
-    client = db.query(models.Client).filter(models.Client.email == form_data.email).first()
-    if client and verify_password(form_data.password, client.hashed_password):
-        access_token_expires = timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES)
-        access_token = create_access_token(
-            data={"sub": client.email, "role": "client", "id": client.id}, 
-            expires_delta=access_token_expires
-        )
-        return {
-            "access_token": access_token, 
-            "token_type": "bearer",
-            "user": {
-                "id": client.id,
-                "name": client.name,
-                "email": client.email,
-                "role": "client"
-            }
-        }
-
+async def login_universal(form_data: schemas.LoginRequest, request: Request, db: AsyncSession = Depends(database.get_async_db)):
+    await login_limiter.check(request, form_data.email)
+    # One indexed lookup finds the email's accounts; almost always there is
+    # one, so one hash verification. An email held under several roles logs
+    # into the first account the password matches, in precedence order.
+    for role, user in await db.run_sync(resolve_identities, form_data.email):
+        if await averify_password(form_data.password, user.hashed_password):
+            return await db.run_sync(token_response, user, role)
     raise HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
         detail="Incorrect email or password",
         headers={"WWW-Authenticate": "Bearer"},
     )
 
+@router.post("/refresh", response_model=schemas.Token)
+async def refresh_access_token(data: schemas.RefreshRequest, db: AsyncSession = Depends(database.get_async_db)):
+    """Exchange a refresh token for a new access token; the refresh token is rotated"""
+    invalid = HTTPException(
+        status_code=status.HTTP_401_UNAUTHORIZED,
+        detail="Invalid refresh token",
+        headers={"WWW-Authenticate": "Bearer"},
+    )
+    session_id, _, secret = data.refresh_token.partition(".")
+    auth_session = await db.get(models.AuthSession, session_id) if secret else None
+    if not auth_session or auth_session.revoked:
+        raise invalid
+    if auth_session.expiresAt < datetime.utcnow():
+        raise invalid
+    if not hmac.compare_digest(auth_session.refreshTokenHash, _hash_refresh_secret(secret)):
+        # A rotated token was replayed: assume it leaked and end the session
+        await db.run_sync(revoke_session, auth_session)
+        raise invalid
+
+    model = PRINCIPAL_MODELS.get(auth_session.role)
+    user = await db.get(model, auth_session.userId) if model else None
+    if user is None:
+        raise invalid
+
+    new_secret = secrets.token_urlsafe(32)
+    auth_session.refreshTokenHash = _hash_refresh_secret(new_secret)
+    await db.commit()
+    return {
+        "access_token": _session_access_token(user, auth_session.role, auth_session.id),
+        "token_type": "bearer",
+        "refresh_token": f"{auth_session.id}.{new_secret}"
+    }
+
+@router.post("/logout")
+async def logout(data: schemas.RefreshRequest, db: AsyncSession = Depends(database.get_async_db)):
+    session_id, _, _ = data.refresh_token.partition(".")
+    auth_session = await db.get(models.AuthSession, session_id)
+    if auth_session and not auth_session.revoked:
+        await db.run_sync(revoke_session, auth_session)
+    return {"message": "Logged out"}
+
 import random
 import string
-from utils.email import send_email
+from utils.email import queue_email
+
+def reset_role(db: Session, email: str) -> Optional[str]:
+    """The account a password reset applies to: admin, else lawyer; clients have no reset"""
+    roles = identity_roles(db, email)
+    return next((role for role in ("admin", "lawyer") if role in roles), None)
 
 # NOTE: This endpoint now initiates the OTP flow
 @router.post("/forgot-password")
-def forgot_password_universal(request: schemas.PasswordResetRequest, db: Session = Depends(get_db)):
-    # Check Admin first
-    admin = db.query(models.Admin).filter(models.Admin.email == request.email).first()
-    role = None
+async def forgot_password_universal(request: schemas.PasswordResetRequest, http_request: Request, db: AsyncSession = Depends(database.get_async_db)):
+    await forgot_password_limiter.check(http_request, request.email)
+    role = await db.run_sync(reset_role, request.email)
     
-    if admin:
-        role = "admin"
-    else:
-        # Check Lawyer
-        lawyer = db.query(models.Lawyer).filter(models.Lawyer.email == request.email).first()
-        if lawyer:
-            role = "lawyer"
-    
-    if not role:
+    # Password reset is only offered to admin and lawyer accounts
+    if role is None:
          # To prevent leaking email existence, we might return success, but user asked to "first check".
          # So we will return 404 if not found as permitted by user request context ("first check...").
          raise HTTPException(status_code=404, detail="Email not registered")
 
     # Generate 6-digit OTP
     otp = ''.join(random.choices(string.digits, k=6))
-    expires_at = (datetime.utcnow() + timedelta(minutes=10)).isoformat()
+    expires_at = datetime.utcnow() + timedelta(minutes=10)
     
     # Store OTP
     # Check if entry exists for email, update it, else create new
     # Actually, let's just create a new entry for simplicity, or delete old ones
-    db.query(models.PasswordReset).filter(models.PasswordReset.email == request.email).delete()
+    await db.execute(delete(models.PasswordReset).where(models.PasswordReset.email == request.email))
     
     reset_entry = models.PasswordReset(
         email=request.email,
@@ -317,37 +464,36 @@ def forgot_password_universal(request: schemas.PasswordResetRequest, db: Session
         expires_at=expires_at
     )
     db.add(reset_entry)
-    db.commit()
     
-    # Send Email
+    # Queue Email (delivered by the outbox sender, committed with the OTP)
     subject = "LegalWise Password Reset OTP"
     body = f"Your OTP for password reset is: {otp}. It expires in 10 minutes."
-    send_email(request.email, subject, body)
+    await db.run_sync(queue_email, request.email, subject, body)
+    await db.commit()
     
     print(f"DEV LOG - OTP for {request.email}: {otp}")
     
     return {"message": "OTP sent to your email"}
 
 @router.post("/verify-otp")
-def verify_otp_universal(data: schemas.OTPVerify, db: Session = Depends(get_db)):
-    record = db.query(models.PasswordReset).filter(
+async def verify_otp_universal(data: schemas.OTPVerify, request: Request, db: AsyncSession = Depends(database.get_async_db)):
+    await verify_otp_limiter.check(request, data.email)
+    result = await db.execute(select(models.PasswordReset).where(
         models.PasswordReset.email == data.email, 
         models.PasswordReset.otp == data.otp
-    ).first()
+    ))
+    record = result.scalars().first()
     
     if not record:
         raise HTTPException(status_code=400, detail="Invalid OTP")
         
-    if datetime.fromisoformat(record.expires_at) < datetime.utcnow():
+    if record.expires_at < datetime.utcnow():
         raise HTTPException(status_code=400, detail="OTP expired")
         
-    # Check role again to issue token
-    role = "lawyer" # Default fallback
-    admin = db.query(models.Admin).filter(models.Admin.email == data.email).first()
-    if admin:
-        role = "admin"
-    else:
-        role = "lawyer" # We assume it exists because OTP was sent
+    # Resolve role again to issue token
+    role = await db.run_sync(reset_role, data.email)
+    if role is None:
+        raise HTTPException(status_code=404, detail="User not found")
         
     # Generate reset token (short lived, scoped)
     access_token_expires = timedelta(minutes=15)
@@ -357,13 +503,13 @@ def verify_otp_universal(data: schemas.OTPVerify, db: Session = Depends(get_db))
     )
     
     # Clean up OTP
-    db.delete(record)
-    db.commit()
+    await db.delete(record)
+    await db.commit()
     
     return {"token": reset_token, "message": "OTP verified"}
 
 @router.post("/reset-password")
-def reset_password_universal(data: schemas.PasswordResetConfirm, db: Session = Depends(get_db)):
+async def reset_password_universal(data: schemas.PasswordResetConfirm, db: AsyncSession = Depends(database.get_async_db)):
     try:
         payload = jwt.decode(data.token, SECRET_KEY, algorithms=[ALGORITHM])
         email: str = payload.get("sub")
@@ -377,22 +523,19 @@ def reset_password_universal(data: schemas.PasswordResetConfirm, db: Session = D
     except JWTError:
         raise HTTPException(status_code=400, detail="Invalid token")
     
-    if role == "admin":
-        user = db.query(models.Admin).filter(models.Admin.email == email).first()
-    elif role == "lawyer":
-        user = db.query(models.Lawyer).filter(models.Lawyer.email == email).first()
-    else:
+    if role not in ("admin", "lawyer"):
         raise HTTPException(status_code=400, detail="Invalid role in token")
 
+    user = await db.run_sync(resolve_identity, email, role)
     if not user:
         raise HTTPException(status_code=404, detail="User not found")
         
-    user.hashed_password = get_password_hash(data.new_password)
-    db.commit()
+    user.hashed_password = await aget_password_hash(data.new_password)
+    await db.run_sync(revoke_user_sessions, user.id)
+    await db.commit()
+    invalidate_principal(role, email)
     
     return {"message": "Password updated successfully"}
 
 # Dependency update for admin?
 # We can use get_current_user generally, but need to make sure models.Admin is queried if role is admin
-
-
@@ -1,9 +1,14 @@
 from fastapi import APIRouter, Depends, HTTPException
-from sqlalchemy.orm import Session
-from typing import List
+from sqlalchemy import select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+from typing import List, Optional, Tuple
 import models, schemas, database
 from routers.common.auth import get_current_user
+from utils.cache import TTLCache
+from utils.dashboard_cache import invalidate_user
+from utils.chat_writer import message_writer
 from datetime import datetime
+import os
 import uuid
 
 router = APIRouter(
@@ -11,9 +16,87 @@ router = APIRouter(
     tags=["chat"],
 )
 
+# conversation id -> (clientId, lawyerId). Participants never change and
+# conversations are never deleted, so entries need no invalidation; the TTL
+# only bounds how long an unused entry can linger.
+CONVERSATION_CACHE_SIZE = int(os.getenv("CONVERSATION_CACHE_SIZE", "50000"))
+CONVERSATION_CACHE_TTL = float(os.getenv("CONVERSATION_CACHE_TTL", "86400"))
+conversation_members = TTLCache(maxsize=CONVERSATION_CACHE_SIZE, ttl=CONVERSATION_CACHE_TTL)
+
+async def get_conversation_members(conversation_id: str, db: Optional[AsyncSession] = None) -> Optional[Tuple[str, str]]:
+    """
+    (clientId, lawyerId) of a conversation, or None if it does not exist.
+    Served from memory after the first lookup; without a session, a
+    short-lived one is opened only on a cache miss.
+    """
+    members = conversation_members.get(conversation_id)
+    if members is not None:
+        return members
+    statement = select(models.Conversation.clientId, models.Conversation.lawyerId).where(
+        models.Conversation.id == conversation_id
+    )
+    if db is None:
+        async with database.AsyncSessionLocal() as session:
+            row = (await session.execute(statement)).first()
+    else:
+        row = (await db.execute(statement)).first()
+    if row is None:
+        return None
+    members = (row.clientId, row.lawyerId)
+    conversation_members.set(conversation_id, members)
+    return members
+
+async def _require_member(db: AsyncSession, conversation_id: str, current_user) -> Tuple[str, str]:
+    members = await get_conversation_members(conversation_id, db)
+    if members is None:
+        raise HTTPException(status_code=404, detail="Conversation not found")
+
+    # Check access rights
+    client_id, lawyer_id = members
+    if current_user.role == 'client' and client_id != current_user.id:
+        raise HTTPException(status_code=403, detail="Access denied")
+    elif current_user.role == 'lawyer' and lawyer_id != current_user.id:
+        raise HTTPException(status_code=403, detail="Access denied")
+    return members
+
+def message_event(message) -> dict:
+    """The chat WebSocket payload for a stored message (a row dict or a Message)"""
+    message = schemas.Message.model_validate(message)
+    return {
+        "type": "message",
+        "messageId": message.id,
+        "seq": message.seq,
+        "conversationId": message.conversationId,
+        "senderId": message.senderId,
+        "senderRole": message.senderRole,
+        "senderName": message.senderName,
+        "content": message.content,
+        "timestamp": message.timestamp.isoformat(),
+    }
+
+async def persist_message(conversation_id: str, members: Tuple[str, str], sender_id: str,
+                          sender_role: str, sender_name: str, content: str) -> dict:
+    """
+    Store a chat message through the write-behind buffer; returns the row once
+    it and the conversation's last message and unread count are committed.
+    """
+    client_id, lawyer_id = members
+    message = {
+        "id": str(uuid.uuid4()),
+        "conversationId": conversation_id,
+        "senderId": sender_id,
+        "senderRole": sender_role,
+        "senderName": sender_name,
+        "content": content,
+        "timestamp": datetime.now(),
+        "read": False,
+    }
+    await message_writer.write(message, lawyer_id if sender_role == 'client' else client_id)
+    return message
+
 @router.get("/conversations", response_model=List[schemas.Conversation])
-def get_conversations(
-    db: Session = Depends(database.get_db),
+async def get_conversations(
+    db: AsyncSession = Depends(database.get_async_db),
     current_user = Depends(get_current_user)
 ):
     """Get all conversations for the authenticated user"""
@@ -22,56 +105,59 @@ def get_conversations(
     
     # Filter conversations based on user role
     if current_user.role == 'client':
-        conversations = db.query(models.Conversation).filter(
+        result = await db.execute(select(models.Conversation).where(
             models.Conversation.clientId == current_user.id
-        ).order_by(models.Conversation.lastMessageAt.desc()).all()
+        ).order_by(models.Conversation.lastMessageAt.desc()))
+        conversations = result.scalars().all()
     elif current_user.role == 'lawyer':
-        conversations = db.query(models.Conversation).filter(
+        result = await db.execute(select(models.Conversation).where(
             models.Conversation.lawyerId == current_user.id
-        ).order_by(models.Conversation.lastMessageAt.desc()).all()
+        ).order_by(models.Conversation.lastMessageAt.desc()))
+        conversations = result.scalars().all()
     else:
         conversations = []
     
     return conversations
 
 @router.get("/conversations/{conversation_id}/messages", response_model=List[schemas.Message])
-def get_messages(
+async def get_messages(
     conversation_id: str,
     skip: int = 0,
     limit: int = 100,
-    db: Session = Depends(database.get_db),
+    after_seq: Optional[int] = None,
+    db: AsyncSession = Depends(database.get_async_db),
     current_user = Depends(get_current_user)
 ):
-    """Get messages for a specific conversation"""
+    """Get messages for a specific conversation; with after_seq, only those newer than that sequence number"""
     if not hasattr(current_user, 'role'):
         raise HTTPException(status_code=403, detail="Authentication required")
     
     # Verify user has access to this conversation
-    conversation = db.query(models.Conversation).filter(
-        models.Conversation.id == conversation_id
-    ).first()
-    
-    if not conversation:
-        raise HTTPException(status_code=404, detail="Conversation not found")
-    
-    # Check access rights
-    if current_user.role == 'client' and conversation.clientId != current_user.id:
-        raise HTTPException(status_code=403, detail="Access denied")
-    elif current_user.role == 'lawyer' and conversation.lawyerId != current_user.id:
-        raise HTTPException(status_code=403, detail="Access denied")
+    await _require_member(db, conversation_id, current_user)
     
+    if after_seq is not None:
+        return await messages_after(db, conversation_id, after_seq, limit)
+
     # Get messages
-    messages = db.query(models.Message).filter(
+    result = await db.execute(select(models.Message).where(
         models.Message.conversationId == conversation_id
-    ).order_by(models.Message.timestamp.asc()).offset(skip).limit(limit).all()
+    ).order_by(models.Message.timestamp.asc()).offset(skip).limit(limit))
     
-    return messages
+    return result.scalars().all()
+
+async def messages_after(db: AsyncSession, conversation_id: str, after_seq: int, limit: int) -> List[models.Message]:
+    """Messages with a sequence number past after_seq, oldest first: a range scan on ix_messages_conversation_seq"""
+    result = await db.execute(select(models.Message).where(
+        models.Message.conversationId == conversation_id,
+        models.Message.seq > after_seq
+    ).order_by(models.Message.seq.asc()).limit(limit))
+    return result.scalars().all()
 
 @router.post("/conversations/{conversation_id}/messages", response_model=schemas.Message)
-def send_message(
+async def send_message(
     conversation_id: str,
     message_data: schemas.MessageCreate,
-    db: Session = Depends(database.get_db),
+    db: AsyncSession = Depends(database.get_async_db),
     current_user = Depends(get_current_user)
 ):
     """Send a message in a conversation"""
@@ -79,52 +165,17 @@ def send_message(
         raise HTTPException(status_code=403, detail="Authentication required")
     
     # Verify conversation exists and user has access
-    conversation = db.query(models.Conversation).filter(
-        models.Conversation.id == conversation_id
-    ).first()
-    
-    if not conversation:
-        raise HTTPException(status_code=404, detail="Conversation not found")
-    
-    # Check access rights
-    if current_user.role == 'client' and conversation.clientId != current_user.id:
-        raise HTTPException(status_code=403, detail="Access denied")
-    elif current_user.role == 'lawyer' and conversation.lawyerId != current_user.id:
-        raise HTTPException(status_code=403, detail="Access denied")
+    members = await _require_member(db, conversation_id, current_user)
     
-    # Create message
-    timestamp = datetime.now().isoformat()
-    message = models.Message(
-        id=str(uuid.uuid4()),
-        conversationId=conversation_id,
-        senderId=current_user.id,
-        senderRole=current_user.role,
-        senderName=current_user.name,
-        content=message_data.content,
-        timestamp=timestamp,
-        read=False
+    # Committed together with whatever other messages arrive at the same time
+    return await persist_message(
+        conversation_id, members, current_user.id, current_user.role, current_user.name, message_data.content
     )
-    db.add(message)
-    
-    # Update conversation
-    conversation.lastMessage = message_data.content
-    conversation.lastMessageAt = timestamp
-    
-    # Increment unread count for the other party
-    if current_user.role == 'client':
-        conversation.unreadByLawyer += 1
-    else:
-        conversation.unreadByClient += 1
-    
-    db.commit()
-    db.refresh(message)
-    
-    return message
 
 @router.put("/conversations/{conversation_id}/read")
-def mark_as_read(
+async def mark_as_read(
     conversation_id: str,
-    db: Session = Depends(database.get_db),
+    db: AsyncSession = Depends(database.get_async_db),
     current_user = Depends(get_current_user)
 ):
     """Mark all messages in a conversation as read"""
@@ -132,40 +183,28 @@ def mark_as_read(
         raise HTTPException(status_code=403, detail="Authentication required")
     
     # Verify conversation exists and user has access
-    conversation = db.query(models.Conversation).filter(
-        models.Conversation.id == conversation_id
-    ).first()
-    
-    if not conversation:
-        raise HTTPException(status_code=404, detail="Conversation not found")
-    
-    # Check access rights
-    if current_user.role == 'client' and conversation.clientId != current_user.id:
-        raise HTTPException(status_code=403, detail="Access denied")
-    elif current_user.role == 'lawyer' and conversation.lawyerId != current_user.id:
-        raise HTTPException(status_code=403, detail="Access denied")
+    await _require_member(db, conversation_id, current_user)
     
     # Mark messages as read
-    db.query(models.Message).filter(
+    await db.execute(update(models.Message).where(
         models.Message.conversationId == conversation_id,
         models.Message.senderId != current_user.id,
         models.Message.read == False
-    ).update({"read": True})
+    ).values(read=True))
     
     # Reset unread count
-    if current_user.role == 'client':
-        conversation.unreadByClient = 0
-    else:
-        conversation.unreadByLawyer = 0
+    reset = {"unreadByClient": 0} if current_user.role == 'client' else {"unreadByLawyer": 0}
+    await db.execute(update(models.Conversation).where(models.Conversation.id == conversation_id).values(**reset))
     
-    db.commit()
+    await db.commit()
+    invalidate_user(current_user.id)
     
     return {"message": "Messages marked as read"}
 
 @router.get("/conversations/with/{other_user_id}", response_model=schemas.Conversation)
-def get_or_create_conversation(
+async def get_or_create_conversation(
     other_user_id: str,
-    db: Session = Depends(database.get_db),
+    db: AsyncSession = Depends(database.get_async_db),
     current_user = Depends(get_current_user)
 ):
     """Get or create a conversation with another user"""
@@ -178,7 +217,7 @@ def get_or_create_conversation(
         lawyer_id = other_user_id
         
         # Get lawyer info
-        lawyer = db.query(models.Lawyer).filter(models.Lawyer.id == lawyer_id).first()
+        lawyer = await db.get(models.Lawyer, lawyer_id)
         if not lawyer:
             raise HTTPException(status_code=404, detail="Lawyer not found")
         
@@ -190,7 +229,7 @@ def get_or_create_conversation(
         lawyer_id = current_user.id
         
         # Get client info
-        client = db.query(models.Client).filter(models.Client.id == client_id).first()
+        client = await db.get(models.Client, client_id)
         if not client:
             raise HTTPException(status_code=404, detail="Client not found")
         
@@ -200,12 +239,14 @@ def get_or_create_conversation(
         raise HTTPException(status_code=403, detail="Invalid user role")
     
     # Check if conversation already exists
-    conversation = db.query(models.Conversation).filter(
+    result = await db.execute(select(models.Conversation).where(
         models.Conversation.clientId == client_id,
         models.Conversation.lawyerId == lawyer_id
-    ).first()
+    ))
+    conversation = result.scalars().first()
     
     if conversation:
+        conversation_members.set(conversation.id, (conversation.clientId, conversation.lawyerId))
         return conversation
     
     # Create new conversation
@@ -218,7 +259,8 @@ def get_or_create_conversation(
         createdAt=datetime.now().isoformat()
     )
     db.add(conversation)
-    db.commit()
-    db.refresh(conversation)
+    await db.commit()
+    await db.refresh(conversation)
+    conversation_members.set(conversation.id, (client_id, lawyer_id))
     
     return conversation
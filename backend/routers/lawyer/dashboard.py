@@ -1,8 +1,10 @@
 import models, schemas, database
 from fastapi import APIRouter, Depends, HTTPException
-from sqlalchemy.orm import Session
+from sqlalchemy import select, func, and_, true
+from sqlalchemy.ext.asyncio import AsyncSession
 from routers.common.auth import get_current_lawyer
-from datetime import datetime
+from utils.dashboard_cache import cache_stats, get_cached_stats
+from datetime import date
 
 router = APIRouter(
     prefix="/dashboard",
@@ -10,40 +12,47 @@ router = APIRouter(
 )
 
 @router.get("/stats")
-def get_lawyer_stats(
-    db: Session = Depends(database.get_db),
+async def get_lawyer_stats(
+    db: AsyncSession = Depends(database.get_async_db),
     current_user = Depends(get_current_lawyer)
 ):
-    # 1. Active Cases
-    active_cases = db.query(models.Case).filter(
+    cached = get_cached_stats("lawyer", current_user.id)
+    if cached is not None:
+        return cached
+
+    # One statement: each subquery aggregates to a single row, cross-joined together
+    cases = select(func.count().label("active")).where(
         models.Case.lawyerId == current_user.id,
         models.Case.status != 'Closed'
-    ).count()
-
-    # 2. Pending Requests (Appointments that are pending)
-    pending_requests = db.query(models.Appointment).filter(
-        models.Appointment.lawyerId == current_user.id,
-        models.Appointment.status == 'Pending'
-    ).count()
+    ).subquery()
 
-    # 3. Upcoming Appointments (Approved and in future)
-    today = datetime.now().strftime("%Y-%m-%d")
-    upcoming_appointments = db.query(models.Appointment).filter(
+    # Pending requests and upcoming (approved, in future) appointments by
+    # conditional aggregation over one scan of the lawyer's appointments
+    appointments = select(
+        func.count().filter(models.Appointment.status == 'Pending').label("pending"),
+        func.count().filter(and_(
+            models.Appointment.status == 'Approved',
+            models.Appointment.date >= date.today()
+        )).label("upcoming")
+    ).where(
         models.Appointment.lawyerId == current_user.id,
-        models.Appointment.date >= today,
-        models.Appointment.status == 'Approved'
-    ).count()
+        models.Appointment.status.in_(['Pending', 'Approved'])
+    ).subquery()
 
-    # 4. Unread Messages
-    unread_messages = db.query(models.Conversation).filter(
+    conversations = select(func.coalesce(func.sum(models.Conversation.unreadByLawyer), 0).label("unread")).where(
         models.Conversation.lawyerId == current_user.id
-    ).with_entities(models.Conversation.unreadByLawyer).all()
-    
-    total_unread = sum([conv.unreadByLawyer for conv in unread_messages])
+    ).subquery()
+
+    row = (await db.execute(
+        select(cases.c.active, appointments.c.pending, appointments.c.upcoming, conversations.c.unread)
+        .select_from(cases.join(appointments, true()).join(conversations, true()))
+    )).one()
 
-    return {
-        "activeCases": active_cases,
-        "pendingRequests": pending_requests,
-        "upcomingAppointments": upcoming_appointments,
-        "unreadMessages": total_unread
+    stats = {
+        "activeCases": row.active,
+        "pendingRequests": row.pending,
+        "upcomingAppointments": row.upcoming,
+        "unreadMessages": row.unread
     }
+    cache_stats("lawyer", current_user.id, stats)
+    return stats
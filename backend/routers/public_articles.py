@@ -1,5 +1,6 @@
 from fastapi import APIRouter, Depends, HTTPException
-from sqlalchemy.orm import Session
+from sqlalchemy import func, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
 from typing import List
 import models, schemas, database
 
@@ -8,47 +9,48 @@ router = APIRouter(
     tags=["public-articles"]
 )
 
-def get_db():
-    db = database.SessionLocal()
-    try:
-        yield db
-    finally:
-        db.close()
+async def _get_article(db: AsyncSession, *criteria):
+    result = await db.execute(select(models.Article).where(*criteria))
+    return result.scalars().first()
+
+async def _increment(db: AsyncSession, counter, *criteria) -> bool:
+    """
+    Add one to a counter in a single UPDATE on the primary, so concurrent
+    hits are never lost and a stale replica row is never written back.
+    Returns False when no article matched.
+    """
+    result = await db.execute(
+        update(models.Article).where(*criteria).values({counter: func.coalesce(counter, 0) + 1}).execution_options(synchronize_session=False)
+    )
+    await db.commit()
+    return result.rowcount > 0
 
 @router.get("/", response_model=List[schemas.Article])
-def get_public_articles(skip: int = 0, limit: int = 100, db: Session = Depends(get_db)):
-    articles = db.query(models.Article).filter(models.Article.status == "published").offset(skip).limit(limit).all()
-    return articles
+async def get_public_articles(skip: int = 0, limit: int = 100, db: AsyncSession = Depends(database.get_async_db)):
+    result = await db.execute(
+        select(models.Article).where(models.Article.status == "published").offset(skip).limit(limit)
+    )
+    return result.scalars().all()
 
 @router.get("/{article_id}", response_model=schemas.Article)
-def get_public_article(article_id: str, db: Session = Depends(get_db)):
-    article = db.query(models.Article).filter(models.Article.id == article_id, models.Article.status == "published").first()
-    if not article:
-        raise HTTPException(status_code=404, detail="Article not found")
-    
+async def get_public_article(article_id: str, db: AsyncSession = Depends(database.get_async_db)):
+    criteria = (models.Article.id == article_id, models.Article.status == "published")
     # Increment views
-    article.views += 1
-    db.commit()
-    db.refresh(article)
+    if not await _increment(db, models.Article.views, *criteria):
+        raise HTTPException(status_code=404, detail="Article not found")
     
-    return article
+    # The session has written, so this read comes from the primary with the new count
+    return await _get_article(db, *criteria)
 
 @router.post("/{article_id}/view")
-def increment_view(article_id: str, db: Session = Depends(get_db)):
-    article = db.query(models.Article).filter(models.Article.id == article_id).first()
-    if not article:
+async def increment_view(article_id: str, db: AsyncSession = Depends(database.get_async_db)):
+    if not await _increment(db, models.Article.views, models.Article.id == article_id):
         raise HTTPException(status_code=404, detail="Article not found")
-    
-    article.views += 1
-    db.commit()
     return {"message": "View incremented"}
 
 @router.post("/{article_id}/like")
-def increment_like(article_id: str, db: Session = Depends(get_db)):
-    article = db.query(models.Article).filter(models.Article.id == article_id).first()
-    if not article:
+async def increment_like(article_id: str, db: AsyncSession = Depends(database.get_async_db)):
+    if not await _increment(db, models.Article.likes, models.Article.id == article_id):
         raise HTTPException(status_code=404, detail="Article not found")
-    
-    article.likes += 1
-    db.commit()
+    article = await _get_article(db, models.Article.id == article_id)
     return {"message": "Like incremented", "likes": article.likes}
@@ -1,5 +1,17 @@
-from pydantic import BaseModel
+from pydantic import BaseModel, field_validator
 from typing import List, Optional
+from datetime import date, datetime
+
+def _to_date(value):
+    """Date fields also take datetimes, e.g. a JS toISOString(), and keep the date part"""
+    if isinstance(value, datetime):
+        return value.date()
+    if isinstance(value, str) and len(value) > 10:
+        try:
+            return datetime.fromisoformat(value.replace("Z", "+00:00")).date()
+        except ValueError:
+            pass
+    return value
 
 class Document(BaseModel):
     id: str
@@ -77,8 +89,12 @@ class PasswordResetConfirm(BaseModel):
 class Token(BaseModel):
     access_token: str
     token_type: str
+    refresh_token: Optional[str] = None
     user: Optional[dict] = None
 
+class RefreshRequest(BaseModel):
+    refresh_token: str
+
 class TokenData(BaseModel):
     email: Optional[str] = None
 
@@ -142,11 +158,13 @@ class CaseBase(BaseModel):
     status: str
     stage: str
     priority: str
-    createdAt: str
+    createdAt: date
     nextHearing: Optional[str] = None
     description: Optional[str] = None
     documents: List[dict] = []
 
+    _created_at_date = field_validator("createdAt", mode="before")(_to_date)
+
 class CaseUpdate(BaseModel):
     title: Optional[str] = None
     clientId: Optional[str] = None
@@ -154,11 +172,13 @@ class CaseUpdate(BaseModel):
     status: Optional[str] = None
     stage: Optional[str] = None
     priority: Optional[str] = None
-    createdAt: Optional[str] = None
+    createdAt: Optional[date] = None
     nextHearing: Optional[str] = None
     description: Optional[str] = None
     documents: Optional[List[dict]] = None
 
+    _created_at_date = field_validator("createdAt", mode="before")(_to_date)
+
 class Case(CaseBase):
     id: str
     class Config:
@@ -169,12 +189,14 @@ class AppointmentBase(BaseModel):
     lawyerName: str
     lawyerId: Optional[str] = None
     clientId: Optional[str] = None
-    date: str
+    date: date
     time: str
     type: str
     status: str
     notes: Optional[str] = None
 
+    _date = field_validator("date", mode="before")(_to_date)
+
 class Appointment(AppointmentBase):
     id: str
     class Config:
@@ -186,10 +208,12 @@ class PaymentBase(BaseModel):
     amount: float
     type: str
     status: str
-    date: str
+    date: date
     platformFee: float
     itemId: Optional[str] = None
 
+    _date = field_validator("date", mode="before")(_to_date)
+
 class Payment(PaymentBase):
     id: str
     class Config:
@@ -294,6 +318,7 @@ class ConversationBase(BaseModel):
 
 class Conversation(ConversationBase):
     id: str
+    lastSeq: Optional[int] = None
     class Config:
         from_attributes = True
 
@@ -303,11 +328,12 @@ class MessageBase(BaseModel):
     senderRole: str
     senderName: str
     content: str
-    timestamp: str
+    timestamp: datetime
     read: bool = False
 
 class Message(MessageBase):
     id: str
+    seq: Optional[int] = None
     class Config:
         from_attributes = True
 
@@ -338,7 +364,7 @@ class Order(BaseModel):
     paymentMethod: Optional[str] = None
     fullName: Optional[str] = None
     phoneNumber: Optional[str] = None
-    createdAt: str
+    createdAt: datetime
 
     class Config:
         from_attributes = True
@@ -0,0 +1,44 @@
+import sys
+import os
+
+# Add parent directory to path so we can import database
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from database import engine
+from sqlalchemy.schema import CreateIndex
+import models
+
+# Indexes declared in models.py for the dashboard, chat, book access and
+# analytics queries. create_all only adds them to new tables, so existing
+# databases get them from this script (safe to run more than once).
+HOT_PATH_INDEXES = {
+    "cases": ["ix_cases_lawyer_status", "ix_cases_client_status", "ix_cases_created_at"],
+    "appointments": ["ix_appointments_lawyer_status_date", "ix_appointments_client_date"],
+    "messages": ["ix_messages_conversation_timestamp", "ix_messages_conversation_read_sender"],
+    "payments": ["ix_payments_client_type_status_item", "ix_payments_status_date"],
+}
+
+def hot_path_indexes():
+    for table_name, index_names in HOT_PATH_INDEXES.items():
+        table = models.Base.metadata.tables[table_name]
+        by_name = {index.name: index for index in table.indexes}
+        for name in index_names:
+            yield by_name[name]
+
+def add_indexes(bind=engine):
+    postgres = bind.dialect.name == "postgresql"
+    # CREATE INDEX CONCURRENTLY cannot run inside a transaction block, so each
+    # statement is autocommitted; on Postgres this avoids locking out writes
+    with bind.connect().execution_options(isolation_level="AUTOCOMMIT") as conn:
+        for index in hot_path_indexes():
+            sql = str(CreateIndex(index, if_not_exists=True).compile(dialect=bind.dialect))
+            if postgres:
+                sql = sql.replace("CREATE INDEX", "CREATE INDEX CONCURRENTLY", 1)
+            try:
+                conn.exec_driver_sql(sql)
+                print(f"{index.name} ready")
+            except Exception as e:
+                print(f"Error creating {index.name}: {e}")
+
+if __name__ == "__main__":
+    add_indexes()
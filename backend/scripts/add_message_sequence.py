@@ -0,0 +1,59 @@
+import sys
+import os
+
+# Add parent directory to path so we can import database
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from database import engine
+from sqlalchemy import func, select, update
+from sqlalchemy.schema import CreateIndex
+import models
+
+# Adds messages.seq and conversations.lastSeq to an existing database,
+# numbers the stored messages of each conversation in timestamp order and
+# creates the unique (conversationId, seq) index used for reconnect replay.
+# Run it before starting the new code; safe to run more than once.
+
+def add_message_sequence(bind=engine):
+    quote = bind.dialect.identifier_preparer.quote
+    with bind.connect() as conn:
+        for table, column, ddl in (
+            ("messages", "seq", "INTEGER"),
+            ("conversations", "lastSeq", "INTEGER DEFAULT 0"),
+        ):
+            try:
+                with conn.begin_nested():
+                    conn.exec_driver_sql(f"ALTER TABLE {table} ADD COLUMN {quote(column)} {ddl}")
+                print(f"Added {table}.{column}")
+            except Exception as e:
+                print(f"Skipped {table}.{column}: {e}")
+
+        messages = models.Message.__table__
+        conversations = models.Conversation.__table__
+        numbered = select(
+            messages.c.id,
+            func.row_number().over(
+                partition_by=messages.c.conversationId,
+                order_by=(messages.c.timestamp, messages.c.id)
+            ).label("seq")
+        ).subquery()
+        # Rows numbered by an earlier run keep their numbers
+        result = conn.execute(update(messages).where(
+            messages.c.id == numbered.c.id, messages.c.seq.is_(None)
+        ).values(seq=numbered.c.seq))
+        print(f"Numbered {result.rowcount} messages")
+
+        last_seq = select(func.max(messages.c.seq)).where(
+            messages.c.conversationId == conversations.c.id
+        ).scalar_subquery()
+        conn.execute(update(conversations).values(lastSeq=func.coalesce(last_seq, 0)))
+        conn.commit()
+
+    index = next(i for i in models.Message.__table__.indexes if i.name == "ix_messages_conversation_seq")
+    with bind.connect() as conn:
+        conn.execute(CreateIndex(index, if_not_exists=True))
+        conn.commit()
+        print(f"{index.name} ready")
+
+if __name__ == "__main__":
+    add_message_sequence()
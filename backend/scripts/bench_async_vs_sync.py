@@ -0,0 +1,147 @@
+"""
+Requests/sec and latency of the sync (threadpool + SessionLocal) path against
+the async (AsyncSessionLocal) path, both running the same published-articles
+query as /public/articles/.
+
+The script serves a small app exposing /sync/articles and /async/articles with
+uvicorn in a subprocess, then drives each endpoint with many concurrent
+connections. Point DATABASE_URL at Postgres to measure asyncpg vs psycopg2;
+by default a temporary SQLite database is seeded.
+
+Usage (from backend/, needs `pip install httpx`):
+    python scripts/bench_async_vs_sync.py --requests 4000 --concurrency 200
+"""
+import argparse
+import asyncio
+import os
+import subprocess
+import sys
+import tempfile
+import time
+import uuid
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+os.environ.setdefault("DATABASE_URL", "sqlite:///" + os.path.join(tempfile.mkdtemp(), "bench.db"))
+
+import httpx
+from fastapi import FastAPI
+from sqlalchemy import select
+
+import database
+import models
+
+app = FastAPI()
+
+
+@app.get("/sync/articles")
+def sync_articles(limit: int = 20):
+    db = database.SessionLocal()
+    try:
+        articles = db.query(models.Article).filter(models.Article.status == "published").limit(limit).all()
+        return [{"id": a.id, "title": a.title} for a in articles]
+    finally:
+        db.close()
+
+
+@app.get("/async/articles")
+async def async_articles(limit: int = 20):
+    async with database.AsyncSessionLocal() as db:
+        result = await db.execute(
+            select(models.Article).where(models.Article.status == "published").limit(limit)
+        )
+        return [{"id": a.id, "title": a.title} for a in result.scalars()]
+
+
+def seed(count=200):
+    models.Base.metadata.create_all(bind=database.engine)
+    db = database.SessionLocal()
+    try:
+        if db.query(models.Article).count() >= count:
+            return
+        for i in range(count):
+            db.add(models.Article(
+                id=str(uuid.uuid4()), title=f"Article {i}", content="Lorem ipsum " * 50,
+                author="Bench", category="General", status="published",
+                publishedAt="2024-01-01", views=0, likes=0
+            ))
+        db.commit()
+    finally:
+        db.close()
+
+
+def percentile(values, pct):
+    if not values:
+        return 0.0
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * pct / 100))]
+
+
+async def drive(url, total, concurrency):
+    latencies, errors = [], 0
+    counter = iter(range(total))
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+    async with httpx.AsyncClient(limits=limits, timeout=60) as client:
+        await client.get(url)  # warm up
+
+        async def worker():
+            nonlocal errors
+            for _ in counter:
+                start = time.perf_counter()
+                r = await client.get(url)
+                latencies.append(time.perf_counter() - start)
+                if r.status_code != 200:
+                    errors += 1
+
+        started = time.perf_counter()
+        await asyncio.gather(*(worker() for _ in range(concurrency)))
+        elapsed = time.perf_counter() - started
+    return total / elapsed, latencies, errors
+
+
+def wait_until_up(base_url, timeout=30):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        try:
+            httpx.get(base_url + "/docs", timeout=1)
+            return
+        except httpx.HTTPError:
+            time.sleep(0.2)
+    raise RuntimeError("bench app did not start")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=4000)
+    parser.add_argument("--concurrency", type=int, default=200)
+    parser.add_argument("--port", type=int, default=8766)
+    parser.add_argument("--serve", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.serve:
+        import uvicorn
+        uvicorn.run(app, port=args.port, log_level="warning")
+        return
+
+    seed()
+    base_url = f"http://127.0.0.1:{args.port}"
+    server = subprocess.Popen(
+        [sys.executable, os.path.abspath(__file__), "--serve", "--port", str(args.port)],
+        env=dict(os.environ), stdout=subprocess.DEVNULL,
+    )
+    try:
+        wait_until_up(base_url)
+        print(f"{database.engine.url.drivername} / {database.async_engine.url.drivername}, "
+              f"{args.requests} requests, concurrency {args.concurrency}")
+        print(f"{'path':<8} {'req/s':>9} {'p50 ms':>9} {'p99 ms':>9} {'errors':>7}")
+        for label in ("sync", "async"):
+            rps, latencies, errors = asyncio.run(drive(f"{base_url}/{label}/articles", args.requests, args.concurrency))
+            print(f"{label:<8} {rps:>9.1f} {percentile(latencies, 50) * 1000:>9.1f} "
+                  f"{percentile(latencies, 99) * 1000:>9.1f} {errors:>7}")
+    finally:
+        server.terminate()
+        server.wait()
+
+
+if __name__ == "__main__":
+    main()
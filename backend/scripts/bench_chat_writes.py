@@ -0,0 +1,117 @@
+"""
+Chat messages/sec stored one transaction per message (insert + conversation
+update + commit, what send_message used to do) against the write-behind
+buffer that /ws/chat and send_message now use, which commits everything
+arriving within CHAT_WRITE_DELAY_MS together.
+
+Each run has --senders concurrent senders spread over --conversations
+conversations. Every sender writes its messages one after another and waits
+for the commit each time, as a socket does before it acknowledges. Point
+DATABASE_URL at Postgres for production-like numbers; by default a temporary
+SQLite database is used.
+
+Usage (from backend/):
+    python scripts/bench_chat_writes.py --messages 20000 --senders 200
+"""
+import argparse
+import asyncio
+import os
+import sys
+import tempfile
+import time
+import uuid
+from datetime import datetime
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+os.environ.setdefault("DATABASE_URL", "sqlite:///" + os.path.join(tempfile.mkdtemp(), "bench.db"))
+
+from sqlalchemy import delete, func, insert, select, update
+
+import database
+import models
+from utils.chat_writer import message_writer
+
+
+def seed(conversations: int):
+    models.Base.metadata.create_all(bind=database.engine)
+    with database.engine.begin() as conn:
+        conn.execute(delete(models.Message))
+        conn.execute(delete(models.Conversation))
+        conn.execute(insert(models.Conversation), [
+            {"id": f"bench-{i}", "clientId": f"client-{i}", "lawyerId": f"lawyer-{i}", "clientName": "Client",
+             "lawyerName": "Lawyer", "unreadByClient": 0, "unreadByLawyer": 0, "createdAt": "2026-01-01T00:00:00"}
+            for i in range(conversations)
+        ])
+
+
+def message(conversation_id: str, n: int) -> dict:
+    return {
+        "id": str(uuid.uuid4()), "conversationId": conversation_id, "senderId": "client", "senderRole": "client",
+        "senderName": "Client", "content": f"message {n}", "timestamp": datetime.now(), "read": False,
+    }
+
+
+async def write_per_message(row: dict):
+    async with database.AsyncSessionLocal() as db:
+        await db.execute(insert(models.Message), [row])
+        await db.execute(update(models.Conversation).where(models.Conversation.id == row["conversationId"]).values(
+            lastMessage=row["content"],
+            lastMessageAt=row["timestamp"].isoformat(),
+            unreadByLawyer=models.Conversation.unreadByLawyer + 1,
+        ))
+        await db.commit()
+
+
+async def write_behind(row: dict):
+    await message_writer.write(row, "lawyer")
+
+
+async def run(name, write, total, senders, conversations):
+    seed(conversations)
+    latencies = []
+
+    async def sender(index: int, count: int):
+        conversation_id = f"bench-{index % conversations}"
+        for n in range(count):
+            started = time.perf_counter()
+            await write(message(conversation_id, n))
+            latencies.append(time.perf_counter() - started)
+
+    per_sender = total // senders
+    started = time.perf_counter()
+    await asyncio.gather(*(sender(i, per_sender) for i in range(senders)))
+    elapsed = time.perf_counter() - started
+
+    with database.engine.connect() as conn:
+        stored = conn.execute(select(func.count()).select_from(models.Message)).scalar()
+        unread = conn.execute(select(func.sum(models.Conversation.unreadByLawyer))).scalar()
+    latencies.sort()
+    print(
+        f"{name:>16}: {stored / elapsed:9.0f} msg/s  "
+        f"ack p50 {latencies[len(latencies) // 2] * 1000:7.2f} ms  "
+        f"p95 {latencies[int(len(latencies) * 0.95)] * 1000:7.2f} ms  "
+        f"({stored} stored, unread total {unread})"
+    )
+    if stored != per_sender * senders or unread != stored:
+        raise SystemExit(f"FAILED: {name} stored {stored} messages with {unread} unread, expected {per_sender * senders}")
+
+
+async def main_async(args):
+    await run("per message", write_per_message, args.messages, args.senders, args.conversations)
+    await run("write-behind", write_behind, args.messages, args.senders, args.conversations)
+    print(f"write-behind batches: {message_writer.stats()}")
+    await message_writer.stop()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--messages", type=int, default=20000)
+    parser.add_argument("--senders", type=int, default=200, help="concurrent senders, like open sockets")
+    parser.add_argument("--conversations", type=int, default=100)
+    args = parser.parse_args()
+    asyncio.run(main_async(args))
+
+
+if __name__ == "__main__":
+    main()
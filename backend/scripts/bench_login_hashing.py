@@ -0,0 +1,128 @@
+"""
+Login throughput: inline password hashing vs the hashing process pool.
+
+Starts the API with uvicorn once per mode, fires concurrent /auth/login
+requests and, at the same time, polls a cheap endpoint to show how much the
+hashing work starves unrelated sync handlers.
+
+Logins are spread over distinct seeded client accounts and client IPs
+(X-Forwarded-For, with RATE_LIMIT_TRUST_PROXY on), so the login rate
+limiter never answers 429 and every request really hashes a password.
+
+Usage (from backend/):
+    python scripts/bench_login_hashing.py --requests 400 --concurrency 32 --workers 4
+"""
+import argparse
+import math
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+PASSWORD = "bench-password"
+# Stays below the login limiter's burst of 10 per email
+LOGINS_PER_ACCOUNT = 8
+
+
+def wait_until_up(base_url, timeout=30):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        try:
+            requests.get(base_url + "/", timeout=1)
+            return
+        except requests.RequestException:
+            time.sleep(0.2)
+    raise RuntimeError("API did not start")
+
+
+def percentile(values, pct):
+    if not values:
+        return 0.0
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * pct / 100))]
+
+
+def run_mode(label, pool_workers, args):
+    port = args.port
+    base_url = f"http://127.0.0.1:{port}"
+    env = dict(os.environ)
+    env["HASH_POOL_WORKERS"] = str(pool_workers)
+    env["HASH_QUEUE_LIMIT"] = str(args.queue_limit)
+    env["RATE_LIMIT_TRUST_PROXY"] = "true"
+    env.setdefault("DATABASE_URL", "sqlite:///" + os.path.join(tempfile.mkdtemp(), "bench.db"))
+
+    server = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "main:app", "--port", str(port), "--log-level", "warning"],
+        cwd=BACKEND_DIR, env=env, stdout=subprocess.DEVNULL,
+    )
+    try:
+        wait_until_up(base_url)
+        # Seeding also warms up the hashing path; it is not timed
+        accounts = [f"bench{i}@example.com" for i in range(math.ceil(args.requests / LOGINS_PER_ACCOUNT))]
+        with ThreadPoolExecutor(max_workers=args.concurrency) as pool:
+            list(pool.map(lambda email: requests.post(base_url + "/clients/register", json={
+                "name": "Bench", "email": email, "password": PASSWORD
+            }), accounts))
+
+        login_latencies, statuses = [], {}
+        probe_latencies = []
+        done = threading.Event()
+
+        def login(i):
+            start = time.perf_counter()
+            r = requests.post(
+                base_url + "/auth/login",
+                json={"email": accounts[i % len(accounts)], "password": PASSWORD},
+                headers={"X-Forwarded-For": f"10.{i // 65536 % 256}.{i // 256 % 256}.{i % 256}"},
+            )
+            login_latencies.append(time.perf_counter() - start)
+            statuses[r.status_code] = statuses.get(r.status_code, 0) + 1
+
+        def probe():
+            while not done.is_set():
+                start = time.perf_counter()
+                requests.get(base_url + "/")
+                probe_latencies.append(time.perf_counter() - start)
+                time.sleep(0.01)
+
+        prober = threading.Thread(target=probe)
+        prober.start()
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=args.concurrency) as pool:
+            list(pool.map(login, range(args.requests)))
+        elapsed = time.perf_counter() - started
+        done.set()
+        prober.join()
+
+        print(f"{label:<22} {args.requests / elapsed:>9.1f} "
+              f"{percentile(login_latencies, 50) * 1000:>9.1f} "
+              f"{percentile(login_latencies, 99) * 1000:>9.1f} "
+              f"{percentile(probe_latencies, 99) * 1000:>11.1f}   {statuses}")
+    finally:
+        server.terminate()
+        server.wait()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=400)
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument("--workers", type=int, default=min(4, os.cpu_count() or 1))
+    parser.add_argument("--queue-limit", type=int, default=256)
+    parser.add_argument("--port", type=int, default=8765)
+    args = parser.parse_args()
+
+    print(f"{'mode':<22} {'login/s':>9} {'p50 ms':>9} {'p99 ms':>9} {'probe p99':>11}   statuses")
+    run_mode("inline", 0, args)
+    run_mode(f"pool ({args.workers} workers)", args.workers, args)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,87 @@
+"""
+Delivers queued outbox emails to a local aiosmtpd server and checks that a
+single SMTP connection carries the whole batch, that failures are retried and
+that a batch stops at the first connection failure.
+
+Usage (from backend/, needs `pip install aiosmtpd`):
+    python scripts/check_email_outbox.py
+"""
+import os
+import sys
+import tempfile
+from datetime import datetime
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from aiosmtpd.controller import Controller
+
+PORT = 8025
+os.environ.setdefault("DATABASE_URL", "sqlite:///" + os.path.join(tempfile.mkdtemp(), "outbox.db"))
+os.environ.update({
+    "SMTP_SERVER": "127.0.0.1",
+    "SMTP_PORT": str(PORT),
+    "SMTP_USE_TLS": "false",
+    "SMTP_AUTH": "false",
+    "SMTP_USERNAME": "",
+    "SMTP_PASSWORD": "",
+    "EMAIL_RETRY_BASE_SECONDS": "0",
+})
+
+import database
+import models
+from utils.email import queue_email, outbox_sender
+
+
+class Recorder:
+    def __init__(self):
+        self.messages = []
+        self.sessions = set()
+
+    async def handle_DATA(self, server, session, envelope):
+        self.messages.append(envelope.rcpt_tos[0])
+        self.sessions.add(id(session))
+        return "250 OK"
+
+
+def main():
+    models.Base.metadata.create_all(bind=database.engine)
+    db = database.SessionLocal()
+    db.query(models.EmailOutbox).delete()
+    for i in range(10):
+        queue_email(db, f"user{i}@example.com", "Hello", f"Message {i}")
+    db.commit()
+
+    # 1. SMTP server down: the batch stops at the first connection failure
+    # and every email is rescheduled, none lost
+    outbox_sender.flush(db)
+    pending = db.query(models.EmailOutbox).filter(models.EmailOutbox.status == "pending").count()
+    assert pending == 10, pending
+    attempts = sum(item.attempts for item in db.query(models.EmailOutbox))
+    assert attempts == 1, attempts
+    print("server down -> 1 connection attempt, 10 emails kept for retry")
+
+    # A sender that died mid-batch leaves 'sending' rows; they are retried once the lease runs out
+    stale = db.query(models.EmailOutbox).order_by(models.EmailOutbox.id).first()
+    stale.status = "sending"
+    stale.nextAttemptAt = datetime(2000, 1, 1)
+    db.commit()
+
+    # 2. Server up: the batch goes out over one connection
+    recorder = Recorder()
+    controller = Controller(recorder, hostname="127.0.0.1", port=PORT)
+    controller.start()
+    try:
+        delivered = outbox_sender.flush(db)
+        assert delivered == 10, delivered
+        assert len(recorder.messages) == 10
+        assert len(recorder.sessions) == 1, recorder.sessions
+        print(f"delivered {delivered} emails over {len(recorder.sessions)} SMTP session")
+    finally:
+        outbox_sender._close()
+        controller.stop()
+        db.close()
+    print("OK")
+
+
+if __name__ == "__main__":
+    main()
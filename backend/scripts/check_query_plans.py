@@ -0,0 +1,202 @@
+"""
+Fails if a hot query falls back to a sequential scan.
+
+Seeds a large dataset into a scratch database, EXPLAINs the dashboard, chat,
+book-access, analytics and activity feed queries, and exits non-zero when
+any plan scans a whole table. The hot-path indexes are dropped first and re-added through
+scripts/add_hot_path_indexes.py, so the run also exercises the migration on
+a pre-index schema.
+
+Usage (from backend/):
+    python scripts/check_query_plans.py
+    QUERY_PLAN_DATABASE_URL=postgresql+psycopg2://user:pw@localhost/plancheck python scripts/check_query_plans.py
+
+Never point QUERY_PLAN_DATABASE_URL at a real database: it is filled with test rows.
+"""
+import argparse
+import json
+import os
+import random
+import sys
+import tempfile
+import uuid
+from datetime import date, datetime, time, timedelta
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+os.environ["DATABASE_URL"] = os.getenv(
+    "QUERY_PLAN_DATABASE_URL", "sqlite:///" + os.path.join(tempfile.mkdtemp(), "plans.db")
+)
+
+from sqlalchemy import func, insert, select, tuple_, update
+
+from utils.periods import bucket_expression
+from sqlalchemy.schema import DropIndex
+
+import database
+import models
+from add_hot_path_indexes import add_indexes, hot_path_indexes
+
+LAWYER_ID = "lawyer-7"
+CLIENT_ID = "client-42"
+CLIENT_NAME = "Client 42"
+CONVERSATION_ID = "conversation-3"
+TODAY = date.today()
+
+
+def hot_queries(dialect_name):
+    """The statements behind the dashboards, chat, client/books.py and analytics"""
+    month_start = TODAY.replace(day=1)
+    revenue_bucket = bucket_expression(models.Payment.date, "month", dialect_name)
+    cases_bucket = bucket_expression(models.Case.createdAt, "month", dialect_name)
+    return {
+        "lawyer dashboard: active cases": select(func.count()).select_from(models.Case).where(
+            models.Case.lawyerId == LAWYER_ID, models.Case.status != "Closed"),
+        "client dashboard: active cases": select(func.count()).select_from(models.Case).where(
+            models.Case.clientId == CLIENT_ID, models.Case.status != "Closed"),
+        "lawyer dashboard: pending requests": select(func.count()).select_from(models.Appointment).where(
+            models.Appointment.lawyerId == LAWYER_ID, models.Appointment.status == "Pending"),
+        "lawyer dashboard: upcoming": select(func.count()).select_from(models.Appointment).where(
+            models.Appointment.lawyerId == LAWYER_ID, models.Appointment.date >= TODAY,
+            models.Appointment.status == "Approved"),
+        "client dashboard: upcoming": select(func.count()).select_from(models.Appointment).where(
+            models.Appointment.clientId == CLIENT_ID, models.Appointment.date >= TODAY,
+            models.Appointment.status != "Cancelled"),
+        "chat: message history": select(models.Message).where(
+            models.Message.conversationId == CONVERSATION_ID
+        ).order_by(models.Message.timestamp.asc()).offset(0).limit(100),
+        "chat: replay after seq": select(models.Message).where(
+            models.Message.conversationId == CONVERSATION_ID, models.Message.seq > 100
+        ).order_by(models.Message.seq.asc()).limit(201),
+        "chat: mark as read": update(models.Message).where(
+            models.Message.conversationId == CONVERSATION_ID, models.Message.senderId != LAWYER_ID,
+            models.Message.read == False).values(read=True),
+        "books: purchased": select(models.Payment).where(
+            models.Payment.clientName == CLIENT_NAME, models.Payment.type == "book",
+            models.Payment.status == "completed", models.Payment.itemId.isnot(None)),
+        "books: access check": select(models.Payment).where(
+            models.Payment.clientName == CLIENT_NAME, models.Payment.type == "book",
+            models.Payment.status == "completed", models.Payment.itemId == "book-5"),
+        "books: has consultation": select(models.Payment).where(
+            models.Payment.clientName == CLIENT_NAME, models.Payment.type.in_(["consultation", "case"]),
+            models.Payment.status == "completed"),
+        "analytics: revenue by month": select(revenue_bucket, func.sum(models.Payment.amount)).where(
+            models.Payment.status == "completed", models.Payment.date >= month_start,
+            models.Payment.date <= TODAY).group_by(revenue_bucket),
+        "analytics: cases by month": select(cases_bucket, func.count()).where(
+            models.Case.createdAt >= month_start, models.Case.createdAt <= TODAY).group_by(cases_bucket),
+        "dashboard: activity feed page": select(models.ActivityEvent).where(
+            tuple_(models.ActivityEvent.createdAt, models.ActivityEvent.id) < (datetime.combine(TODAY, time()), 1000)
+        ).order_by(models.ActivityEvent.createdAt.desc(), models.ActivityEvent.id.desc()).limit(11),
+    }
+
+
+def seed(conn, rows):
+    rng = random.Random(7)
+    lawyers, clients, conversations = max(10, rows // 100), max(10, rows // 20), max(10, rows // 50)
+    days = [date.today() + timedelta(days=d) for d in range(-365, 90)]
+
+    def batches(make):
+        batch = []
+        for i in range(rows):
+            batch.append(make(i))
+            if len(batch) == 5000:
+                yield batch
+                batch = []
+        if batch:
+            yield batch
+
+    for batch in batches(lambda i: {
+        "id": str(uuid.uuid4()), "title": f"Case {i}", "lawyerId": f"lawyer-{rng.randrange(lawyers)}",
+        "clientId": f"client-{rng.randrange(clients)}", "status": rng.choice(["Open", "In Progress", "Closed"]),
+        "createdAt": rng.choice(days), "documents": []}):
+        conn.execute(insert(models.Case), batch)
+    for batch in batches(lambda i: {
+        "id": str(uuid.uuid4()), "lawyerId": f"lawyer-{rng.randrange(lawyers)}",
+        "clientId": f"client-{rng.randrange(clients)}", "date": rng.choice(days), "time": "10:00",
+        "type": "Consultation", "status": rng.choice(["Pending", "Approved", "Cancelled", "Completed"])}):
+        conn.execute(insert(models.Appointment), batch)
+    for batch in batches(lambda i: {
+        "id": str(uuid.uuid4()), "conversationId": f"conversation-{rng.randrange(conversations)}",
+        "senderId": rng.choice([LAWYER_ID, CLIENT_ID]), "senderRole": "client", "senderName": "x",
+        "content": "hello", "timestamp": datetime.combine(rng.choice(days), time(rng.randrange(24))),
+        "read": rng.random() < 0.8, "seq": i}):
+        conn.execute(insert(models.Message), batch)
+    for batch in batches(lambda i: {
+        "id": str(uuid.uuid4()), "clientName": f"Client {rng.randrange(clients)}", "amount": 10.0,
+        "type": rng.choice(["book", "consultation", "case", "subscription"]),
+        "status": rng.choice(["completed", "pending", "failed"]), "date": rng.choice(days),
+        "platformFee": 1.0, "itemId": f"book-{rng.randrange(200)}"}):
+        conn.execute(insert(models.Payment), batch)
+    for batch in batches(lambda i: {
+        "createdAt": datetime.combine(rng.choice(days), time(rng.randrange(24))), "type": "case",
+        "text": f"New case created: Case {i}"}):
+        conn.execute(insert(models.ActivityEvent), batch)
+    conn.exec_driver_sql("ANALYZE")
+
+
+def explain(conn, statement):
+    """Return (plan lines, whether any table is scanned in full)"""
+    sql = str(statement.compile(dialect=conn.dialect, compile_kwargs={"literal_binds": True}))
+    if conn.dialect.name == "sqlite":
+        details = [row[3] for row in conn.exec_driver_sql("EXPLAIN QUERY PLAN " + sql)]
+        # SEARCH uses an index lookup; SCAN walks a whole table (or a whole index)
+        scanned = any(d.startswith("SCAN ") and "CONSTANT ROW" not in d for d in details)
+        return details, scanned
+    plan = conn.exec_driver_sql("EXPLAIN (FORMAT JSON) " + sql).scalar()
+    if isinstance(plan, str):
+        plan = json.loads(plan)
+    details, stack = [], [plan[0]["Plan"]]
+    while stack:
+        node = stack.pop()
+        details.append(f"{node['Node Type']} {node.get('Index Name') or node.get('Relation Name') or ''}".strip())
+        stack.extend(node.get("Plans", []))
+    return details, any(d.startswith("Seq Scan") for d in details)
+
+
+def check_plans(conn, verbose=True):
+    failures = []
+    for label, statement in hot_queries(conn.dialect.name).items():
+        details, scanned = explain(conn, statement)
+        if scanned:
+            failures.append(label)
+        if verbose:
+            print(f"  {'SEQ SCAN' if scanned else 'ok':<8} {label:<36} {' | '.join(details)}")
+    return failures
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=50000, help="rows per seeded table")
+    args = parser.parse_args()
+
+    models.Base.metadata.create_all(bind=database.engine)
+    # Start from the schema existing deployments have: no composite indexes
+    with database.engine.begin() as conn:
+        for index in hot_path_indexes():
+            conn.execute(DropIndex(index, if_exists=True))
+        print(f"Seeding {args.rows} rows per table into {database.engine.url.render_as_string(hide_password=True)}")
+        seed(conn, args.rows)
+
+    with database.engine.connect() as conn:
+        print("Before migration:")
+        before = check_plans(conn)
+    if not before:
+        print("Expected sequential scans without the composite indexes; is the check working?")
+        sys.exit(1)
+
+    add_indexes(database.engine)
+    with database.engine.begin() as conn:
+        conn.exec_driver_sql("ANALYZE")
+    with database.engine.connect() as conn:
+        print("After migration:")
+        failures = check_plans(conn)
+    if failures:
+        print(f"FAILED: sequential scan in {', '.join(failures)}")
+        sys.exit(1)
+    print("OK")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,108 @@
+"""
+Checks read-replica routing with SQLite files standing in for the primary
+and replicas: GET requests read from a replica, a client's own writes are
+read back from the primary for READ_YOUR_WRITES_SECONDS, and an unreachable
+replica is skipped in favour of another replica or the primary. View and
+like counters are incremented on the primary.
+
+The same article is stored with a different title in each database, so the
+title in a response shows which database served it.
+
+Usage (from backend/):
+    python scripts/check_read_replicas.py
+"""
+import os
+import sys
+import tempfile
+import time
+import uuid
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+workdir = tempfile.mkdtemp()
+PRIMARY_URL = "sqlite:///" + os.path.join(workdir, "primary.db")
+REPLICA_URL = "sqlite:///" + os.path.join(workdir, "replica.db")
+DEAD_URL = "sqlite:///" + os.path.join(workdir, "missing", "replica.db")
+os.environ.update({
+    "DATABASE_URL": PRIMARY_URL,
+    "DATABASE_REPLICA_URLS": f"{REPLICA_URL},{DEAD_URL}",
+    "READ_YOUR_WRITES_SECONDS": "1",
+    "REPLICA_RETRY_SECONDS": "60",
+})
+
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine
+from sqlalchemy.orm import Session
+
+import database
+import models
+
+ARTICLE_ID = str(uuid.uuid4())
+
+
+def seed(url, title, views=0):
+    engine = create_engine(url)
+    models.Base.metadata.create_all(bind=engine)
+    with Session(engine) as db:
+        db.add(models.Article(
+            id=ARTICLE_ID, title=title, content="...", author="Check", category="General",
+            status="published", publishedAt="2024-01-01", views=views, likes=0
+        ))
+        db.commit()
+    engine.dispose()
+
+
+def served_by(client):
+    articles = client.get("/public/articles/").json()
+    return articles[0]["title"]
+
+
+def main():
+    # The replica lags behind the primary's view count
+    seed(PRIMARY_URL, "primary", views=5)
+    seed(REPLICA_URL, "replica")
+
+    import main as app_module
+    with TestClient(app_module.app) as client:
+        # Round-robin: the healthy replica, then the missing one, which is
+        # retried on the next healthy replica and skipped from then on
+        assert [served_by(client) for _ in range(4)] == ["replica"] * 4
+        assert database.async_replicas.fallbacks == 1
+        print("GET traffic -> replica, unreachable replica skipped")
+
+        # With no healthy replica left, reads go to the primary
+        database.async_replicas.mark_down(0)
+        assert served_by(client) == "primary"
+        database.async_replicas._down_until.clear()
+        print("all replicas down -> primary")
+
+        # A write pins this client's reads to the primary for the window
+        assert client.post(f"/public/articles/{ARTICLE_ID}/like").status_code == 200
+        assert served_by(client) == "primary"
+        print("read after own write -> primary")
+        time.sleep(1.1)
+        assert served_by(client) == "replica"
+        print("after READ_YOUR_WRITES_SECONDS -> replica")
+
+        # Counters are incremented on the primary, never from the stale replica row
+        article = client.get(f"/public/articles/{ARTICLE_ID}").json()
+        assert (article["title"], article["views"]) == ("primary", 6), article
+        assert client.post(f"/public/articles/{ARTICLE_ID}/view").status_code == 200
+        assert client.get(f"/public/articles/{ARTICLE_ID}").json()["views"] == 8
+        assert client.get("/public/articles/missing").status_code == 404
+        print("view counter -> atomic update on the primary")
+
+        # Sync routes go through the same routing session
+        db = database.SessionLocal()
+        try:
+            with database.route_reads("GET"):
+                assert db.get(models.Article, ARTICLE_ID).title == "replica"
+        finally:
+            db.close()
+        print("sync session -> replica")
+    print(database.replica_stats())
+    print("OK")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,234 @@
+"""
+Checks the chat ConnectionManager: fan-out between workers through the
+pub/sub backend, per-socket send queues and the heartbeat.
+
+Runs three ConnectionManagers in one process as if they were separate
+workers, each holding its own fake sockets, and asserts that:
+  - a message sent on one worker reaches a user connected to another,
+    on every socket (tab) they have open, across workers,
+  - only workers holding one of the recipient's sockets receive it,
+  - broadcasts reach every connected socket exactly once,
+  - after a disconnect the user's channel is dropped,
+  - channel handlers (e.g. principal cache invalidation) run on every other
+    worker, whether published from the event loop or a sync endpoint's thread,
+  - a client that stops reading is dropped once its queue overflows,
+    without delaying delivery to the others,
+  - quiet sockets are pinged, silent ones reaped, and the gauges filled in.
+
+The in-process backend always runs; the Redis backend runs against fakeredis
+when it is installed, or a real server with --redis-url.
+
+Usage (from backend/):
+    python scripts/check_websocket_manager.py
+    python scripts/check_websocket_manager.py --redis-url redis://localhost:6379/0
+"""
+import argparse
+import asyncio
+import os
+import sys
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utils.pubsub import MemoryPubSub, RedisPubSub
+from websocket_manager import ConnectionManager, WS_SEND_QUEUE_SIZE, WS_HEARTBEAT_INTERVAL, WS_HEARTBEAT_TIMEOUT
+
+
+class FakeSocket:
+    def __init__(self):
+        self.json = []
+        self.text = []
+        self.closed = None
+
+    async def accept(self):
+        pass
+
+    async def close(self, code=1000, reason=None):
+        self.closed = code
+
+    async def send_json(self, message):
+        self.json.append(message)
+
+    async def send_text(self, message):
+        self.text.append(message)
+
+
+class StalledSocket(FakeSocket):
+    """A client that stopped reading: every send blocks"""
+
+    async def send_json(self, message):
+        await asyncio.Event().wait()
+
+
+async def settle(condition, timeout=5.0):
+    """Wait for deliveries that go through a real (or fake) Redis connection"""
+    loop = asyncio.get_running_loop()
+    deadline = loop.time() + timeout
+    while not condition():
+        if loop.time() > deadline:
+            return False
+        await asyncio.sleep(0.01)
+    # Give anything that should not arrive a chance to show up
+    await asyncio.sleep(0.1)
+    return True
+
+
+async def check_backend(name, make_pubsub) -> list:
+    failures = []
+    workers = [ConnectionManager(make_pubsub()) for _ in range(3)]
+    for worker in workers:
+        await worker.start()
+    sockets = {}
+    for i, worker in enumerate(workers):
+        for user in (f"client-{i}", f"lawyer-{i}"):
+            sockets[user] = FakeSocket()
+            await worker.connect(user, sockets[user], user.split("-")[0], user)
+
+    # lawyer-2 also has a second tab open on worker 1
+    sockets["lawyer-2 (tab 2)"] = FakeSocket()
+    await workers[1].connect("lawyer-2", sockets["lawyer-2 (tab 2)"], "lawyer", "lawyer-2")
+    before = [worker.pubsub.received for worker in workers]
+
+    # client-0 (worker 0) writes to lawyer-2 (workers 2 and 1)
+    message = {"type": "message", "conversationId": "c1", "senderId": "client-0", "content": "hello"}
+    await workers[0].send_to_conversation(message, ["client-0", "lawyer-2"])
+    recipients = ("client-0", "lawyer-2", "lawyer-2 (tab 2)")
+    await settle(lambda: all(sockets[user].json for user in recipients))
+    for user in recipients:
+        if sockets[user].json != [message]:
+            failures.append(f"{user} got {sockets[user].json}")
+    others = [user for user, socket in sockets.items() if user not in recipients and socket.json]
+    if others:
+        failures.append(f"message leaked to {others}")
+    if workers[2].pubsub.received - before[2] != 1 or workers[1].pubsub.received - before[1] != 1:
+        failures.append("a worker holding the recipient did not get the message exactly once")
+
+    # A broadcast from worker 1 reaches all seven sockets once
+    await workers[1].broadcast("maintenance at noon")
+    await settle(lambda: all(socket.text for socket in sockets.values()))
+    counts = {user: len(socket.text) for user, socket in sockets.items()}
+    if set(counts.values()) != {1}:
+        failures.append(f"broadcast deliveries per socket were {counts}")
+
+    # Closing one tab keeps the other; after both close, messages go nowhere
+    await workers[2].disconnect("lawyer-2", sockets["lawyer-2"])
+    await workers[0].send_personal_message(message, "lawyer-2")
+    await settle(lambda: len(sockets["lawyer-2 (tab 2)"].json) == 2)
+    if len(sockets["lawyer-2 (tab 2)"].json) != 2 or len(sockets["lawyer-2"].json) != 1:
+        failures.append("closing one tab affected the other")
+    await workers[1].disconnect("lawyer-2", sockets["lawyer-2 (tab 2)"])
+    await workers[0].send_personal_message(message, "lawyer-2")
+    await settle(lambda: False, timeout=0.2)
+    if len(sockets["lawyer-2 (tab 2)"].json) != 2:
+        failures.append("disconnected user still received messages")
+
+    # Worker notifications, e.g. principal cache invalidation
+    notified = [[] for _ in workers]
+    for i, worker in enumerate(workers):
+        worker.add_channel_handler("check:notify", notified[i].append)
+    await asyncio.sleep(0.05)
+    workers[0].publish_threadsafe("check:notify", {"email": "a@x"})
+    await asyncio.to_thread(workers[0].publish_threadsafe, "check:notify", {"email": "b@x"})
+    await settle(lambda: all(len(n) == 2 for n in notified[1:]))
+    emails = [sorted(payload["email"] for payload in n) for n in notified]
+    if emails != [[], ["a@x", "b@x"], ["a@x", "b@x"]]:
+        failures.append(f"channel handlers got {emails}")
+
+    for worker in workers:
+        await worker.stop()
+    print(f"{name}: {'OK' if not failures else 'FAILED'} {[w.stats()['pubsub'] for w in workers]}")
+    return [f"{name}: {failure}" for failure in failures]
+
+
+async def check_slow_consumer() -> list:
+    failures = []
+    manager = ConnectionManager(MemoryPubSub())
+    stalled, fast = StalledSocket(), FakeSocket()
+    await manager.connect("lawyer-1", stalled, "lawyer", "lawyer-1")
+    await manager.connect("lawyer-1", fast, "lawyer", "lawyer-1")
+    await manager.connect("client-1", FakeSocket(), "client", "client-1")
+
+    count = WS_SEND_QUEUE_SIZE + 10
+    for i in range(count):
+        await asyncio.wait_for(manager.send_to_conversation({"n": i}, ["client-1", "lawyer-1"]), timeout=1)
+    await settle(lambda: len(fast.json) == count)
+    if len(fast.json) != count:
+        failures.append(f"fast socket got {len(fast.json)} of {count} messages next to a stalled one")
+    if stalled.closed != 1013 or manager.stats()["slowConsumersDropped"] != 1:
+        failures.append(f"stalled socket was not dropped: {manager.stats()}")
+    if manager.stats()["connections"] != 2:
+        failures.append(f"expected 2 sockets left, {manager.stats()}")
+    await manager.stop()
+    print(f"slow consumer: {'OK' if not failures else 'FAILED'}")
+    return [f"slow consumer: {failure}" for failure in failures]
+
+
+async def check_heartbeat() -> list:
+    failures = []
+    manager = ConnectionManager(MemoryPubSub())
+    sockets = {name: FakeSocket() for name in ("active", "quiet", "dead")}
+    connections = {name: await manager.connect(name, socket, "client", name) for name, socket in sockets.items()}
+    manager.received(connections["active"], "message")
+    await manager.send_personal_message({"type": "message"}, "active")
+
+    # Backdate instead of waiting out the real intervals
+    connections["quiet"].last_seen -= WS_HEARTBEAT_INTERVAL
+    connections["dead"].last_seen -= WS_HEARTBEAT_TIMEOUT + 1
+    manager.heartbeat()
+    await settle(lambda: sockets["quiet"].json and sockets["dead"].closed)
+
+    if sockets["quiet"].json != [{"type": "ping"}]:
+        failures.append(f"quiet socket got {sockets['quiet'].json}, expected a ping")
+    if sockets["active"].json != [{"type": "message"}]:
+        failures.append(f"active socket got {sockets['active'].json}")
+    if sockets["dead"].closed != 1001 or manager.is_online("dead"):
+        failures.append("silent socket was not reaped")
+
+    # A pong keeps the quiet socket alive without counting as traffic
+    manager.received(connections["quiet"], "pong")
+    manager.heartbeat()
+    await settle(lambda: False, timeout=0.1)
+    if len(sockets["quiet"].json) != 1 or not manager.is_online("quiet"):
+        failures.append("socket that answered the ping was pinged again or reaped")
+
+    stats = manager.stats()
+    if stats["connections"] != 2 or stats["reaped"] != 1 or stats["messagesIn"] != 1 or stats["messagesOut"] != 2:
+        failures.append(f"unexpected gauges {stats}")
+    if not stats["sendLatency"]["maxMs"] or not stats["messagesOutPerSecond"]:
+        failures.append(f"latency and rates were not recorded: {stats}")
+    await manager.stop()
+    print(f"heartbeat: {'OK' if not failures else 'FAILED'}")
+    return [f"heartbeat: {failure}" for failure in failures]
+
+
+async def run(redis_url):
+    failures = await check_backend("memory", MemoryPubSub)
+    failures += await check_slow_consumer()
+    failures += await check_heartbeat()
+
+    if redis_url:
+        failures += await check_backend("redis", lambda: RedisPubSub.from_url(redis_url))
+    else:
+        try:
+            import fakeredis
+        except ImportError:
+            print("redis: skipped, install fakeredis or pass --redis-url")
+        else:
+            server = fakeredis.FakeServer()
+            failures += await check_backend("redis (fakeredis)", lambda: RedisPubSub(fakeredis.FakeAsyncRedis(server=server)))
+
+    if failures:
+        for failure in failures:
+            print(f"FAILED: {failure}")
+        sys.exit(1)
+    print("OK")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--redis-url", help="check against a real Redis server instead of fakeredis")
+    args = parser.parse_args()
+    asyncio.run(run(args.redis_url))
+
+
+if __name__ == "__main__":
+    main()
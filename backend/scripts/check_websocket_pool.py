@@ -0,0 +1,223 @@
+"""
+Checks that open chat WebSockets do not hold database connections.
+
+Opens 1,000 concurrent /ws/chat sockets against the app in-process (a small
+ASGI WebSocket driver, no server or client library needed) and sends a
+message on every socket, then a reply that must be routed from the
+conversation member cache without any lookup query. Every message must be
+acknowledged and stored with its conversation's next sequence number, and a
+resuming socket must be replayed exactly the messages it missed. While all sockets are still
+open it asserts that both connection pools are fully checked in and that
+HTTP requests touching the database still succeed. A socket that kept its session would pin one
+connection each, far more than the pools hold.
+
+Usage (from backend/):
+    python scripts/check_websocket_pool.py
+    python scripts/check_websocket_pool.py --sockets 2000
+"""
+import argparse
+import asyncio
+import json
+import os
+import sys
+import tempfile
+import time
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+os.environ["DATABASE_URL"] = "sqlite:///" + os.path.join(tempfile.mkdtemp(), "ws.db")
+
+import httpx
+from jose import jwt
+from sqlalchemy import event, func, insert, select
+
+import database
+from main import app
+import models
+from routers.common.auth import SECRET_KEY, ALGORITHM
+
+
+class PoolWatch:
+    """Tracks connections checked out of an engine's pool, and the peak"""
+
+    def __init__(self, engine):
+        self.engine = engine
+        self.current = 0
+        self.peak = 0
+        event.listen(engine, "checkout", self._checkout)
+        event.listen(engine, "checkin", self._checkin)
+
+    def _checkout(self, *args):
+        self.current += 1
+        self.peak = max(self.peak, self.current)
+
+    def _checkin(self, *args):
+        self.current -= 1
+
+
+class Socket:
+    """Drives one ASGI WebSocket connection through the app"""
+
+    def __init__(self, token: str):
+        self.incoming = asyncio.Queue()
+        self.accepted = asyncio.Event()
+        self.closed = None
+        self.received = []
+        self.scope = {
+            "type": "websocket", "asgi": {"version": "3.0"}, "scheme": "ws", "path": "/ws/chat",
+            "raw_path": b"/ws/chat", "query_string": f"token={token}".encode(), "root_path": "",
+            "headers": [], "client": ("127.0.0.1", 50000), "server": ("testserver", 80), "subprotocols": [],
+        }
+
+    async def _receive(self):
+        return await self.incoming.get()
+
+    async def _send(self, message):
+        if message["type"] == "websocket.accept":
+            self.accepted.set()
+        elif message["type"] == "websocket.send":
+            self.received.append(json.loads(message["text"]))
+        elif message["type"] == "websocket.close":
+            self.closed = message.get("code")
+            self.accepted.set()
+
+    async def open(self):
+        self.incoming.put_nowait({"type": "websocket.connect"})
+        self.task = asyncio.create_task(app(self.scope, self._receive, self._send))
+        await self.accepted.wait()
+        if self.closed is not None:
+            raise RuntimeError(f"socket rejected with code {self.closed}")
+
+    def send(self, data: dict):
+        self.incoming.put_nowait({"type": "websocket.receive", "text": json.dumps(data)})
+
+    async def close(self):
+        self.incoming.put_nowait({"type": "websocket.disconnect", "code": 1000})
+        await self.task
+
+
+def seed(pairs: int):
+    with database.engine.begin() as conn:
+        conn.execute(insert(models.Conversation), [
+            {"id": f"conversation-{i}", "clientId": f"client-{i}", "lawyerId": f"lawyer-{i}",
+             "clientName": f"Client {i}", "lawyerName": f"Lawyer {i}", "unreadByClient": 0,
+             "unreadByLawyer": 0, "createdAt": "2026-01-01T00:00:00"}
+            for i in range(pairs)
+        ])
+
+
+def delivered(socket: "Socket", sender_id: str) -> int:
+    return sum(1 for m in socket.received if m.get("type") == "message" and m.get("senderId") == sender_id)
+
+
+def acked(socket: "Socket") -> int:
+    return sum(1 for m in socket.received if m.get("type") == "ack")
+
+
+def token(user_id: str, role: str) -> str:
+    return jwt.encode({"id": user_id, "role": role, "sub": f"{user_id}@example.com"}, SECRET_KEY, algorithm=ALGORITHM)
+
+
+async def run(count: int):
+    pairs = count // 2
+    seed(pairs)
+    sync_pool, async_pool = PoolWatch(database.engine), PoolWatch(database.async_engine.sync_engine)
+
+    sockets = {}
+    for i in range(pairs):
+        sockets[("client", i)] = Socket(token(f"client-{i}", "client"))
+        sockets[("lawyer", i)] = Socket(token(f"lawyer-{i}", "lawyer"))
+    started = time.perf_counter()
+    await asyncio.gather(*(socket.open() for socket in sockets.values()))
+    print(f"{len(sockets)} sockets open in {time.perf_counter() - started:.2f}s")
+
+    # Every client writes to its lawyer; each message needs a conversation lookup
+    for i in range(pairs):
+        sockets[("client", i)].send({"type": "message", "conversationId": f"conversation-{i}", "content": "hello"})
+    deadline = time.monotonic() + 60
+    while any(not delivered(sockets[("lawyer", i)], f"client-{i}") for i in range(pairs)):
+        if time.monotonic() > deadline:
+            raise SystemExit("FAILED: messages were not delivered within 60s")
+        await asyncio.sleep(0.05)
+    print(f"{pairs} messages delivered in {time.perf_counter() - started:.2f}s")
+
+    # Replies route through the cached conversation members: no lookups, only the batched writes
+    queries = []
+    event.listen(
+        database.async_engine.sync_engine, "before_cursor_execute",
+        # Member lookups select the participants; the writer only reads back lastSeq
+        lambda conn, cursor, statement, *args: queries.append(1) if "lawyerId" in statement and statement.lstrip().upper().startswith("SELECT") else None
+    )
+    for i in range(pairs):
+        sockets[("lawyer", i)].send({"type": "message", "conversationId": f"conversation-{i}", "content": "hi"})
+    while any(not delivered(sockets[("client", i)], f"lawyer-{i}") for i in range(pairs)):
+        if time.monotonic() > deadline:
+            raise SystemExit("FAILED: replies were not delivered within 60s")
+        await asyncio.sleep(0.05)
+    print(f"{pairs} replies delivered with {len(queries)} lookup queries")
+
+    failures = []
+    if queries:
+        failures.append(f"routing cached conversations ran {len(queries)} lookup queries")
+    unacked = [key for key, socket in sockets.items() if acked(socket) != 1]
+    if unacked:
+        failures.append(f"{len(unacked)} senders did not get exactly one ack")
+    with database.engine.connect() as conn:
+        stored = conn.execute(select(func.count()).select_from(models.Message)).scalar()
+        unread = conn.execute(select(
+            func.sum(models.Conversation.unreadByClient), func.sum(models.Conversation.unreadByLawyer)
+        )).one()
+    if stored != 2 * pairs or tuple(unread) != (pairs, pairs):
+        failures.append(f"expected {2 * pairs} stored messages and {pairs} unread per side, got {stored} and {tuple(unread)}")
+    print(f"{stored} messages stored")
+
+    seqs = {
+        (m["senderId"], m["seq"]) for i in range(pairs)
+        for m in sockets[("client", i)].received if m.get("type") == "message"
+    }
+    if seqs != {(f"client-{i}", 1) for i in range(pairs)} | {(f"lawyer-{i}", 2) for i in range(pairs)}:
+        failures.append("messages were not numbered 1, 2 within each conversation")
+
+    # A reconnecting client that saw only the first message gets just the reply
+    resumed = Socket(token("client-0", "client"))
+    await resumed.open()
+    resumed.send({"type": "resume", "conversations": {"conversation-0": 1, "conversation-1": 0}})
+    while not resumed.received and time.monotonic() < deadline:
+        await asyncio.sleep(0.05)
+    replay = resumed.received[0] if resumed.received else {}
+    replayed = [(c["conversationId"], [m["seq"] for m in c["messages"]], c["complete"]) for c in replay.get("conversations", [])]
+    if replayed != [("conversation-0", [2], True)]:
+        failures.append(f"resume replayed {replayed}, expected only conversation-0 seq 2")
+    await resumed.close()
+    if sync_pool.current or async_pool.current:
+        failures.append(f"connections still checked out with sockets open: sync={sync_pool.current}, async={async_pool.current}")
+
+    # HTTP traffic must not queue behind the open sockets
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://testserver") as client:
+        started = time.perf_counter()
+        responses = await asyncio.gather(*(client.get("/public/lawyers/") for _ in range(20)))
+        elapsed = time.perf_counter() - started
+    if any(response.status_code != 200 for response in responses):
+        failures.append(f"HTTP requests failed: {[r.status_code for r in responses]}")
+    print(f"20 HTTP requests with {len(sockets)} sockets open took {elapsed:.2f}s")
+
+    await asyncio.gather(*(socket.close() for socket in sockets.values()))
+    print(f"Peak connections checked out: sync={sync_pool.peak}, async={async_pool.peak}")
+
+    if failures:
+        for failure in failures:
+            print(f"FAILED: {failure}")
+        sys.exit(1)
+    print("OK")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sockets", type=int, default=1000, help="concurrent sockets (half clients, half lawyers)")
+    args = parser.parse_args()
+    asyncio.run(run(args.sockets))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,109 @@
+import sys
+import os
+from datetime import date, datetime
+
+# Add parent directory to path so we can import database
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from database import engine
+from sqlalchemy import inspect, select, update, bindparam, column, table, String
+
+# (table, column, target type) for columns that used to be stored as strings
+DATE_COLUMNS = [
+    ("payments", "date", "DATE"),
+    ("cases", "createdAt", "DATE"),
+    ("appointments", "date", "DATE"),
+    ("messages", "timestamp", "TIMESTAMP"),
+    ("orders", "createdAt", "TIMESTAMP"),
+    ("password_resets", "expires_at", "TIMESTAMP"),
+    ("sessions", "createdAt", "TIMESTAMP"),
+    ("sessions", "expiresAt", "TIMESTAMP"),
+    ("sessions", "revokedAt", "TIMESTAMP"),
+    ("email_outbox", "nextAttemptAt", "TIMESTAMP"),
+    ("email_outbox", "createdAt", "TIMESTAMP"),
+    ("email_outbox", "sentAt", "TIMESTAMP"),
+]
+
+BATCH_SIZE = 1000
+
+DATE_FORMATS = ["%Y-%m-%d", "%d/%m/%Y", "%m/%d/%Y", "%d-%m-%Y", "%b %d, %Y", "%B %d, %Y"]
+
+def parse_value(value: str):
+    """Parse the formats found in legacy rows; returns None when unparseable"""
+    value = value.strip()
+    if not value:
+        return None
+    try:
+        return datetime.fromisoformat(value.replace("Z", "+00:00")).replace(tzinfo=None)
+    except ValueError:
+        pass
+    for fmt in DATE_FORMATS:
+        try:
+            return datetime.strptime(value, fmt)
+        except ValueError:
+            pass
+    return None
+
+def canonical(parsed: datetime, target: str) -> str:
+    # Both SQLite's Date/DateTime storage format and a valid Postgres cast
+    if target == "DATE":
+        return parsed.date().isoformat()
+    return parsed.strftime("%Y-%m-%d %H:%M:%S.%f")
+
+def normalize_column(conn, table_name: str, column_name: str, target: str):
+    """Rewrite every value in one canonical format (or NULL), in batches"""
+    rows = table(table_name, column("id"), column(column_name, String))
+    col = rows.c[column_name]
+    values = conn.execute(select(rows.c.id, col).where(col.isnot(None))).all()
+
+    updates, unparseable = [], 0
+    for row_id, value in values:
+        if isinstance(value, (date, datetime)):
+            continue
+        parsed = parse_value(str(value))
+        if parsed is None and str(value).strip():
+            unparseable += 1
+            print(f"  {table_name}.{column_name} id={row_id}: cannot parse {value!r}, setting NULL")
+        new_value = canonical(parsed, target) if parsed else None
+        if new_value != value:
+            updates.append({"row_id": row_id, "new_value": new_value})
+
+    statement = update(rows).where(rows.c.id == bindparam("row_id")).values({column_name: bindparam("new_value")})
+    for start in range(0, len(updates), BATCH_SIZE):
+        conn.execute(statement, updates[start:start + BATCH_SIZE])
+    print(f"{table_name}.{column_name}: {len(values)} values, {len(updates)} rewritten, {unparseable} unparseable")
+
+def migrate(bind=engine):
+    inspector = inspect(bind)
+    postgres = bind.dialect.name == "postgresql"
+    for table_name, column_name, target in DATE_COLUMNS:
+        if not inspector.has_table(table_name):
+            continue
+        current = {c["name"]: c["type"] for c in inspector.get_columns(table_name)}.get(column_name)
+        if current is None:
+            print(f"{table_name}.{column_name} does not exist, skipping")
+            continue
+        try:
+            already_converted = current.python_type in (date, datetime)
+        except NotImplementedError:
+            already_converted = False
+        if already_converted:
+            print(f"{table_name}.{column_name} is already {current}, skipping")
+            continue
+
+        # One transaction per column: backfill, then change the type on Postgres.
+        # SQLite keeps the column's declared type; SQLAlchemy reads the
+        # canonical values as date/datetime.
+        with bind.begin() as conn:
+            normalize_column(conn, table_name, column_name, target)
+            if postgres:
+                quoted_table = bind.dialect.identifier_preparer.quote(table_name)
+                quoted_column = bind.dialect.identifier_preparer.quote(column_name)
+                conn.exec_driver_sql(
+                    f"ALTER TABLE {quoted_table} ALTER COLUMN {quoted_column} "
+                    f"TYPE {target} USING {quoted_column}::{target.lower()}"
+                )
+                print(f"{table_name}.{column_name} converted to {target}")
+
+if __name__ == "__main__":
+    migrate()
@@ -0,0 +1,34 @@
+import sys
+import os
+
+# Add parent directory to path so we can import database
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from database import engine, SessionLocal
+import models
+
+# The identities index is keyed by (email, role) so one email can hold an
+# account under several roles; databases created with the email-only key are
+# rebuilt here. The table only mirrors the admins, lawyers and clients tables,
+# so it is dropped, recreated and backfilled from them. Safe to run more than once.
+#
+# The app does not backfill at startup: run this after upgrading, and after
+# adding or renaming accounts outside the API (SQL, imports), which also
+# drops identities whose email no longer exists.
+
+def rebuild_identities(bind=engine):
+    from routers.common.auth import sync_identities
+
+    identities = models.Identity.__table__
+    identities.drop(bind=bind, checkfirst=True)
+    identities.create(bind=bind)
+    print("Recreated identities")
+
+    db = SessionLocal()
+    try:
+        sync_identities(db)
+    finally:
+        db.close()
+
+if __name__ == "__main__":
+    rebuild_identities()
@@ -0,0 +1,35 @@
+import sys
+import os
+import argparse
+
+# Add parent directory to path so we can import database
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from database import SessionLocal, engine
+import models
+from utils.rollups import rebuild_rollups, rollup_drift
+
+# Recomputes the dashboard rollup tables from cases, appointments, payments
+# and orders. Needed after bulk edits that bypass the ORM (raw SQL, update()/
+# delete() statements) and safe to run at any time.
+def main():
+    parser = argparse.ArgumentParser(description="Rebuild the admin dashboard rollups")
+    parser.add_argument("--check", action="store_true", help="only report drift; exit 1 if there is any")
+    args = parser.parse_args()
+
+    models.Base.metadata.create_all(bind=engine)
+    db = SessionLocal()
+    try:
+        drift = rollup_drift(db)
+        for line in drift[:50]:
+            print(f"  {line}")
+        print(f"{len(drift)} drifted rollup values")
+        if args.check:
+            sys.exit(1 if drift else 0)
+        counts = rebuild_rollups(db)
+        print(f"Rebuilt rollups: {counts}")
+    finally:
+        db.close()
+
+if __name__ == "__main__":
+    main()
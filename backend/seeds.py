@@ -1,6 +1,7 @@
 from sqlalchemy.orm import Session
 from database import SessionLocal, engine
 import models
+from datetime import date
 
 db = SessionLocal()
 
@@ -152,7 +153,7 @@ def seed_data():
             status='in-progress',
             stage='Discovery',
             priority='high',
-            createdAt='2024-11-15',
+            createdAt=date(2024, 11, 15),
             nextHearing='2024-12-20',
             documents=[
                 {'id': '1', 'name': 'Medical Records.pdf', 'type': 'PDF', 'uploadedAt': '2024-11-16', 'size': '5.2 MB'},
@@ -167,7 +168,7 @@ def seed_data():
             status='open',
             stage='Initial Review',
             priority='medium',
-            createdAt='2024-12-01',
+            createdAt=date(2024, 12, 1),
             documents=[]
         ),
         models.Case(
@@ -178,7 +179,7 @@ def seed_data():
             status='closed',
             stage='Completed',
             priority='low',
-            createdAt='2024-10-05',
+            createdAt=date(2024, 10, 5),
             documents=[]
         ),
         # Case for Kunal
@@ -190,7 +191,7 @@ def seed_data():
             status='in-progress',
             stage='Mediation',
             priority='high',
-            createdAt='2025-01-10',
+            createdAt=date(2025, 1, 10),
             nextHearing='2025-01-25',
             documents=[]
         )
@@ -204,7 +205,7 @@ def seed_data():
             lawyerName='Sarah Johnson',
             lawyerId='1',  # Added ID for linking
             clientId='1',
-            date='2024-12-18',
+            date=date(2024, 12, 18),
             time='14:00',
             type='consultation',
             status='pending',
@@ -216,7 +217,7 @@ def seed_data():
             lawyerName='Michael Chen',
             lawyerId='2',
             clientId='2',
-            date='2024-12-19',
+            date=date(2024, 12, 19),
             time='10:30',
             type='hearing',
             status='approved'
@@ -227,7 +228,7 @@ def seed_data():
             lawyerName='Emily Rodriguez',
             lawyerId='3',
             clientId='3',
-            date='2024-12-17',
+            date=date(2024, 12, 17),
             time='16:00',
             type='meeting',
             status='completed'
@@ -239,7 +240,7 @@ def seed_data():
             lawyerName='Adv. Kunal Patel',
             lawyerId='kunal_patel',
             clientId='1',
-            date='2025-01-25',
+            date=date(2025, 1, 25),
             time='11:00',
             type='consultation',
             status='approved',
@@ -251,7 +252,7 @@ def seed_data():
             lawyerName='Adv. Kunal Patel',
             lawyerId='kunal_patel',
             clientId='2',
-            date='2025-01-26',
+            date=date(2025, 1, 26),
             time='14:00',
             type='consultation',
             status='pending',
@@ -319,6 +320,12 @@ def seed_data():
         db.merge(review)
         
     db.commit()
+    # The rollup listener is registered by the app, not by this script
+    from utils.rollups import rebuild_rollups
+    rebuild_rollups(db)
+    # Seeded accounts bypass the API, so index their emails for /login here
+    from routers.common.auth import sync_identities
+    sync_identities(db)
     print("Database seeded successfully!")
 
 if __name__ == "__main__":
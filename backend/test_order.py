@@ -21,7 +21,7 @@ try:
         shippingAddress="123 Test St",
         paymentMethod="card",
         status="completed",
-        createdAt=datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+        createdAt=datetime.now()
     )
     
     db.add(new_order)
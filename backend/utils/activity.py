@@ -0,0 +1,122 @@
+from collections import deque
+from datetime import datetime
+from typing import Optional
+import os
+import threading
+
+from sqlalchemy import event, insert
+
+import database
+import models
+
+ACTIVITY_BATCH_SIZE = int(os.getenv("ACTIVITY_BATCH_SIZE", "200"))
+ACTIVITY_FLUSH_SECONDS = float(os.getenv("ACTIVITY_FLUSH_SECONDS", "2"))
+# Events held in memory while the database is unreachable; the oldest are dropped beyond this
+ACTIVITY_BUFFER_LIMIT = int(os.getenv("ACTIVITY_BUFFER_LIMIT", "10000"))
+
+def record_activity(db, event_type: str, text: str, subject_id: Optional[str] = None):
+    """
+    Adds an event to the activity feed once the caller's transaction commits.
+    Nothing is written on the request path: committed events are buffered and
+    inserted in batches by the background writer.
+    """
+    db.info.setdefault("activity", []).append({
+        "createdAt": datetime.now(),
+        "type": event_type,
+        "text": text,
+        "subjectId": subject_id,
+    })
+
+@event.listens_for(database.RoutingSession, "after_commit")
+def _buffer_committed_activity(session):
+    events = session.info.pop("activity", None)
+    if events:
+        activity_writer.add(events)
+
+@event.listens_for(database.RoutingSession, "after_rollback")
+def _discard_rolled_back_activity(session):
+    session.info.pop("activity", None)
+
+
+class ActivityWriter:
+    """Background thread that inserts buffered activity events in batches"""
+
+    def __init__(self):
+        self._buffer = deque()
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self.written = 0
+        self.dropped = 0
+        self.batches = 0
+
+    def add(self, events):
+        with self._lock:
+            self._buffer.extend(events)
+            overflow = len(self._buffer) - ACTIVITY_BUFFER_LIMIT
+            for _ in range(max(overflow, 0)):
+                self._buffer.popleft()
+                self.dropped += 1
+            full = len(self._buffer) >= ACTIVITY_BATCH_SIZE
+        if full:
+            self._wake.set()
+
+    def flush(self) -> int:
+        """Insert one batch; returns how many events were written"""
+        with self._lock:
+            batch = [self._buffer.popleft() for _ in range(min(len(self._buffer), ACTIVITY_BATCH_SIZE))]
+        if not batch:
+            return 0
+        try:
+            with database.engine.begin() as conn:
+                conn.execute(insert(models.ActivityEvent), batch)
+        except Exception:
+            # Put the batch back in order and retry on the next tick
+            with self._lock:
+                self._buffer.extendleft(reversed(batch))
+            raise
+        self.written += len(batch)
+        self.batches += 1
+        return len(batch)
+
+    def _run(self):
+        while not self._stop.is_set():
+            self._wake.wait(ACTIVITY_FLUSH_SECONDS)
+            self._wake.clear()
+            try:
+                while self.flush() >= ACTIVITY_BATCH_SIZE:
+                    pass
+            except Exception as e:
+                print(f"Activity log error: {e}")
+
+    def start(self):
+        if self._thread is not None:
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="activity-writer", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        self._wake.set()
+        if self._thread is not None:
+            self._thread.join(timeout=5)
+        self._thread = None
+        # Write what is left so a clean shutdown loses nothing
+        try:
+            while self.flush():
+                pass
+        except Exception as e:
+            print(f"Activity log error on shutdown: {e}")
+
+    def stats(self) -> dict:
+        return {
+            "buffered": len(self._buffer),
+            "written": self.written,
+            "batches": self.batches,
+            "dropped": self.dropped,
+        }
+
+
+activity_writer = ActivityWriter()
@@ -0,0 +1,159 @@
+import asyncio
+import os
+from typing import List, Optional, Tuple
+
+from sqlalchemy import bindparam, func, insert, select, update
+
+import database
+import models
+from utils.dashboard_cache import invalidate_user
+
+# A flush happens once this many messages are waiting, or CHAT_WRITE_DELAY_MS
+# after the first one arrived, whichever comes first
+CHAT_WRITE_BATCH_SIZE = int(os.getenv("CHAT_WRITE_BATCH_SIZE", "500"))
+CHAT_WRITE_DELAY_MS = float(os.getenv("CHAT_WRITE_DELAY_MS", "5"))
+
+_conversations = models.Conversation.__table__
+
+# One parameter set per conversation in the batch: last message wins, unread
+# counts are incremented in SQL so concurrent writers never overwrite them,
+# and lastSeq reserves a block of sequence numbers for the batch's messages
+_update_conversation = update(_conversations).where(
+    _conversations.c.id == bindparam("conversation_id")
+).values(
+    lastMessage=bindparam("last_message"),
+    lastMessageAt=bindparam("last_message_at"),
+    unreadByClient=_conversations.c.unreadByClient + bindparam("client_unread"),
+    unreadByLawyer=_conversations.c.unreadByLawyer + bindparam("lawyer_unread"),
+    lastSeq=func.coalesce(_conversations.c.lastSeq, 0) + bindparam("message_count"),
+)
+
+
+class MessageWriter:
+    """
+    Write-behind buffer for chat messages. Callers await write(), which
+    returns once the message is committed; messages arriving together share
+    one transaction holding every insert and one update per conversation.
+    """
+
+    def __init__(self):
+        self._pending: List[Tuple[dict, str, asyncio.Future]] = []
+        self._task: Optional[asyncio.Task] = None
+        self._has_work: Optional[asyncio.Event] = None
+        self._full: Optional[asyncio.Event] = None
+        self.written = 0
+        self.batches = 0
+        self.failed = 0
+
+    def start(self):
+        if self._task is not None and not self._task.done():
+            return
+        # Created here so they belong to the running event loop
+        self._has_work = asyncio.Event()
+        self._full = asyncio.Event()
+        self._task = asyncio.create_task(self._run())
+
+    async def write(self, message: dict, recipient_id: str):
+        """Queue a Message row and wait until it is committed; raises if the flush fails"""
+        self.start()
+        future = asyncio.get_running_loop().create_future()
+        self._pending.append((message, recipient_id, future))
+        self._has_work.set()
+        if len(self._pending) >= CHAT_WRITE_BATCH_SIZE:
+            self._full.set()
+        await future
+
+    async def _run(self):
+        while True:
+            await self._has_work.wait()
+            if len(self._pending) < CHAT_WRITE_BATCH_SIZE:
+                try:
+                    await asyncio.wait_for(self._full.wait(), CHAT_WRITE_DELAY_MS / 1000)
+                except asyncio.TimeoutError:
+                    pass
+            await self._flush_next()
+
+    async def _flush_next(self):
+        batch = self._pending[:CHAT_WRITE_BATCH_SIZE]
+        self._pending = self._pending[CHAT_WRITE_BATCH_SIZE:]
+        if not self._pending:
+            self._has_work.clear()
+        if len(self._pending) < CHAT_WRITE_BATCH_SIZE:
+            self._full.clear()
+        if batch:
+            await self._flush(batch)
+
+    async def _flush(self, batch):
+        rows = [message for message, _, _ in batch]
+        conversations = {}
+        for message in rows:
+            params = conversations.setdefault(message["conversationId"], {
+                "conversation_id": message["conversationId"], "client_unread": 0, "lawyer_unread": 0, "message_count": 0,
+            })
+            params["message_count"] += 1
+            params["last_message"] = message["content"]
+            params["last_message_at"] = message["timestamp"].isoformat()
+            # The other party's counter goes up
+            params["lawyer_unread" if message["senderRole"] == "client" else "client_unread"] += 1
+
+        try:
+            async with database.async_engine.begin() as conn:
+                # The update locks the conversation rows, so the reserved blocks
+                # cannot overlap with another worker's
+                await conn.execute(_update_conversation, list(conversations.values()))
+                result = await conn.execute(
+                    select(_conversations.c.id, _conversations.c.lastSeq).where(_conversations.c.id.in_(list(conversations)))
+                )
+                next_seq = {
+                    conversation_id: last_seq - conversations[conversation_id]["message_count"] + 1
+                    for conversation_id, last_seq in result
+                }
+                for message in rows:
+                    seq = next_seq.get(message["conversationId"])
+                    message["seq"] = seq
+                    if seq is not None:
+                        next_seq[message["conversationId"]] = seq + 1
+                await conn.execute(insert(models.Message), rows)
+        except asyncio.CancelledError:
+            # Shutdown interrupted the transaction; stop() writes the batch again
+            self._pending[:0] = batch
+            raise
+        except Exception as e:
+            print(f"Chat message write error: {e}")
+            self.failed += len(batch)
+            for _, _, future in batch:
+                if not future.done():
+                    future.set_exception(e)
+            return
+
+        self.written += len(batch)
+        self.batches += 1
+        for recipient_id in {recipient_id for _, recipient_id, _ in batch}:
+            invalidate_user(recipient_id)
+        for _, _, future in batch:
+            if not future.done():
+                future.set_result(None)
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        # Write what is left so a clean shutdown loses nothing
+        while self._pending:
+            await self._flush_next()
+
+    def stats(self) -> dict:
+        return {
+            "pending": len(self._pending),
+            "written": self.written,
+            "batches": self.batches,
+            "failed": self.failed,
+            "avgBatchSize": round(self.written / self.batches, 2) if self.batches else 0.0,
+        }
+
+
+message_writer = MessageWriter()
@@ -0,0 +1,51 @@
+import os
+
+from sqlalchemy import event
+from sqlalchemy.orm import attributes
+
+import database
+import models
+from utils.cache import TTLCache
+
+# Short-lived per-user cache for the client and lawyer dashboard stats.
+# USER_DASHBOARD_CACHE_TTL=0 turns it off.
+USER_DASHBOARD_CACHE_TTL = float(os.getenv("USER_DASHBOARD_CACHE_TTL", "10"))
+USER_DASHBOARD_CACHE_SIZE = int(os.getenv("USER_DASHBOARD_CACHE_SIZE", "10000"))
+
+user_dashboard_cache = TTLCache(maxsize=USER_DASHBOARD_CACHE_SIZE, ttl=USER_DASHBOARD_CACHE_TTL)
+
+# Rows whose owners see them on their dashboards. Messages are covered through
+# the conversation's unread counters, which every chat write updates.
+_OWNED_MODELS = (models.Case, models.Appointment, models.Conversation)
+
+def get_cached_stats(role: str, user_id: str):
+    if USER_DASHBOARD_CACHE_TTL <= 0:
+        return None
+    return user_dashboard_cache.get((role, user_id))
+
+def cache_stats(role: str, user_id: str, stats: dict):
+    if USER_DASHBOARD_CACHE_TTL > 0:
+        user_dashboard_cache.set((role, user_id), stats)
+
+def invalidate_user(user_id: str):
+    user_dashboard_cache.invalidate(("client", user_id))
+    user_dashboard_cache.invalidate(("lawyer", user_id))
+
+@event.listens_for(database.RoutingSession, "after_flush")
+def _collect_dashboard_users(session, flush_context):
+    touched = session.info.setdefault("dashboard_users", set())
+    for obj in list(session.new) + list(session.dirty) + list(session.deleted):
+        if isinstance(obj, _OWNED_MODELS):
+            for name in ("clientId", "lawyerId"):
+                # Include the previous owner when a row is reassigned
+                history = attributes.get_history(obj, name, passive=attributes.PASSIVE_NO_INITIALIZE)
+                touched.update(user_id for user_id in history.sum() if user_id)
+
+@event.listens_for(database.RoutingSession, "after_commit")
+def _invalidate_dashboard_users(session):
+    for user_id in session.info.pop("dashboard_users", ()):
+        invalidate_user(user_id)
+
+@event.listens_for(database.RoutingSession, "after_rollback")
+def _discard_dashboard_users(session):
+    session.info.pop("dashboard_users", None)
@@ -1,32 +1,67 @@
 import smtplib
 from email.mime.text import MIMEText
 from email.mime.multipart import MIMEMultipart
+from datetime import datetime, timedelta
+from typing import Optional
 import os
+import threading
 
-# Configuration (Env vars would be better, but hardcoding placeholders for now)
-SMTP_SERVER = "smtp.gmail.com"
-SMTP_PORT = 587
-SMTP_USERNAME = "nakranimonil18@gmail.com" # REPLACE WITH REAL EMAIL
-SMTP_PASSWORD = "uaecsbrhxondehoy"    # REPLACE WITH REAL APP PASSWORD
+from sqlalchemy import event
+
+import database
+import models
+
+# Configuration (override through backend/.env)
+SMTP_SERVER = os.getenv("SMTP_SERVER", "smtp.gmail.com")
+SMTP_PORT = int(os.getenv("SMTP_PORT", "587"))
+SMTP_USERNAME = os.getenv("SMTP_USERNAME", "")
+SMTP_PASSWORD = os.getenv("SMTP_PASSWORD", "")
+SMTP_USE_TLS = os.getenv("SMTP_USE_TLS", "true").lower() == "true"
+# Set to false for a local relay that accepts mail without logging in
+SMTP_AUTH = os.getenv("SMTP_AUTH", "true").lower() == "true"
+SMTP_FROM = os.getenv("SMTP_FROM", SMTP_USERNAME or "no-reply@legalwise.com")
+
+# Outbox delivery
+EMAIL_BATCH_SIZE = int(os.getenv("EMAIL_BATCH_SIZE", "50"))
+EMAIL_POLL_SECONDS = float(os.getenv("EMAIL_POLL_SECONDS", "5"))
+EMAIL_MAX_ATTEMPTS = int(os.getenv("EMAIL_MAX_ATTEMPTS", "5"))
+EMAIL_RETRY_BASE_SECONDS = float(os.getenv("EMAIL_RETRY_BASE_SECONDS", "30"))
+# How long a claimed batch is reserved for its sender before others may retry it
+EMAIL_LEASE_SECONDS = float(os.getenv("EMAIL_LEASE_SECONDS", "300"))
+
+# Rejections of one message; anything else means the server or connection failed
+_MESSAGE_ERRORS = (smtplib.SMTPRecipientsRefused, smtplib.SMTPSenderRefused, smtplib.SMTPDataError)
+
+def _build_message(to_email: str, subject: str, body: str) -> str:
+    msg = MIMEMultipart()
+    msg['From'] = SMTP_FROM
+    msg['To'] = to_email
+    msg['Subject'] = subject
+    msg.attach(MIMEText(body, 'plain'))
+    return msg.as_string()
+
+def smtp_configured() -> bool:
+    return not SMTP_AUTH or bool(SMTP_USERNAME and SMTP_PASSWORD)
+
+def _open_smtp() -> smtplib.SMTP:
+    server = smtplib.SMTP(SMTP_SERVER, SMTP_PORT, timeout=30)
+    if SMTP_USE_TLS:
+        server.starttls()
+    if SMTP_AUTH:
+        server.login(SMTP_USERNAME, SMTP_PASSWORD)
+    return server
 
 def send_email(to_email: str, subject: str, body: str):
     """
-    Sends an email using SMTP.
+    Sends an email using SMTP, synchronously.
     If credentials are invalid, it prints the email to the console (Dev Mode).
+    Request handlers should use queue_email instead.
     """
     try:
-        msg = MIMEMultipart()
-        msg['From'] = SMTP_USERNAME
-        msg['To'] = to_email
-        msg['Subject'] = subject
-
-        msg.attach(MIMEText(body, 'plain'))
-
-        server = smtplib.SMTP(SMTP_SERVER, SMTP_PORT)
-        server.starttls()
-        server.login(SMTP_USERNAME, SMTP_PASSWORD)
-        text = msg.as_string()
-        server.sendmail(SMTP_USERNAME, to_email, text)
+        if not smtp_configured():
+            raise RuntimeError("SMTP_USERNAME / SMTP_PASSWORD not set")
+        server = _open_smtp()
+        server.sendmail(SMTP_FROM, to_email, _build_message(to_email, subject, body))
         server.quit()
         print(f"Email sent successfully to {to_email}")
         return True
@@ -38,3 +73,167 @@ def send_email(to_email: str, subject: str, body: str):
         print("------------------------------------------------")
         # In dev mode, we return True so the flow continues even if email fails
         return True
+
+def queue_email(db, to_email: str, subject: str, body: str):
+    """
+    Adds an email to the outbox; it is committed with the caller's transaction
+    and delivered by the background sender.
+    """
+    now = datetime.utcnow()
+    db.add(models.EmailOutbox(
+        toEmail=to_email,
+        subject=subject,
+        body=body,
+        status="pending",
+        attempts=0,
+        nextAttemptAt=now,
+        createdAt=now
+    ))
+    # Deliver as soon as the row is visible instead of waiting for the next poll
+    event.listen(db, "after_commit", lambda session: outbox_sender.wake(), once=True)
+
+
+class OutboxSender:
+    """
+    Background thread that drains email_outbox in batches over a single
+    reused SMTP connection, retrying failures with exponential backoff.
+    A batch is leased (status 'sending') and committed before any email is
+    sent, so no row locks are held during SMTP round trips.
+    """
+
+    def __init__(self):
+        self._server: Optional[smtplib.SMTP] = None
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self.sent = 0
+        self.failed = 0
+        self._warned_unconfigured = False
+
+    def _connection(self) -> smtplib.SMTP:
+        if self._server is None:
+            self._server = _open_smtp()
+        return self._server
+
+    def _close(self):
+        if self._server is not None:
+            try:
+                self._server.quit()
+            except Exception:
+                pass
+            self._server = None
+
+    def _deliver(self, to_email: str, subject: str, body: str):
+        message = _build_message(to_email, subject, body)
+        try:
+            self._connection().sendmail(SMTP_FROM, to_email, message)
+        except smtplib.SMTPServerDisconnected:
+            # Pooled connection went stale: reconnect once and retry
+            self._close()
+            self._connection().sendmail(SMTP_FROM, to_email, message)
+
+    def _claim(self, db, now: datetime):
+        """Lease a batch of due emails and commit, so no row lock is held while sending"""
+        lease = now + timedelta(seconds=EMAIL_LEASE_SECONDS)
+        # 'sending' rows whose lease ran out belong to a sender that died mid-batch
+        batch = db.query(models.EmailOutbox).filter(
+            models.EmailOutbox.status.in_(("pending", "sending")),
+            models.EmailOutbox.nextAttemptAt <= now
+        ).order_by(models.EmailOutbox.id).limit(EMAIL_BATCH_SIZE).with_for_update(skip_locked=True).all()
+        claimed = []
+        for item in batch:
+            item.status = "sending"
+            item.nextAttemptAt = lease
+            claimed.append((item.id, item.toEmail, item.subject, item.body, item.attempts or 0))
+        db.commit()
+        return lease, claimed
+
+    def flush(self, db) -> int:
+        """Send one batch of due emails; returns how many were delivered"""
+        if not smtp_configured():
+            # Emails stay queued and go out once credentials are configured
+            if not self._warned_unconfigured:
+                print("SMTP_USERNAME / SMTP_PASSWORD not set: outbox emails are kept queued, not sent")
+                self._warned_unconfigured = True
+            return 0
+        now = datetime.utcnow()
+        lease, claimed = self._claim(db, now)
+
+        # Sent outside any transaction; results are recorded afterwards
+        results = {}
+        for position, (item_id, to_email, subject, body, attempts) in enumerate(claimed):
+            try:
+                self._deliver(to_email, subject, body)
+                results[item_id] = {"status": "sent", "sentAt": datetime.utcnow(), "lastError": None}
+            except Exception as e:
+                # Drop the connection so the next attempt starts clean
+                self._close()
+                attempts += 1
+                if attempts >= EMAIL_MAX_ATTEMPTS:
+                    self.failed += 1
+                    print(f"FAILED TO SEND EMAIL after {attempts} attempts to {to_email}: {e}")
+                    results[item_id] = {"status": "failed", "attempts": attempts, "lastError": str(e)}
+                else:
+                    delay = EMAIL_RETRY_BASE_SECONDS * (2 ** (attempts - 1))
+                    results[item_id] = {
+                        "status": "pending", "attempts": attempts, "lastError": str(e),
+                        "nextAttemptAt": now + timedelta(seconds=delay),
+                    }
+                if not isinstance(e, _MESSAGE_ERRORS):
+                    # The server is unreachable: hand the rest back untouched
+                    # instead of failing every email against it
+                    retry_at = now + timedelta(seconds=EMAIL_RETRY_BASE_SECONDS)
+                    for rest_id, *_ in claimed[position + 1:]:
+                        results[rest_id] = {"status": "pending", "nextAttemptAt": retry_at}
+                    break
+
+        delivered = 0
+        for item_id, values in results.items():
+            # A row whose lease expired may have been claimed again; leave it alone
+            updated = db.query(models.EmailOutbox).filter(
+                models.EmailOutbox.id == item_id,
+                models.EmailOutbox.status == "sending",
+                models.EmailOutbox.nextAttemptAt == lease
+            ).update(values, synchronize_session=False)
+            if updated and values["status"] == "sent":
+                delivered += 1
+        db.commit()
+        self.sent += delivered
+        return delivered
+
+    def _run(self):
+        while not self._stop.is_set():
+            self._wake.wait(EMAIL_POLL_SECONDS)
+            self._wake.clear()
+            db = database.SessionLocal()
+            try:
+                # Keep draining while full batches come back
+                while self.flush(db) >= EMAIL_BATCH_SIZE:
+                    pass
+            except Exception as e:
+                db.rollback()
+                print(f"Email outbox error: {e}")
+            finally:
+                db.close()
+        self._close()
+
+    def wake(self):
+        self._wake.set()
+
+    def start(self):
+        if self._thread is not None:
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="email-outbox", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        self._wake.set()
+        self._thread = None
+
+    def stats(self) -> dict:
+        return {"sent": self.sent, "failed": self.failed, "configured": smtp_configured()}
+
+
+outbox_sender = OutboxSender()
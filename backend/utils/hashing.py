@@ -0,0 +1,162 @@
+import asyncio
+import multiprocessing
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor, TimeoutError as FutureTimeout
+from typing import Optional
+
+from passlib.context import CryptContext
+
+pwd_context = CryptContext(schemes=["pbkdf2_sha256", "bcrypt"], deprecated="auto")
+
+# 0 workers hashes inline on the calling thread (previous behaviour)
+HASH_POOL_WORKERS = int(os.getenv("HASH_POOL_WORKERS", str(min(4, os.cpu_count() or 1))))
+# Maximum hashes queued or running before new requests are shed
+HASH_QUEUE_LIMIT = int(os.getenv("HASH_QUEUE_LIMIT", "64"))
+HASH_TIMEOUT = float(os.getenv("HASH_TIMEOUT", "10"))
+# Workers are started from a clean process rather than forked from the API
+# process, which holds threads, sockets and DB connections that must not be
+# copied into the children
+HASH_POOL_START_METHOD = os.getenv(
+    "HASH_POOL_START_METHOD",
+    "forkserver" if "forkserver" in multiprocessing.get_all_start_methods() else "spawn"
+)
+
+
+class HashingOverloaded(Exception):
+    """Raised when the hashing queue is full; callers should answer 503"""
+
+
+# Executed inside the worker processes
+def _verify(plain_password: str, hashed_password: str) -> bool:
+    return pwd_context.verify(plain_password, hashed_password)
+
+def _hash(password: str) -> str:
+    return pwd_context.hash(password)
+
+
+class HashingService:
+    """
+    Runs pbkdf2/bcrypt in a process pool so that password work does not hold
+    the GIL of the API process. Callers block on the result, but the AnyIO
+    worker thread sleeps instead of competing with other sync endpoints.
+    """
+
+    def __init__(self, workers: int = HASH_POOL_WORKERS, queue_limit: int = HASH_QUEUE_LIMIT):
+        self._lock = threading.Lock()
+        self._executor: Optional[ProcessPoolExecutor] = None
+        self.in_flight = 0
+        self.completed = 0
+        self.failed = 0
+        self.timed_out = 0
+        self.rejected = 0
+        self.configure(workers, queue_limit)
+
+    def configure(self, workers: int, queue_limit: Optional[int] = None):
+        self.shutdown()
+        self.workers = workers
+        if queue_limit is not None:
+            self.queue_limit = queue_limit
+
+    def _get_executor(self) -> ProcessPoolExecutor:
+        if self._executor is None:
+            self._executor = ProcessPoolExecutor(
+                max_workers=self.workers, mp_context=multiprocessing.get_context(HASH_POOL_START_METHOD)
+            )
+        return self._executor
+
+    def _submit(self, fn, *args):
+        with self._lock:
+            if self.in_flight >= self.queue_limit:
+                self.rejected += 1
+                raise HashingOverloaded()
+            self.in_flight += 1
+            executor = self._get_executor()
+        try:
+            future = executor.submit(fn, *args)
+        except BaseException:
+            self._release()
+            raise
+        # A job only frees its slot once it has really finished or been
+        # cancelled; one that timed out while running still occupies a worker
+        future.add_done_callback(self._release)
+        return future
+
+    def _release(self, future=None):
+        with self._lock:
+            self.in_flight -= 1
+
+    def _count(self, outcome: str):
+        with self._lock:
+            setattr(self, outcome, getattr(self, outcome) + 1)
+
+    def _run(self, fn, *args):
+        if self.workers <= 0:
+            return fn(*args)
+
+        future = self._submit(fn, *args)
+        try:
+            result = future.result(timeout=HASH_TIMEOUT)
+        except FutureTimeout:
+            # Drops the job if it has not started; a running hash cannot be interrupted
+            future.cancel()
+            self._count("timed_out")
+            raise HashingOverloaded()
+        except Exception:
+            self._count("failed")
+            raise
+        self._count("completed")
+        return result
+
+    async def _run_async(self, fn, *args):
+        """Awaitable variant for async handlers: waits on the pool without a thread"""
+        if self.workers <= 0:
+            return await asyncio.get_running_loop().run_in_executor(None, fn, *args)
+
+        future = self._submit(fn, *args)
+        try:
+            result = await asyncio.wait_for(asyncio.wrap_future(future), timeout=HASH_TIMEOUT)
+        except asyncio.TimeoutError:
+            future.cancel()
+            self._count("timed_out")
+            raise HashingOverloaded()
+        except BaseException:
+            # Includes the request being cancelled while it waited
+            future.cancel()
+            self._count("failed")
+            raise
+        self._count("completed")
+        return result
+
+    async def averify(self, plain_password: str, hashed_password: str) -> bool:
+        return await self._run_async(_verify, plain_password, hashed_password)
+
+    async def ahash(self, password: str) -> str:
+        return await self._run_async(_hash, password)
+
+    def verify(self, plain_password: str, hashed_password: str) -> bool:
+        return self._run(_verify, plain_password, hashed_password)
+
+    def hash(self, password: str) -> str:
+        return self._run(_hash, password)
+
+    def shutdown(self):
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            # Jobs still queued are cancelled rather than run on the way out
+            executor.shutdown(wait=True, cancel_futures=True)
+
+    def stats(self) -> dict:
+        return {
+            "workers": self.workers,
+            "queueLimit": self.queue_limit,
+            "inFlight": self.in_flight,
+            "completed": self.completed,
+            "failed": self.failed,
+            "timedOut": self.timed_out,
+            "rejected": self.rejected,
+        }
+
+
+hashing_service = HashingService()
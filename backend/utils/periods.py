@@ -0,0 +1,80 @@
+from datetime import date, datetime, timedelta
+from typing import Iterator, Optional, Tuple
+
+from fastapi import HTTPException
+from sqlalchemy import func
+
+GRANULARITIES = ("day", "week", "month")
+GRANULARITY_PATTERN = "^(day|week|month)$"
+MAX_BUCKETS = 1000
+DEFAULT_MONTHS = 6
+
+
+def bucket_start(day: date, granularity: str) -> date:
+    """First day of the bucket containing `day` (weeks start on Monday)"""
+    if granularity == "week":
+        return day - timedelta(days=day.weekday())
+    if granularity == "month":
+        return day.replace(day=1)
+    return day
+
+
+def next_bucket(start: date, granularity: str) -> date:
+    if granularity == "week":
+        return start + timedelta(days=7)
+    if granularity == "month":
+        return (start.replace(day=28) + timedelta(days=4)).replace(day=1)
+    return start + timedelta(days=1)
+
+
+def iter_buckets(start: date, end: date, granularity: str) -> Iterator[date]:
+    """Bucket starts covering [start, end], including empty ones"""
+    current = bucket_start(start, granularity)
+    while current <= end:
+        yield current
+        current = next_bucket(current, granularity)
+
+
+def resolve_range(from_date: Optional[date], to_date: Optional[date], granularity: str) -> Tuple[date, date]:
+    """Default to the last DEFAULT_MONTHS months and reject oversized ranges"""
+    to_date = to_date or date.today()
+    if from_date is None:
+        from_date = to_date.replace(day=1)
+        for _ in range(DEFAULT_MONTHS - 1):
+            from_date = (from_date - timedelta(days=1)).replace(day=1)
+    if from_date > to_date:
+        raise HTTPException(status_code=400, detail="'from' must be on or before 'to'")
+    buckets = sum(1 for _ in iter_buckets(from_date, to_date, granularity))
+    if buckets > MAX_BUCKETS:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Range spans {buckets} {granularity} buckets; the limit is {MAX_BUCKETS}"
+        )
+    return from_date, to_date
+
+
+def bucket_expression(column, granularity: str, dialect_name: str):
+    """SQL expression truncating a Date/DateTime column to its bucket start"""
+    if dialect_name == "postgresql":
+        return func.date_trunc(granularity, column)
+    if granularity == "week":
+        # Back six days, then forward to the next Monday: the Monday on or before
+        return func.date(column, "-6 days", "weekday 1")
+    if granularity == "month":
+        return func.date(column, "start of month")
+    return func.date(column)
+
+
+def as_date(value) -> date:
+    """Normalise a bucket value (date, datetime or ISO string, by dialect) to a date"""
+    if isinstance(value, datetime):
+        return value.date()
+    if isinstance(value, date):
+        return value
+    return date.fromisoformat(str(value)[:10])
+
+
+def bucket_label(start: date, granularity: str, from_date: date, to_date: date) -> str:
+    if granularity == "month":
+        return start.strftime("%b") if from_date.year == to_date.year else start.strftime("%b %Y")
+    return start.strftime("%b %d")
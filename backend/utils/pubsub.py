@@ -0,0 +1,163 @@
+import asyncio
+import json
+import os
+from typing import Awaitable, Callable, Dict, Optional, Set
+
+WS_PUBSUB_BACKEND = os.getenv("WS_PUBSUB_BACKEND", "memory")  # 'memory' or 'redis'
+WS_PUBSUB_REDIS_URL = os.getenv("WS_PUBSUB_REDIS_URL", "redis://localhost:6379/0")
+
+Handler = Callable[[str, dict], Awaitable[None]]
+
+
+class MemoryPubSub:
+    """
+    Pub/sub between the ConnectionManagers of one process. Enough for a single
+    worker; several instances in one process stand in for separate workers in
+    checks.
+    """
+
+    # channel -> instances subscribed to it, shared by every instance in the process
+    _subscribers: Dict[str, Set["MemoryPubSub"]] = {}
+
+    def __init__(self):
+        self._handler: Optional[Handler] = None
+        self._channels: Set[str] = set()
+        self.published = 0
+        self.received = 0
+
+    async def start(self, handler: Handler):
+        self._handler = handler
+
+    async def subscribe(self, channel: str):
+        self._channels.add(channel)
+        self._subscribers.setdefault(channel, set()).add(self)
+
+    async def unsubscribe(self, channel: str):
+        self._channels.discard(channel)
+        subscribers = self._subscribers.get(channel)
+        if subscribers is not None:
+            subscribers.discard(self)
+            if not subscribers:
+                del self._subscribers[channel]
+
+    async def publish(self, channel: str, message: dict) -> int:
+        self.published += 1
+        subscribers = list(self._subscribers.get(channel, ()))
+        for subscriber in subscribers:
+            await subscriber._deliver(channel, message)
+        return len(subscribers)
+
+    async def _deliver(self, channel: str, message: dict):
+        self.received += 1
+        if self._handler is not None:
+            await self._handler(channel, json.loads(json.dumps(message)))
+
+    async def stop(self):
+        for channel in list(self._channels):
+            await self.unsubscribe(channel)
+        self._handler = None
+
+    def stats(self) -> dict:
+        return {
+            "backend": "memory",
+            "channels": len(self._channels),
+            "published": self.published,
+            "received": self.received,
+        }
+
+
+class RedisPubSub:
+    """
+    Pub/sub across workers and hosts through Redis (or anything speaking its
+    protocol). Each worker subscribes only to the channels of the users
+    connected to it, so Redis forwards a message just to the worker that
+    holds the recipient's socket.
+    """
+
+    def __init__(self, client):
+        self._client = client
+        self._pubsub = client.pubsub(ignore_subscribe_messages=True)
+        self._handler: Optional[Handler] = None
+        self._listener: Optional[asyncio.Task] = None
+        self._channels: Set[str] = set()
+        self.published = 0
+        self.received = 0
+        self.errors = 0
+
+    @classmethod
+    def from_url(cls, url: str):
+        import redis.asyncio  # optional dependency, only needed for multi-worker deployments
+        return cls(redis.asyncio.Redis.from_url(url))
+
+    async def start(self, handler: Handler):
+        self._handler = handler
+
+    def _ensure_listener(self):
+        # redis-py only allows reading once the connection has a subscription
+        if self._listener is None or self._listener.done():
+            self._listener = asyncio.create_task(self._listen())
+
+    async def _listen(self):
+        while True:
+            try:
+                message = await self._pubsub.get_message(timeout=1.0)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                self.errors += 1
+                print(f"Pub/sub receive error: {e}")
+                await asyncio.sleep(1)
+                continue
+            if message is None or message.get("type") != "message":
+                if not self._channels:
+                    return
+                continue
+            self.received += 1
+            channel = message["channel"]
+            if isinstance(channel, bytes):
+                channel = channel.decode()
+            try:
+                await self._handler(channel, json.loads(message["data"]))
+            except Exception as e:
+                self.errors += 1
+                print(f"Pub/sub handler error on {channel}: {e}")
+
+    async def subscribe(self, channel: str):
+        if channel in self._channels:
+            return
+        self._channels.add(channel)
+        await self._pubsub.subscribe(channel)
+        self._ensure_listener()
+
+    async def unsubscribe(self, channel: str):
+        if channel not in self._channels:
+            return
+        self._channels.discard(channel)
+        await self._pubsub.unsubscribe(channel)
+
+    async def publish(self, channel: str, message: dict) -> int:
+        self.published += 1
+        return await self._client.publish(channel, json.dumps(message))
+
+    async def stop(self):
+        if self._listener is not None:
+            self._listener.cancel()
+            self._listener = None
+        self._channels.clear()
+        await self._pubsub.aclose()
+        await self._client.aclose()
+
+    def stats(self) -> dict:
+        return {
+            "backend": "redis",
+            "channels": len(self._channels),
+            "published": self.published,
+            "received": self.received,
+            "errors": self.errors,
+        }
+
+
+def create_pubsub():
+    if WS_PUBSUB_BACKEND == "redis":
+        return RedisPubSub.from_url(WS_PUBSUB_REDIS_URL)
+    return MemoryPubSub()
@@ -0,0 +1,128 @@
+import math
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Optional, Tuple
+
+from fastapi import HTTPException, Request, status
+
+RATE_LIMIT_BACKEND = os.getenv("RATE_LIMIT_BACKEND", "memory")  # 'memory' or 'redis'
+RATE_LIMIT_REDIS_URL = os.getenv("RATE_LIMIT_REDIS_URL", "redis://localhost:6379/0")
+RATE_LIMIT_TRUST_PROXY = os.getenv("RATE_LIMIT_TRUST_PROXY", "false").lower() == "true"
+
+
+class MemoryBucketStore:
+    """Per-process token buckets; the least recently used keys are evicted past max_keys"""
+
+    def __init__(self, max_keys: int = 100000):
+        self.max_keys = max_keys
+        self._buckets: "OrderedDict[str, Tuple[float, float]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    async def take(self, key: str, capacity: float, rate: float, now: float) -> Tuple[bool, float]:
+        with self._lock:
+            tokens, updated = self._buckets.get(key, (capacity, now))
+            tokens = min(capacity, tokens + (now - updated) * rate)
+            allowed = tokens >= 1
+            if allowed:
+                tokens -= 1
+            self._buckets[key] = (tokens, now)
+            self._buckets.move_to_end(key)
+            while len(self._buckets) > self.max_keys:
+                self._buckets.popitem(last=False)
+            return allowed, tokens
+
+
+class RedisBucketStore:
+    """
+    Token buckets shared by every worker through Redis (atomic Lua update),
+    over the asyncio client so a check never blocks the event loop
+    """
+
+    SCRIPT = """
+    local capacity = tonumber(ARGV[1])
+    local rate = tonumber(ARGV[2])
+    local now = tonumber(ARGV[3])
+    local data = redis.call('HMGET', KEYS[1], 'tokens', 'ts')
+    local tokens = tonumber(data[1]) or capacity
+    local ts = tonumber(data[2]) or now
+    tokens = math.min(capacity, tokens + math.max(0, now - ts) * rate)
+    local allowed = 0
+    if tokens >= 1 then
+        tokens = tokens - 1
+        allowed = 1
+    end
+    redis.call('HSET', KEYS[1], 'tokens', tokens, 'ts', now)
+    redis.call('EXPIRE', KEYS[1], math.ceil(capacity / rate) + 1)
+    return {allowed, tostring(tokens)}
+    """
+
+    def __init__(self, client):
+        self._script = client.register_script(self.SCRIPT)
+
+    @classmethod
+    def from_url(cls, url: str):
+        import redis.asyncio  # optional dependency, only needed for multi-worker deployments
+        return cls(redis.asyncio.Redis.from_url(url))
+
+    async def take(self, key: str, capacity: float, rate: float, now: float) -> Tuple[bool, float]:
+        allowed, tokens = await self._script(keys=[f"ratelimit:{key}"], args=[capacity, rate, now])
+        return bool(int(allowed)), float(tokens)
+
+
+def _default_store():
+    if RATE_LIMIT_BACKEND == "redis":
+        return RedisBucketStore.from_url(RATE_LIMIT_REDIS_URL)
+    return MemoryBucketStore()
+
+bucket_store = _default_store()
+
+
+def client_ip(request: Request) -> str:
+    if RATE_LIMIT_TRUST_PROXY:
+        forwarded = request.headers.get("x-forwarded-for")
+        if forwarded:
+            return forwarded.split(",")[0].strip()
+    return request.client.host if request.client else "unknown"
+
+
+class RateLimiter:
+    """
+    Token bucket allowing `capacity` requests in a burst, refilled at
+    capacity / period tokens per second. Separate buckets are kept per IP
+    and per email so that neither a single host nor a single account can
+    drive the hashing and OTP endpoints.
+    """
+
+    def __init__(self, scope: str, capacity: int, period: float, store=None):
+        self.scope = scope
+        self.capacity = capacity
+        self.rate = capacity / period
+        self.store = store
+        self.rejected = 0
+
+    async def _take(self, key: str) -> Optional[int]:
+        """Return None when allowed, otherwise the seconds until a token is available"""
+        store = self.store or bucket_store
+        allowed, tokens = await store.take(f"{self.scope}:{key}", self.capacity, self.rate, time.time())
+        if allowed:
+            return None
+        return max(1, math.ceil((1 - tokens) / self.rate))
+
+    async def check(self, request: Request, email: Optional[str] = None):
+        keys = [f"ip:{client_ip(request)}"]
+        if email:
+            keys.append(f"email:{email.strip().lower()}")
+        for key in keys:
+            retry_after = await self._take(key)
+            if retry_after is not None:
+                self.rejected += 1
+                raise HTTPException(
+                    status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+                    detail="Too many attempts, please try again later",
+                    headers={"Retry-After": str(retry_after)},
+                )
+
+    def stats(self) -> dict:
+        return {"capacity": self.capacity, "perSecond": round(self.rate, 4), "rejected": self.rejected}
@@ -0,0 +1,240 @@
+import functools
+import os
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, Hashable, Iterable, Optional
+
+from sqlalchemy import event
+
+import database
+
+RESPONSE_CACHE_SIZE = int(os.getenv("RESPONSE_CACHE_SIZE", "512"))
+# How long past its TTL an entry may still be served while it is refreshed
+RESPONSE_CACHE_STALE_SECONDS = float(os.getenv("RESPONSE_CACHE_STALE_SECONDS", "300"))
+RESPONSE_CACHE_REFRESH_WORKERS = int(os.getenv("RESPONSE_CACHE_REFRESH_WORKERS", "2"))
+
+
+class _Entry:
+    __slots__ = ("value", "fresh_until", "stale_until")
+
+    def __init__(self, value, fresh_until: float, stale_until: float):
+        self.value = value
+        self.fresh_until = fresh_until
+        self.stale_until = stale_until
+
+
+class ResponseCache:
+    """
+    Stale-while-revalidate cache for read-heavy admin endpoints.
+
+    A fresh entry is returned as is. Once its TTL passes it is still returned
+    for up to stale_seconds while one background refresh recomputes it; after
+    that (or on a cold key) the first caller computes inline and concurrent
+    callers for the same key wait for that result instead of recomputing.
+    Invalidating an entry only marks it stale, so writes never cause a
+    stampede of recomputation.
+    """
+
+    def __init__(self, maxsize: int = 512, stale_seconds: float = 300.0, refresh_workers: int = 2):
+        self.maxsize = maxsize
+        self.stale_seconds = stale_seconds
+        self.refresh_workers = refresh_workers
+        self._data: "OrderedDict[Hashable, _Entry]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._inflight: Dict[Hashable, threading.Event] = {}
+        self._refreshing = set()
+        self._executor: Optional[ThreadPoolExecutor] = None
+        # endpoint name -> tables its response is computed from
+        self._tables: Dict[str, frozenset] = {}
+        self._counters: Dict[str, Dict[str, int]] = {}
+        # Bumped by invalidate() so a refresh that started before a write
+        # does not store its result as fresh
+        self._generation = 0
+
+    def _count(self, name: str, counter: str):
+        counters = self._counters.setdefault(
+            name, {"hits": 0, "staleHits": 0, "misses": 0, "coalesced": 0, "refreshes": 0, "refreshErrors": 0}
+        )
+        counters[counter] += 1
+
+    def _store(self, key, value, ttl: float, generation: Optional[int] = None):
+        now = time.monotonic()
+        with self._lock:
+            if generation is not None and generation != self._generation:
+                ttl = 0
+            self._data[key] = _Entry(value, now + ttl, now + ttl + self.stale_seconds)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def get_or_compute(self, key: Hashable, ttl: float, compute: Callable, refresh: Optional[Callable] = None):
+        """
+        Return the cached value for key, computing it with compute() when
+        there is nothing usable. refresh() recomputes in the background and
+        defaults to compute; it must not depend on request-scoped state.
+        """
+        name = key[0] if isinstance(key, tuple) else key
+        while True:
+            now = time.monotonic()
+            with self._lock:
+                entry = self._data.get(key)
+                if entry is not None and now < entry.fresh_until:
+                    self._data.move_to_end(key)
+                    self._count(name, "hits")
+                    return entry.value
+                if entry is not None and now < entry.stale_until:
+                    self._data.move_to_end(key)
+                    self._count(name, "staleHits")
+                    if key not in self._refreshing:
+                        self._refreshing.add(key)
+                        self._submit(key, ttl, refresh or compute)
+                    return entry.value
+                waiting = self._inflight.get(key)
+                if waiting is None:
+                    done = self._inflight[key] = threading.Event()
+                    self._count(name, "misses")
+                else:
+                    self._count(name, "coalesced")
+            if waiting is not None:
+                # Another caller is computing this key; use its result (or retry if it failed)
+                waiting.wait()
+                continue
+            try:
+                generation = self._generation
+                value = compute()
+                self._store(key, value, ttl, generation)
+                return value
+            finally:
+                with self._lock:
+                    self._inflight.pop(key, None)
+                done.set()
+
+    def _submit(self, key, ttl: float, refresh: Callable):
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(
+                max_workers=self.refresh_workers, thread_name_prefix="response-cache"
+            )
+        self._executor.submit(self._refresh, key, ttl, refresh, self._generation)
+
+    def _refresh(self, key, ttl: float, refresh: Callable, generation: int):
+        name = key[0] if isinstance(key, tuple) else key
+        try:
+            self._store(key, refresh(), ttl, generation)
+            with self._lock:
+                self._count(name, "refreshes")
+        except Exception as e:
+            # Keep serving the stale value; the next stale hit retries
+            with self._lock:
+                self._count(name, "refreshErrors")
+            print(f"Response cache refresh failed for {key}: {e}")
+        finally:
+            with self._lock:
+                self._refreshing.discard(key)
+
+    def cached(self, name: str, ttl: float, tables: Iterable[str] = ()):
+        """
+        Cache a sync endpoint that takes its session as `db`. The key is the
+        endpoint name plus its other arguments; background refreshes run with
+        their own session. Writes to any of `tables` mark the entries stale.
+        """
+        self._tables[name] = frozenset(tables)
+
+        def decorator(func):
+            @functools.wraps(func)
+            def wrapper(*args, db, **kwargs):
+                key = (name, args, tuple(sorted(kwargs.items())))
+
+                def refresh():
+                    session = database.SessionLocal()
+                    try:
+                        with database.route_reads("GET"):
+                            return func(*args, db=session, **kwargs)
+                    finally:
+                        session.close()
+
+                return self.get_or_compute(key, ttl, lambda: func(*args, db=db, **kwargs), refresh)
+            return wrapper
+        return decorator
+
+    def invalidate(self, name: Optional[str] = None):
+        """Mark every entry of one endpoint (or all endpoints) stale"""
+        now = time.monotonic()
+        with self._lock:
+            self._generation += 1
+            for key, entry in self._data.items():
+                key_name = key[0] if isinstance(key, tuple) else key
+                if name is None or key_name == name:
+                    entry.fresh_until = min(entry.fresh_until, now)
+
+    def invalidate_tables(self, tables: Iterable[str]):
+        tables = set(tables)
+        for name, depends_on in self._tables.items():
+            if depends_on & tables:
+                self.invalidate(name)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def stop(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=False)
+            self._executor = None
+
+    def stats(self) -> dict:
+        with self._lock:
+            endpoints = {name: dict(counters) for name, counters in self._counters.items()}
+            size = len(self._data)
+            refreshing = len(self._refreshing)
+        for counters in endpoints.values():
+            served = counters["hits"] + counters["staleHits"]
+            # Coalesced callers are counted again as hits once the value lands
+            total = served + counters["misses"]
+            counters["hitRatio"] = round(served / total, 4) if total else 0.0
+        served = sum(c["hits"] + c["staleHits"] for c in endpoints.values())
+        total = sum(c["hits"] + c["staleHits"] + c["misses"] for c in endpoints.values())
+        return {
+            "size": size,
+            "maxsize": self.maxsize,
+            "staleSeconds": self.stale_seconds,
+            "refreshing": refreshing,
+            "hitRatio": round(served / total, 4) if total else 0.0,
+            "endpoints": endpoints,
+        }
+
+
+response_cache = ResponseCache(
+    maxsize=RESPONSE_CACHE_SIZE,
+    stale_seconds=RESPONSE_CACHE_STALE_SECONDS,
+    refresh_workers=RESPONSE_CACHE_REFRESH_WORKERS,
+)
+
+
+# Committed writes mark dependent entries stale. Tables are collected per
+# session so a rolled-back transaction invalidates nothing.
+@event.listens_for(database.RoutingSession, "after_flush")
+def _collect_flushed_tables(session, flush_context):
+    changed = session.info.setdefault("changed_tables", set())
+    for obj in list(session.new) + list(session.dirty) + list(session.deleted):
+        table = getattr(obj, "__tablename__", None)
+        if table:
+            changed.add(table)
+
+@event.listens_for(database.RoutingSession, "do_orm_execute")
+def _collect_bulk_tables(orm_execute_state):
+    if (orm_execute_state.is_update or orm_execute_state.is_delete) and orm_execute_state.bind_mapper is not None:
+        orm_execute_state.session.info.setdefault("changed_tables", set()).add(
+            orm_execute_state.bind_mapper.local_table.name
+        )
+
+@event.listens_for(database.RoutingSession, "after_commit")
+def _invalidate_committed_tables(session):
+    changed = session.info.pop("changed_tables", None)
+    if changed:
+        response_cache.invalidate_tables(changed)
+
+@event.listens_for(database.RoutingSession, "after_rollback")
+def _discard_rolled_back_tables(session):
+    session.info.pop("changed_tables", None)
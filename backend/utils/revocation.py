@@ -0,0 +1,85 @@
+import threading
+import time
+from datetime import datetime, timedelta
+from typing import Dict, Optional
+
+import database
+import models
+
+
+class RevocationList:
+    """
+    In-memory set of revoked session ids, rebuilt incrementally from the
+    sessions table so access-token checks never touch the database.
+
+    Entries are forgotten once every access token that could reference the
+    session has expired (retention), which keeps the set small.
+    """
+
+    # Re-scan this far behind the watermark to catch late-committed rows
+    OVERLAP = timedelta(seconds=5)
+
+    def __init__(self, retention: timedelta, interval: float = 5.0):
+        self.retention = retention
+        self.interval = interval
+        self._revoked: Dict[str, datetime] = {}  # session id -> revokedAt (UTC)
+        self._watermark: Optional[datetime] = None
+        self._lock = threading.Lock()
+        self._thread: Optional[threading.Thread] = None
+        self._stop = threading.Event()
+
+    def is_revoked(self, session_id: str) -> bool:
+        return session_id in self._revoked
+
+    def add(self, session_id: str, revoked_at: Optional[datetime] = None):
+        with self._lock:
+            self._revoked[session_id] = revoked_at or datetime.utcnow()
+
+    def sync(self, db):
+        """Pull revocations newer than the last watermark"""
+        now = datetime.utcnow()
+        since = self._watermark - self.OVERLAP if self._watermark else now - self.retention
+        rows = db.query(models.AuthSession.id, models.AuthSession.revokedAt).filter(
+            models.AuthSession.revokedAt >= since
+        ).all()
+        cutoff = now - self.retention
+        with self._lock:
+            for session_id, revoked_at in rows:
+                self._revoked[session_id] = revoked_at
+            for session_id in [s for s, at in self._revoked.items() if at < cutoff]:
+                del self._revoked[session_id]
+            self._watermark = now
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            db = database.SessionLocal()
+            try:
+                self.sync(db)
+            except Exception as e:
+                print(f"Revocation sync failed: {e}")
+            finally:
+                db.close()
+
+    def start(self):
+        """Load current revocations, then keep them fresh from a daemon thread"""
+        if self._thread is not None:
+            return
+        db = database.SessionLocal()
+        try:
+            self.sync(db)
+        finally:
+            db.close()
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="revocation-sync", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        self._thread = None
+
+    def stats(self) -> dict:
+        return {
+            "revokedSessions": len(self._revoked),
+            "lastSync": self._watermark.isoformat() if self._watermark else None,
+            "interval": self.interval,
+        }
@@ -0,0 +1,214 @@
+"""
+Dashboard rollups, kept in step with cases, appointments, payments and
+orders. Every flush that adds, changes or deletes one of those rows applies
+the matching deltas to the rollup tables on the same connection, so they
+commit or roll back together with the write. Bulk update()/delete()
+statements on the source tables bypass this; rebuild_rollups() repairs any
+drift.
+"""
+from collections import defaultdict
+from datetime import datetime
+from typing import Dict, List, Tuple
+
+from sqlalchemy import delete, event, func, insert, select, text, update
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.orm import Session, attributes
+
+import database
+import models
+
+ROLLUP_MODELS = (models.DailyTotals, models.CaseStatusCount, models.AppointmentStatusCount)
+SOURCE_MODELS = (models.Case, models.Appointment, models.Payment, models.Order)
+
+
+def _day(value):
+    return value.date() if isinstance(value, datetime) else value
+
+
+def _contributions(obj, value) -> List[Tuple[type, tuple, Dict[str, float]]]:
+    """What one source row adds to the rollups: (rollup model, key, metric deltas)"""
+    if isinstance(obj, models.Case):
+        rows = [(models.CaseStatusCount, (value("status") or "", value("priority") or ""), {"count": 1})]
+        if value("createdAt"):
+            rows.append((models.DailyTotals, (_day(value("createdAt")),), {"newCases": 1}))
+        return rows
+    if isinstance(obj, models.Appointment):
+        return [(models.AppointmentStatusCount, (value("status") or "",), {"count": 1})]
+    if isinstance(obj, models.Payment):
+        if value("status") != "completed" or not value("date"):
+            return []
+        return [(models.DailyTotals, (_day(value("date")),), {
+            "revenue": value("amount") or 0,
+            "platformFees": value("platformFee") or 0,
+            "payments": 1,
+        })]
+    if isinstance(obj, models.Order):
+        if value("status") != "completed" or not value("createdAt"):
+            return []
+        return [(models.DailyTotals, (_day(value("createdAt")),), {
+            "orderRevenue": value("totalAmount") or 0,
+            "orders": 1,
+        })]
+    return []
+
+
+def _current(obj):
+    return lambda name: getattr(obj, name)
+
+
+def _committed(obj):
+    """Values as they were loaded from the database, before this flush"""
+    def value(name):
+        history = attributes.get_history(obj, name, passive=attributes.PASSIVE_NO_INITIALIZE)
+        if history.deleted:
+            return history.deleted[0]
+        if history.unchanged:
+            return history.unchanged[0]
+        return getattr(obj, name)
+    return value
+
+
+def _collect(session: Session):
+    deltas = defaultdict(lambda: defaultdict(float))
+
+    def apply(obj, value, sign):
+        for model, key, metrics in _contributions(obj, value):
+            for column, amount in metrics.items():
+                deltas[(model, key)][column] += sign * amount
+
+    for obj in session.new:
+        if isinstance(obj, SOURCE_MODELS):
+            apply(obj, _current(obj), 1)
+    for obj in session.deleted:
+        if isinstance(obj, SOURCE_MODELS):
+            apply(obj, _committed(obj), -1)
+    for obj in session.dirty:
+        if isinstance(obj, SOURCE_MODELS) and session.is_modified(obj):
+            apply(obj, _committed(obj), -1)
+            apply(obj, _current(obj), 1)
+    return deltas
+
+
+def _key_columns(model):
+    return [column.name for column in model.__table__.primary_key.columns]
+
+
+def _upsert(connection, model, key: tuple, metrics: Dict[str, float]):
+    table = model.__table__
+    key_values = dict(zip(_key_columns(model), key))
+    dialect = connection.dialect.name
+    if dialect in ("postgresql", "sqlite"):
+        insert_for = postgresql.insert if dialect == "postgresql" else sqlite.insert
+        statement = insert_for(table).values(**key_values, **metrics)
+        statement = statement.on_conflict_do_update(
+            index_elements=list(key_values),
+            set_={column: table.c[column] + statement.excluded[column] for column in metrics}
+        )
+        connection.execute(statement)
+        return
+    where = [table.c[name] == val for name, val in key_values.items()]
+    result = connection.execute(
+        update(table).where(*where).values({column: table.c[column] + amount for column, amount in metrics.items()})
+    )
+    if result.rowcount == 0:
+        connection.execute(insert(table).values(**key_values, **metrics))
+
+
+@event.listens_for(database.RoutingSession, "after_flush")
+def _apply_rollup_deltas(session, flush_context):
+    deltas = _collect(session)
+    if not deltas:
+        return
+    connection = session.connection()
+    for (model, key), metrics in deltas.items():
+        metrics = {column: amount for column, amount in metrics.items() if amount}
+        if metrics:
+            _upsert(connection, model, key, metrics)
+
+
+def _expected(db: Session):
+    """Rollup rows recomputed from the source tables: {model: {key: metrics}}"""
+    expected = {model: defaultdict(lambda: defaultdict(float)) for model in ROLLUP_MODELS}
+
+    status = func.coalesce(models.Case.status, "")
+    priority = func.coalesce(models.Case.priority, "")
+    for row in db.execute(select(status, priority, func.count()).group_by(status, priority)):
+        expected[models.CaseStatusCount][(row[0], row[1])]["count"] = row[2]
+
+    status = func.coalesce(models.Appointment.status, "")
+    for row in db.execute(select(status, func.count()).group_by(status)):
+        expected[models.AppointmentStatusCount][(row[0],)]["count"] = row[1]
+
+    daily = expected[models.DailyTotals]
+    for row in db.execute(
+        select(models.Case.createdAt, func.count())
+        .where(models.Case.createdAt.isnot(None)).group_by(models.Case.createdAt)
+    ):
+        daily[(row[0],)]["newCases"] += row[1]
+    for row in db.execute(
+        select(models.Payment.date, func.sum(models.Payment.amount),
+               func.sum(func.coalesce(models.Payment.platformFee, 0)), func.count())
+        .where(models.Payment.status == "completed", models.Payment.date.isnot(None))
+        .group_by(models.Payment.date)
+    ):
+        daily[(row[0],)].update(revenue=row[1] or 0, platformFees=row[2] or 0, payments=row[3])
+    # Orders carry a timestamp; they are bucketed by day in Python
+    for created_at, total in db.execute(
+        select(models.Order.createdAt, models.Order.totalAmount)
+        .where(models.Order.status == "completed", models.Order.createdAt.isnot(None))
+    ):
+        daily[(_day(created_at),)]["orderRevenue"] += total or 0
+        daily[(_day(created_at),)]["orders"] += 1
+    return expected
+
+
+def _stored(db: Session, model):
+    keys = _key_columns(model)
+    metrics = [c.name for c in model.__table__.columns if c.name not in keys]
+    return {
+        tuple(getattr(row, k) for k in keys): {m: getattr(row, m) for m in metrics}
+        for row in db.execute(select(model)).scalars()
+    }
+
+
+def rollup_drift(db: Session) -> List[str]:
+    """Describe every rollup row that differs from the source tables"""
+    drift = []
+    for model, expected_rows in _expected(db).items():
+        stored = _stored(db, model)
+        for key in set(stored) | set(expected_rows):
+            have = stored.get(key, {})
+            want = expected_rows.get(key, {})
+            for column in set(have) | set(want):
+                if abs((have.get(column) or 0) - (want.get(column) or 0)) > 1e-6:
+                    drift.append(f"{model.__tablename__}{list(key)}.{column}: "
+                                 f"stored {have.get(column) or 0}, actual {want.get(column) or 0}")
+    return drift
+
+
+def rebuild_rollups(db: Session):
+    """Recompute every rollup table from the source tables in one transaction"""
+    if db.get_bind().dialect.name == "postgresql":
+        # Writers block on their rollup upsert until this commits, so their
+        # deltas land on top of the rebuilt rows instead of being lost
+        tables = ", ".join(model.__tablename__ for model in ROLLUP_MODELS)
+        db.execute(text(f"LOCK TABLE {tables} IN SHARE ROW EXCLUSIVE MODE"))
+    expected = _expected(db)
+    for model, rows in expected.items():
+        db.execute(delete(model))
+        keys = _key_columns(model)
+        values = [{**dict(zip(keys, key)), **metrics} for key, metrics in rows.items()]
+        if values:
+            db.execute(insert(model), values)
+    db.commit()
+    return {model.__tablename__: len(rows) for model, rows in expected.items()}
+
+
+def ensure_rollups(db: Session):
+    """Build the rollups once for databases that predate them"""
+    if any(db.execute(select(model).limit(1)).first() for model in ROLLUP_MODELS):
+        return
+    if not any(db.execute(select(model.id).limit(1)).first() for model in SOURCE_MODELS):
+        return
+    counts = rebuild_rollups(db)
+    print(f"Built dashboard rollups: {counts}")
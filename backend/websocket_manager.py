@@ -1,54 +1,305 @@
 from fastapi import WebSocket
-from typing import Dict, List
-import json
+from collections import deque
+from typing import Callable, Dict, List, Optional
+import asyncio
+import os
+import time
+import uuid
+
+from utils.pubsub import create_pubsub
+
+# Messages waiting to be written to one socket; a client that falls this far
+# behind is disconnected instead of slowing delivery to everyone else
+WS_SEND_QUEUE_SIZE = int(os.getenv("WS_SEND_QUEUE_SIZE", "100"))
+# The server pings a socket that has been quiet this long, and reaps it if
+# nothing at all (not even the pong) arrives within the timeout
+WS_HEARTBEAT_INTERVAL = float(os.getenv("WS_HEARTBEAT_INTERVAL", "25"))
+WS_HEARTBEAT_TIMEOUT = float(os.getenv("WS_HEARTBEAT_TIMEOUT", "60"))
+# Reap sockets that answer pings but send no chat traffic for this long (0 = never)
+WS_IDLE_TIMEOUT = float(os.getenv("WS_IDLE_TIMEOUT", "0"))
+# Missed messages replayed per conversation when a socket resumes, and how many
+# conversations one resume may cover; anything beyond is marked incomplete and
+# the client reloads that history over REST
+WS_REPLAY_LIMIT = int(os.getenv("WS_REPLAY_LIMIT", "200"))
+WS_REPLAY_CONVERSATIONS = int(os.getenv("WS_REPLAY_CONVERSATIONS", "50"))
+
+BROADCAST_CHANNEL = "ws:broadcast"
+
+def user_channel(user_id: str) -> str:
+    return f"ws:user:{user_id}"
+
+
+class Connection:
+    """One socket with its own bounded outbound queue and writer task"""
+
+    def __init__(self, manager: "ConnectionManager", user_id: str, websocket: WebSocket):
+        self.manager = manager
+        self.user_id = user_id
+        self.websocket = websocket
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=WS_SEND_QUEUE_SIZE)
+        self.closed = False
+        # Any frame from the client, pongs included / chat traffic only
+        self.last_seen = self.last_message = time.monotonic()
+        self.writer = asyncio.create_task(self._write())
+
+    def enqueue(self, kind: str, message) -> bool:
+        """Queue a message without waiting; returns False if the socket is full or closed"""
+        if self.closed:
+            return False
+        try:
+            self.queue.put_nowait((kind, message, time.monotonic()))
+            return True
+        except asyncio.QueueFull:
+            return False
+
+    async def _write(self):
+        while True:
+            kind, message, queued_at = await self.queue.get()
+            try:
+                if kind == "json":
+                    await self.websocket.send_json(message)
+                else:
+                    await self.websocket.send_text(message)
+                self.manager._record_send(time.monotonic() - queued_at)
+            except Exception as e:
+                print(f"Error sending message to {self.user_id}: {e}")
+                self.manager.send_errors += 1
+                self.closed = True
+                await self.manager.disconnect(self.user_id, self.websocket)
+                return
+
+    def close(self):
+        self.closed = True
+        # A writer that failed removes itself; it must not cancel its own cleanup
+        if self.writer is not asyncio.current_task():
+            self.writer.cancel()
+
 
 class ConnectionManager:
-    def __init__(self):
+    """
+    Holds this worker's chat sockets, any number per user. Sends only queue
+    the message on each socket, so delivery fans out concurrently and a slow
+    client never stalls the others; one that overflows its queue is dropped.
+    A heartbeat pings quiet sockets and reaps those that stop answering, so
+    presence and broadcasts only count live peers.
+
+    Messages for users connected elsewhere go through the pub/sub backend:
+    every worker subscribes to the channels of its own users, so a message
+    reaches only the workers holding one of the recipient's sockets.
+    Presence (is_online) is local to this worker.
+
+    Other modules can use the same backend for worker-to-worker
+    notifications: add_channel_handler() subscribes every worker to a
+    channel and publish_threadsafe() sends to it from any thread.
+    """
+
+    def __init__(self, pubsub=None):
         # Store connections by user ID
-        self.active_connections: Dict[str, WebSocket] = {}
+        self.active_connections: Dict[str, List[Connection]] = {}
         # Store user info (role, name)
         self.user_info: Dict[str, dict] = {}
+        self.pubsub = pubsub if pubsub is not None else create_pubsub()
+        # Lets a worker skip its own messages when they come back from the backend
+        self.worker_id = uuid.uuid4().hex
+        self._started = False
+        self._closing = set()
+        self._publishing = set()
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        # Non-chat channels: channel -> sync handler(payload), called on the other workers
+        self._channel_handlers: Dict[str, Callable[[dict], None]] = {}
+        self._heartbeat: Optional[asyncio.Task] = None
+        self.slow_consumers_dropped = 0
+        self.send_errors = 0
+        self.reaped = 0
+        self.messages_in = 0
+        self.messages_out = 0
+        # Time from queueing a message to the socket accepting it
+        self._send_latencies = deque(maxlen=1000)
+        self._rate_mark = (time.monotonic(), 0, 0)
+        self._rates = (0.0, 0.0)
+
+    async def start(self):
+        if self._started:
+            return
+        self._started = True
+        self._loop = asyncio.get_running_loop()
+        self._heartbeat = asyncio.create_task(self._run_heartbeat())
+        await self.pubsub.start(self._on_pubsub_message)
+        await self.pubsub.subscribe(BROADCAST_CHANNEL)
+        for channel in self._channel_handlers:
+            await self.pubsub.subscribe(channel)
 
-    async def connect(self, user_id: str, websocket: WebSocket, user_role: str, user_name: str):
-        """Connect a user's WebSocket"""
+    async def stop(self):
+        if self._heartbeat is not None:
+            self._heartbeat.cancel()
+            self._heartbeat = None
+        for connections in list(self.active_connections.values()):
+            for connection in connections:
+                connection.close()
+        if self._started:
+            self._started = False
+            self._loop = None
+            await self.pubsub.stop()
+
+    async def connect(self, user_id: str, websocket: WebSocket, user_role: str, user_name: str) -> Connection:
+        """Connect a user's WebSocket; earlier sockets of the same user stay open"""
+        await self.start()
         await websocket.accept()
-        self.active_connections[user_id] = websocket
+        connection = Connection(self, user_id, websocket)
+        connections = self.active_connections.setdefault(user_id, [])
+        connections.append(connection)
         self.user_info[user_id] = {"role": user_role, "name": user_name}
-        print(f"User {user_id} ({user_role}) connected to chat")
+        if len(connections) == 1:
+            await self.pubsub.subscribe(user_channel(user_id))
+        print(f"User {user_id} ({user_role}) connected to chat ({len(connections)} sockets)")
+        return connection
+
+    def received(self, connection: Connection, message_type: Optional[str]):
+        """Note a frame from the client; pongs only prove the socket is alive"""
+        now = time.monotonic()
+        connection.last_seen = now
+        if message_type != "pong":
+            connection.last_message = now
+            self.messages_in += 1
 
-    def disconnect(self, user_id: str):
-        """Disconnect a user's WebSocket"""
-        if user_id in self.active_connections:
+    async def disconnect(self, user_id: str, websocket: Optional[WebSocket] = None):
+        """Disconnect one of a user's WebSockets, or all of them"""
+        connections = self.active_connections.get(user_id)
+        if not connections:
+            return
+        for connection in [c for c in connections if websocket is None or c.websocket is websocket]:
+            connections.remove(connection)
+            connection.close()
+        if not connections:
             del self.active_connections[user_id]
             del self.user_info[user_id]
+            await self.pubsub.unsubscribe(user_channel(user_id))
             print(f"User {user_id} disconnected from chat")
 
-    async def send_personal_message(self, message: dict, user_id: str):
-        """Send a message to a specific user"""
-        if user_id in self.active_connections:
+    def _enqueue(self, connection: Connection, kind: str, message):
+        if not connection.enqueue(kind, message) and not connection.closed:
+            self.slow_consumers_dropped += 1
+            print(f"Dropping slow chat socket of {connection.user_id}")
+            # 1013: try again later; the client reconnects and reloads history
+            self._drop(connection, 1013, "Slow consumer")
+
+    def _drop(self, connection: Connection, code: int, reason: str):
+        connection.close()
+        task = asyncio.create_task(self._close(connection, code, reason))
+        self._closing.add(task)
+        task.add_done_callback(self._closing.discard)
+
+    async def _close(self, connection: Connection, code: int, reason: str):
+        await self.disconnect(connection.user_id, connection.websocket)
+        try:
+            await asyncio.wait_for(connection.websocket.close(code=code, reason=reason), timeout=5)
+        except Exception:
+            pass
+
+    def _record_send(self, seconds: float):
+        self.messages_out += 1
+        self._send_latencies.append(seconds)
+
+    def heartbeat(self):
+        """Ping quiet sockets and reap unresponsive or idle ones; runs every interval"""
+        now = time.monotonic()
+        for connections in list(self.active_connections.values()):
+            for connection in list(connections):
+                if now - connection.last_seen > WS_HEARTBEAT_TIMEOUT:
+                    self.reaped += 1
+                    print(f"Reaping unresponsive chat socket of {connection.user_id}")
+                    self._drop(connection, 1001, "Heartbeat timeout")
+                elif WS_IDLE_TIMEOUT and now - connection.last_message > WS_IDLE_TIMEOUT:
+                    self.reaped += 1
+                    self._drop(connection, 1001, "Idle timeout")
+                elif now - connection.last_seen >= WS_HEARTBEAT_INTERVAL:
+                    self._enqueue(connection, "json", {"type": "ping"})
+
+        started, messages_in, messages_out = self._rate_mark
+        elapsed = now - started
+        if elapsed > 0:
+            self._rates = ((self.messages_in - messages_in) / elapsed, (self.messages_out - messages_out) / elapsed)
+        self._rate_mark = (now, self.messages_in, self.messages_out)
+
+    async def _run_heartbeat(self):
+        while True:
+            await asyncio.sleep(WS_HEARTBEAT_INTERVAL)
             try:
-                await self.active_connections[user_id].send_json(message)
+                self.heartbeat()
             except Exception as e:
-                print(f"Error sending message to {user_id}: {e}")
-                self.disconnect(user_id)
+                print(f"WebSocket heartbeat error: {e}")
+
+    def _deliver_local(self, message: dict, user_id: str):
+        for connection in list(self.active_connections.get(user_id, ())):
+            self._enqueue(connection, "json", message)
+
+    def send_to_socket(self, connection: Connection, message: dict):
+        """Queue a message for one socket only, such as an acknowledgement to its sender"""
+        self._enqueue(connection, "json", message)
+
+    async def send_personal_message(self, message: dict, user_id: str):
+        """Send a message to every socket of a user, on whichever workers they are connected to"""
+        self._deliver_local(message, user_id)
+        # Other tabs of the same user may be connected to other workers
+        await self.pubsub.publish(user_channel(user_id), {"origin": self.worker_id, "message": message})
 
     async def send_to_conversation(self, message: dict, conversation_participants: List[str]):
         """Send a message to all participants in a conversation"""
-        for user_id in conversation_participants:
-            await self.send_personal_message(message, user_id)
+        await asyncio.gather(*(self.send_personal_message(message, user_id) for user_id in conversation_participants))
+
+    def _broadcast_local(self, message: str):
+        for connections in list(self.active_connections.values()):
+            for connection in list(connections):
+                self._enqueue(connection, "text", message)
 
     async def broadcast(self, message: str):
-        """Broadcast to all connected users"""
-        dead_connections = []
-        for user_id, connection in self.active_connections.items():
-            try:
-                await connection.send_text(message)
-            except Exception:
-                dead_connections.append(user_id)
-        
-        # Remove dead connections
-        for user_id in dead_connections:
-            self.disconnect(user_id)
+        """Broadcast to all connected users, on every worker"""
+        self._broadcast_local(message)
+        await self.pubsub.publish(BROADCAST_CHANNEL, {"origin": self.worker_id, "text": message})
+
+    def add_channel_handler(self, channel: str, handler: Callable[[dict], None]):
+        """Run handler(payload) on every other worker when something is published on channel"""
+        self._channel_handlers[channel] = handler
+        if self._started:
+            self._loop.create_task(self.pubsub.subscribe(channel))
+
+    def publish_threadsafe(self, channel: str, payload: dict):
+        """
+        Publish to the other workers without waiting, from the event loop or
+        a sync endpoint's thread. Dropped when the manager is not running,
+        e.g. in scripts, where there are no other workers to tell.
+        """
+        loop = self._loop
+        if loop is None or loop.is_closed():
+            return
+        coroutine = self._publish({**payload, "origin": self.worker_id}, channel)
+        try:
+            on_loop = asyncio.get_running_loop() is loop
+        except RuntimeError:
+            on_loop = False
+        if on_loop:
+            task = loop.create_task(coroutine)
+            self._publishing.add(task)
+            task.add_done_callback(self._publishing.discard)
+        else:
+            asyncio.run_coroutine_threadsafe(coroutine, loop)
+
+    async def _publish(self, payload: dict, channel: str):
+        try:
+            await self.pubsub.publish(channel, payload)
+        except Exception as e:
+            print(f"Pub/sub publish error on {channel}: {e}")
+
+    async def _on_pubsub_message(self, channel: str, payload: dict):
+        if payload.get("origin") == self.worker_id:
+            return
+        handler = self._channel_handlers.get(channel)
+        if handler is not None:
+            handler(payload)
+        elif channel == BROADCAST_CHANNEL:
+            self._broadcast_local(payload["text"])
+        else:
+            self._deliver_local(payload["message"], channel[len(user_channel("")):])
 
     def is_online(self, user_id: str) -> bool:
         """Check if a user is online"""
@@ -58,4 +309,28 @@ class ConnectionManager:
         """Get user info (role, name)"""
         return self.user_info.get(user_id, {})
 
+    def stats(self) -> dict:
+        depths = [c.queue.qsize() for connections in self.active_connections.values() for c in connections]
+        latencies = sorted(self._send_latencies)
+        return {
+            "users": len(self.active_connections),
+            "connections": len(depths),
+            "queuedMessages": sum(depths),
+            "maxQueueDepth": max(depths, default=0),
+            "queueLimit": WS_SEND_QUEUE_SIZE,
+            "slowConsumersDropped": self.slow_consumers_dropped,
+            "sendErrors": self.send_errors,
+            "reaped": self.reaped,
+            "messagesIn": self.messages_in,
+            "messagesOut": self.messages_out,
+            "messagesInPerSecond": round(self._rates[0], 2),
+            "messagesOutPerSecond": round(self._rates[1], 2),
+            "sendLatency": {
+                "avgMs": round(sum(latencies) / len(latencies) * 1000, 3) if latencies else 0.0,
+                "p95Ms": round(latencies[int(len(latencies) * 0.95)] * 1000, 3) if latencies else 0.0,
+                "maxMs": round(latencies[-1] * 1000, 3) if latencies else 0.0,
+            },
+            "pubsub": self.pubsub.stats(),
+        }
+
 manager = ConnectionManager()
@@ -9,6 +9,7 @@ import LawyerSidebar from '../components/common/LawyerSidebar';
 import { jwtDecode } from 'jwt-decode';
 import { User, X } from 'lucide-react';
 import { api } from '../services/api';
+import { clearTokens } from '../services/auth';
 
 export default function ClientLayout({ children }: { children: React.ReactNode }) {
   const [sidebarCollapsed, setSidebarCollapsed] = useState(false);
@@ -83,7 +84,7 @@ export default function ClientLayout({ children }: { children: React.ReactNode }
             setLoading(false);
         } catch (e) {
             console.error("Auth check failed:", e);
-            sessionStorage.removeItem('userToken');
+            clearTokens('userToken');
             router.push('/user/login');
         }
         return;
@@ -126,7 +127,7 @@ export default function ClientLayout({ children }: { children: React.ReactNode }
             setLoading(false);
         } catch (e) {
             console.error("Auth check failed:", e);
-            sessionStorage.removeItem('lawyerToken');
+            clearTokens('lawyerToken');
             router.push('/login');
         }
         return;
@@ -155,7 +156,7 @@ export default function ClientLayout({ children }: { children: React.ReactNode }
             setLoading(false);
         } catch (e) {
             console.error("Auth check failed:", e);
-            sessionStorage.removeItem('adminToken');
+            clearTokens('adminToken');
             router.push('/login');
         }
         return;
@@ -4,6 +4,7 @@ import { useState, useEffect } from 'react';
 import { useRouter } from 'next/navigation';
 import Link from 'next/link';
 import { api } from '../../services/api';
+import { storeTokens } from '../../services/auth';
 import { jwtDecode } from 'jwt-decode';
 
 import { Eye, EyeOff } from 'lucide-react';
@@ -57,13 +58,13 @@ export default function UniversalLogin() {
       }
 
       if (role === 'admin') {
-        sessionStorage.setItem('adminToken', token);
+        storeTokens('admin', response);
         router.push('/admin/dashboard');
       } else if (role === 'lawyer') {
-        sessionStorage.setItem('lawyerToken', token);
+        storeTokens('lawyer', response);
         router.push('/lawyer/dashboard');
       } else if (role === 'client') {
-        sessionStorage.setItem('userToken', token);
+        storeTokens('client', response);
         
         // Fetch profile to check plan and redirect appropriately
         try {
@@ -3,17 +3,26 @@
 import { useState, useEffect, useRef } from 'react';
 import { MessageSquare, Send, User as UserIcon, Loader } from 'lucide-react';
 import { api } from '../../../services/api';
+import { getFreshToken } from '../../../services/auth';
 import { Conversation, ChatMessage } from '../../../types';
 
+// A message sent over the socket is shown before the server confirms it
+type ShownMessage = ChatMessage & { pending?: boolean };
+
 export default function ClientChatPage() {
   const [conversations, setConversations] = useState<Conversation[]>([]);
   const [selectedConversation, setSelectedConversation] = useState<Conversation | null>(null);
-  const [messages, setMessages] = useState<ChatMessage[]>([]);
+  const [messages, setMessages] = useState<ShownMessage[]>([]);
   const [messageInput, setMessageInput] = useState('');
   const [loading, setLoading] = useState(true);
   const [sending, setSending] = useState(false);
   const messagesEndRef = useRef<HTMLDivElement>(null);
   const ws = useRef<WebSocket | null>(null);
+  // Highest sequence number seen per conversation, sent on reconnect to replay the gap
+  const lastSeq = useRef<Record<string, number>>({});
+  // Messages sent over the socket and not acknowledged yet, by clientMessageId
+  const pendingMessages = useRef<Record<string, { conversationId: string; content: string }>>({});
+  const openConversationId = useRef<string | null>(null);
 
   useEffect(() => {
     fetchConversations();
@@ -34,8 +43,9 @@ export default function ClientChatPage() {
     messagesEndRef.current?.scrollIntoView({ behavior: 'smooth' });
   };
 
-  const connectWebSocket = () => {
-    const token = sessionStorage.getItem('userToken');
+  const connectWebSocket = async () => {
+    // The socket authenticates once, at connect time, so start with a token that is not about to expire
+    const token = await getFreshToken('userToken');
     if (!token) return;
 
     const wsUrl = `ws://localhost:8000/ws/chat?token=${token}`;
@@ -43,29 +53,72 @@ export default function ClientChatPage() {
 
     ws.current.onopen = () => {
       console.log('WebSocket connected');
+      if (Object.keys(lastSeq.current).length > 0) {
+        ws.current?.send(JSON.stringify({ type: 'resume', conversations: lastSeq.current }));
+      }
+    };
+
+    const addMessage = (data: any) => {
+      // Skip anything already shown, e.g. a live message that was also replayed
+      if (data.seq) {
+        if ((lastSeq.current[data.conversationId] ?? 0) >= data.seq) return;
+        lastSeq.current[data.conversationId] = data.seq;
+      }
+      const newMessage: ChatMessage = {
+        id: data.messageId || Math.random().toString(),
+        conversationId: data.conversationId,
+        senderId: data.senderId,
+        senderRole: data.senderRole,
+        senderName: data.senderName,
+        content: data.content,
+        timestamp: data.timestamp,
+        read: false,
+        seq: data.seq
+      };
+      // The sender already has it, under the id from the ack
+      setMessages(prev => prev.some(m => m.id === newMessage.id) ? prev : [...prev, newMessage]);
     };
 
     ws.current.onmessage = (event) => {
       const data = JSON.parse(event.data);
-      
+
+      // Server heartbeat: a socket that stops answering is closed
+      if (data.type === 'ping') {
+        ws.current?.send(JSON.stringify({ type: 'pong' }));
+        return;
+      }
+
+      if (data.type === 'ack') {
+        delete pendingMessages.current[data.clientMessageId];
+        confirmMessage(data.clientMessageId, { id: data.messageId, seq: data.seq, timestamp: data.timestamp });
+        return;
+      }
+
+      if (data.type === 'error') {
+        console.error('Message not sent:', data.detail);
+        if (data.clientMessageId) {
+          resendOverRest(data.clientMessageId);
+        }
+        return;
+      }
+
       if (data.type === 'message') {
-        // Add new message to the list
-        const newMessage: ChatMessage = {
-          id: data.messageId || Math.random().toString(),
-          conversationId: data.conversationId,
-          senderId: data.senderId,
-          senderRole: data.senderRole,
-          senderName: data.senderName,
-          content: data.content,
-          timestamp: data.timestamp,
-          read: false
-        };
-        
-        setMessages(prev => [...prev, newMessage]);
+        addMessage(data);
         
         // Update conversation list
         fetchConversations();
       }
+
+      if (data.type === 'replay') {
+        for (const conversation of data.conversations) {
+          conversation.messages.forEach(addMessage);
+          if (!conversation.complete) {
+            // Too far behind to replay; history reloads when the conversation is opened
+            delete lastSeq.current[conversation.conversationId];
+          }
+        }
+        fetchConversations();
+      }
     };
 
     ws.current.onerror = (error) => {
@@ -79,6 +132,30 @@ export default function ClientChatPage() {
     };
   };
 
+  // Swap the optimistic copy of a sent message for the stored one
+  const confirmMessage = (clientMessageId: string, stored: Partial<ChatMessage>) => {
+    setMessages(prev => prev.map(m => m.id === clientMessageId ? { ...m, ...stored, pending: false } : m));
+  };
+
+  // The socket refused a message: send it over REST instead, and if that fails
+  // too, take it out of the thread and put it back in the input box
+  const resendOverRest = async (clientMessageId: string) => {
+    const message = pendingMessages.current[clientMessageId];
+    if (!message) return;
+    delete pendingMessages.current[clientMessageId];
+
+    try {
+      const stored = await api.sendMessage(message.conversationId, message.content);
+      confirmMessage(clientMessageId, stored);
+    } catch (error) {
+      console.error('Error sending message:', error);
+      setMessages(prev => prev.filter(m => m.id !== clientMessageId));
+      if (openConversationId.current === message.conversationId) {
+        setMessageInput(current => current || message.content);
+      }
+    }
+  };
+
   const fetchConversations = async () => {
     try {
       const data = await api.getConversations();
@@ -92,9 +169,14 @@ export default function ClientChatPage() {
 
   const selectConversation = async (conversation: Conversation) => {
     setSelectedConversation(conversation);
+    openConversationId.current = conversation.id;
     try {
       const msgs = await api.getMessages(conversation.id);
       setMessages(msgs);
+      const seqs = msgs.map((m: ChatMessage) => m.seq ?? 0);
+      if (seqs.length > 0) {
+        lastSeq.current[conversation.id] = Math.max(...seqs);
+      }
       
       // Mark as read
       await api.markAsRead(conversation.id);
@@ -118,19 +200,35 @@ export default function ClientChatPage() {
     try {
       const timestamp = new Date().toISOString();
       
-      // Send via WebSocket for instant delivery
+      // The WebSocket path stores the message too; REST is the fallback
       if (ws.current && ws.current.readyState === WebSocket.OPEN) {
+        const clientMessageId = `local-${Math.random().toString(36).slice(2)}`;
+        pendingMessages.current[clientMessageId] = { conversationId: selectedConversation.id, content };
+        // Shown right away; the ack swaps in the stored message, an error resends it
+        setMessages(prev => [...prev, {
+          id: clientMessageId,
+          conversationId: selectedConversation.id,
+          senderId: sessionStorage.getItem('userId') || '',
+          senderRole: 'client',
+          senderName: sessionStorage.getItem('userName') || '',
+          content: content,
+          timestamp: timestamp,
+          read: false,
+          pending: true
+        }]);
         ws.current.send(JSON.stringify({
           type: 'message',
+          clientMessageId: clientMessageId,
           conversationId: selectedConversation.id,
           content: content,
           timestamp: timestamp
         }));
+      } else {
+        // REST sends are not relayed back over a socket, so show the stored message here
+        const stored = await api.sendMessage(selectedConversation.id, content);
+        setMessages(prev => [...prev, stored]);
       }
       
-      // Also send via REST API to ensure persistence
-      await api.sendMessage(selectedConversation.id, content);
-      
     } catch (error) {
       console.error('Error sending message:', error);
       setMessageInput(content); // Restore message on error
@@ -237,7 +335,7 @@ export default function ClientChatPage() {
                         msg.senderRole === 'client'
                           ? 'bg-blue-600 text-white'
                           : 'bg-gray-200 text-gray-900'
-                      }`}
+                      } ${msg.pending ? 'opacity-60' : ''}`}
                     >
                       <p className="break-words">{msg.content}</p>
                       <p className={`text-xs mt-1 ${msg.senderRole === 'client' ? 'text-blue-100' : 'text-gray-500'}`}>
@@ -5,6 +5,7 @@ import { useRouter } from 'next/navigation';
 import Link from 'next/link';
 import { useToast } from '../../../context/ToastContext';
 import { api } from '../../../services/api';
+import { storeTokens } from '../../../services/auth';
 import { Mail, Lock, User, Eye, EyeOff } from 'lucide-react';
 
 
@@ -46,7 +47,7 @@ export default function UserRegister() {
       });
 
       if (response && response.access_token) {
-          sessionStorage.setItem('userToken', response.access_token);
+          storeTokens('client', response);
           showToast('Account created successfully!', 'success');
           
           // Check for redirect param
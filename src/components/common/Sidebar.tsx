@@ -17,6 +17,7 @@ import {
 } from 'lucide-react';
 import Link from 'next/link';
 import { usePathname } from 'next/navigation';
+import { logout } from '../../services/auth';
 
 interface SidebarProps {
   isCollapsed: boolean;
@@ -83,7 +84,7 @@ export default function Sidebar({ isCollapsed }: SidebarProps) {
         <div className="mt-auto pt-4 border-t border-slate-800">
            <button
               onClick={() => {
-                sessionStorage.removeItem('adminToken');
+                logout('adminToken');
                 window.location.href = '/login';
               }}
               className={`w-full flex items-center px-2 sm:px-3 py-2 sm:py-3 rounded-lg text-red-400 hover:bg-slate-800 hover:text-red-300 transition-all duration-200`}
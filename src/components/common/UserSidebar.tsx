@@ -12,6 +12,7 @@ import {
 } from 'lucide-react';
 import Link from 'next/link';
 import { usePathname } from 'next/navigation';
+import { logout } from '../../services/auth';
 
 interface UserSidebarProps {
   isCollapsed: boolean;
@@ -33,7 +34,7 @@ export default function UserSidebar({ isCollapsed }: UserSidebarProps) {
   const pathname = usePathname();
 
   const handleLogout = () => {
-    sessionStorage.removeItem('userToken');
+    logout('userToken');
     window.location.href = '/user/login';
   };
 
@@ -1,4 +1,5 @@
 import { Lawyer, Client, Case, Appointment, Book, Article, Payment, Category, Review } from '../types';
+import { TokenKey, readToken, getFreshToken, refreshAccessToken } from './auth';
 
 const API_BASE_URL = process.env.NEXT_PUBLIC_API_URL || 'http://localhost:8000';
 
@@ -31,28 +32,25 @@ const handleResponse = async (response: Response) => {
 };
 
 export const api = {
+  // Which stored token this page authenticates with
+  tokenKey: (): TokenKey | null => {
+    if (typeof window === 'undefined') return null;
+    const path = window.location.pathname;
+    if (path.startsWith('/lawyer')) {
+        return 'lawyerToken';
+    } else if (path.startsWith('/admin')) {
+        return 'adminToken';
+    } else if (path.startsWith('/user')) {
+        return 'userToken';
+    }
+    // Fallback or explicit public routes
+    return (['adminToken', 'lawyerToken', 'userToken'] as TokenKey[]).find((key) => readToken(key)) || null;
+  },
+
   // Helper to get auth headers
   getHeaders: () => {
-    const adminToken = typeof window !== 'undefined' ? (sessionStorage.getItem('adminToken') || localStorage.getItem('adminToken')) : null;
-    const lawyerToken = typeof window !== 'undefined' ? (sessionStorage.getItem('lawyerToken') || localStorage.getItem('lawyerToken')) : null;
-    const userToken = typeof window !== 'undefined' ? (sessionStorage.getItem('userToken') || localStorage.getItem('userToken')) : null;
-    
-    let token = null;
-    if (typeof window !== 'undefined') {
-        const path = window.location.pathname;
-        if (path.startsWith('/lawyer')) {
-            token = lawyerToken;
-        } else if (path.startsWith('/admin')) {
-            token = adminToken;
-        } else if (path.startsWith('/user')) {
-            token = userToken;
-        } else {
-             // Fallback or explicit public routes
-             token = adminToken || lawyerToken || userToken;
-        }
-    } else {
-        token = adminToken || lawyerToken || userToken;
-    }
+    const key = api.tokenKey();
+    const token = key ? readToken(key) : null;
     
     return {
       'Content-Type': 'application/json',
@@ -60,22 +58,40 @@ export const api = {
     };
   },
 
+  // fetch with the page's token: refreshed shortly before it expires, and
+  // once more (then retried) if the server answers 401 anyway
+  authFetch: async (url: string, init: RequestInit = {}, json = true): Promise<Response> => {
+    const key = api.tokenKey();
+    const send = (token: string | null) => fetch(url, {
+      ...init,
+      headers: {
+        ...(json ? { 'Content-Type': 'application/json' } : {}),
+        ...(token ? { 'Authorization': `Bearer ${token}` } : {})
+      }
+    });
+
+    const token = key ? await getFreshToken(key) : null;
+    const response = await send(token);
+    if (response.status === 401 && key && token && !url.startsWith(`${API_BASE_URL}/auth/`)) {
+        const refreshed = await refreshAccessToken(key);
+        if (refreshed) return send(refreshed);
+    }
+    return response;
+  },
+
   // General keys
   get: async <T>(endpoint: string): Promise<T> => {
     const url = `${API_BASE_URL}${endpoint}`;
     console.log(`API GET Request: ${url}`);
-    const response = await fetch(url, {
-      headers: api.getHeaders()
-    });
+    const response = await api.authFetch(url);
     return handleResponse(response);
   },
 
   post: async <T>(endpoint: string, data: any): Promise<T> => {
     console.log(`API POST Request: ${endpoint}`, data);
     try {
-      const response = await fetch(`${API_BASE_URL}${endpoint}`, {
+      const response = await api.authFetch(`${API_BASE_URL}${endpoint}`, {
         method: 'POST',
-        headers: api.getHeaders(),
         body: JSON.stringify(data),
       });
       console.log(`API POST Response Status: ${response.status}`);
@@ -102,18 +118,16 @@ export const api = {
   },
 
   put: async <T>(endpoint: string, data: any): Promise<T> => {
-    const response = await fetch(`${API_BASE_URL}${endpoint}`, {
+    const response = await api.authFetch(`${API_BASE_URL}${endpoint}`, {
       method: 'PUT',
-      headers: api.getHeaders(),
       body: JSON.stringify(data),
     });
     return handleResponse(response);
   },
   
   delete: async <T>(endpoint: string): Promise<T> => {
-    const response = await fetch(`${API_BASE_URL}${endpoint}`, {
+    const response = await api.authFetch(`${API_BASE_URL}${endpoint}`, {
       method: 'DELETE',
-      headers: api.getHeaders(),
     });
     return handleResponse(response);
   },
@@ -155,26 +169,10 @@ export const api = {
       const formData = new FormData();
       formData.append('file', file);
       
-      let token = null;
-        if (typeof window !== 'undefined') {
-            const path = window.location.pathname;
-            const adminToken = sessionStorage.getItem('adminToken') || localStorage.getItem('adminToken');
-            const lawyerToken = sessionStorage.getItem('lawyerToken') || localStorage.getItem('lawyerToken');
-            
-            if (path.startsWith('/lawyer')) {
-                token = lawyerToken;
-            } else if (path.startsWith('/admin')) {
-                token = adminToken;
-            } else {
-                token = adminToken || lawyerToken;
-            }
-        }
-
-      return fetch(`${API_BASE_URL}/cases/${id}/documents`, {
+      return api.authFetch(`${API_BASE_URL}/cases/${id}/documents`, {
           method: 'POST',
-          headers: token ? { 'Authorization': `Bearer ${token}` } : {},
           body: formData
-      }).then(handleResponse);
+      }, false).then(handleResponse);
   },
   
   deleteCaseDocument: (caseId: string, docId: string) => api.delete<void>(`/cases/${caseId}/documents/${docId}`),
@@ -0,0 +1,103 @@
+import { jwtDecode } from 'jwt-decode';
+
+const API_BASE_URL = process.env.NEXT_PUBLIC_API_URL || 'http://localhost:8000';
+
+export type TokenKey = 'adminToken' | 'lawyerToken' | 'userToken';
+
+const ROLE_TOKEN_KEYS: Record<string, TokenKey> = {
+  admin: 'adminToken',
+  lawyer: 'lawyerToken',
+  client: 'userToken',
+};
+
+// Refresh the access token this long before it expires
+const REFRESH_MARGIN_MS = 60 * 1000;
+
+// adminToken -> adminRefreshToken
+const refreshKey = (key: TokenKey) => key.replace('Token', 'RefreshToken');
+
+// One refresh per token at a time: concurrent requests share it, since the
+// backend rotates the refresh token and would reject the second exchange
+const pendingRefresh: Partial<Record<TokenKey, Promise<string | null>>> = {};
+
+export const readToken = (key: TokenKey): string | null => {
+  if (typeof window === 'undefined') return null;
+  return sessionStorage.getItem(key) || localStorage.getItem(key);
+};
+
+// Store the access/refresh pair from a login, register or refresh response
+export const storeTokens = (role: string, response: { access_token: string; refresh_token?: string }) => {
+  const key = ROLE_TOKEN_KEYS[role];
+  if (!key) return;
+  sessionStorage.setItem(key, response.access_token);
+  if (response.refresh_token) {
+    sessionStorage.setItem(refreshKey(key), response.refresh_token);
+  }
+};
+
+export const clearTokens = (key: TokenKey) => {
+  sessionStorage.removeItem(key);
+  sessionStorage.removeItem(refreshKey(key));
+  localStorage.removeItem(key);
+};
+
+// Revoke the session on the server as well, so the refresh token cannot be reused
+export const logout = (key: TokenKey) => {
+  const refreshToken = sessionStorage.getItem(refreshKey(key));
+  clearTokens(key);
+  if (refreshToken) {
+    fetch(`${API_BASE_URL}/auth/logout`, {
+      method: 'POST',
+      headers: { 'Content-Type': 'application/json' },
+      body: JSON.stringify({ refresh_token: refreshToken }),
+    }).catch((error) => console.error('Logout failed:', error));
+  }
+};
+
+// Exchange the refresh token for a new pair; null when the session is gone
+export const refreshAccessToken = (key: TokenKey): Promise<string | null> => {
+  if (!pendingRefresh[key]) {
+    pendingRefresh[key] = (async () => {
+      const refreshToken = sessionStorage.getItem(refreshKey(key));
+      if (!refreshToken) return null;
+      try {
+        const response = await fetch(`${API_BASE_URL}/auth/refresh`, {
+          method: 'POST',
+          headers: { 'Content-Type': 'application/json' },
+          body: JSON.stringify({ refresh_token: refreshToken }),
+        });
+        if (!response.ok) {
+          // Expired or revoked session: the user has to log in again
+          if (response.status === 401) clearTokens(key);
+          return null;
+        }
+        const data = await response.json();
+        sessionStorage.setItem(key, data.access_token);
+        sessionStorage.setItem(refreshKey(key), data.refresh_token);
+        return data.access_token as string;
+      } catch (error) {
+        console.error('Token refresh failed:', error);
+        return null;
+      } finally {
+        delete pendingRefresh[key];
+      }
+    })();
+  }
+  return pendingRefresh[key]!;
+};
+
+const expiresSoon = (token: string) => {
+  try {
+    const { exp } = jwtDecode<{ exp?: number }>(token);
+    return !!exp && exp * 1000 - Date.now() < REFRESH_MARGIN_MS;
+  } catch (e) {
+    return false;
+  }
+};
+
+// The stored access token, refreshed first if it is about to expire
+export const getFreshToken = async (key: TokenKey): Promise<string | null> => {
+  const token = readToken(key);
+  if (!token || !expiresSoon(token)) return token;
+  return (await refreshAccessToken(key)) || readToken(key);
+};
@@ -149,6 +149,7 @@ export interface ChatMessage {
   content: string;
   timestamp: string;
   read: boolean;
+  seq?: number;
 }
 
 export interface Review {